@@ -1,16 +1,16 @@
 import os
 from dotenv import load_dotenv
-import logging
-
-# Configure logging
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
-)
 
 # Load environment variables
 load_dotenv()
 
+# Logging settings (applied by app.logging_config.configure_logging)
+LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO").upper()
+# "text" or "json" (one object per line, with structured fields)
+LOG_FORMAT = os.getenv("LOG_FORMAT", "text").lower()
+# Fraction of high-volume per-request events that are written
+LOG_SAMPLE_RATE = float(os.getenv("LOG_SAMPLE_RATE", "0.1"))
+
 # API Settings
 API_TITLE = "Cocktail Advisor Chat"
 API_DESCRIPTION = "A chat application that integrates with an LLM to create a RAG system for cocktail recommendations."
@@ -19,19 +19,145 @@ API_VERSION = "0.1.0"
 # LLM Settings
 TOGETHER_API_KEY = os.getenv("TOGETHER_API_KEY")
 DEFAULT_LLM_MODEL = os.getenv("LLM_MODEL")
+# Any OpenAI-compatible chat completions endpoint, e.g. a local mock server for load tests
+LLM_BASE_URL = os.getenv("LLM_BASE_URL", "https://api.together.xyz/v1")
+# Deadline for a whole LLM call, retries included
+LLM_TIMEOUT_SECONDS = float(os.getenv("LLM_TIMEOUT_SECONDS", "30"))
+LLM_CONNECT_TIMEOUT_SECONDS = float(os.getenv("LLM_CONNECT_TIMEOUT_SECONDS", "5"))
+# Retries use full-jitter exponential backoff; the budget caps them at this share of calls
+LLM_MAX_RETRIES = int(os.getenv("LLM_MAX_RETRIES", "2"))
+LLM_RETRY_BACKOFF_SECONDS = float(os.getenv("LLM_RETRY_BACKOFF_SECONDS", "0.2"))
+LLM_RETRY_BUDGET_RATIO = float(os.getenv("LLM_RETRY_BUDGET_RATIO", "0.1"))
+# Calls in flight at once (more wait in a queue) and pooled HTTP connections
+LLM_MAX_CONCURRENCY = int(os.getenv("LLM_MAX_CONCURRENCY", "16"))
+LLM_MAX_CONNECTIONS = int(os.getenv("LLM_MAX_CONNECTIONS", "32"))
+# Send a duplicate request when a call outlives this percentile of recent latencies
+LLM_HEDGE_ENABLED = os.getenv("LLM_HEDGE_ENABLED", "false").lower() == "true"
+LLM_HEDGE_PERCENTILE = float(os.getenv("LLM_HEDGE_PERCENTILE", "95"))
 
 # Vector DB Settings
+# "pinecone" for the hosted index, "local" for the in-process NumPy index
+VECTOR_BACKEND = os.getenv("VECTOR_BACKEND", "pinecone").lower()
+LOCAL_INDEX_PATH = os.getenv("LOCAL_INDEX_PATH", "data/local_index.npz")
 PINECONE_API_KEY = os.getenv("PINECONE_API_KEY")
 PINECONE_ENVIRONMENT = os.getenv("PINECONE_ENVIRONMENT", "")
 PINECONE_INDEX = os.getenv("PINECONE_INDEX", "cocktail-index")
 PINECONE_NAMESPACE_COCKTAILS = None
 PINECONE_NAMESPACE_USER_MEMORIES = "user-memories"
 
+# Vector store concurrency settings
+# Blocking encoder / Pinecone calls run on a bounded thread pool so they never stall the event loop
+VECTOR_STORE_MAX_WORKERS = int(os.getenv("VECTOR_STORE_MAX_WORKERS", "4"))
+# Use Pinecone's native asyncio client (requires the pinecone[asyncio] extra)
+PINECONE_USE_ASYNCIO = os.getenv("PINECONE_USE_ASYNCIO", "false").lower() == "true"
+# Optional index host; resolved through describe_index when empty
+PINECONE_INDEX_HOST = os.getenv("PINECONE_INDEX_HOST", "")
+
+# Retrieval settings
+# "dense" (vector search only), "hybrid" (BM25 fused with dense via reciprocal rank fusion) or "sparse"
+RETRIEVAL_MODE = os.getenv("RETRIEVAL_MODE", "hybrid").lower()
+# Dense candidates fetched per hybrid query; BM25 supplies the rest
+HYBRID_DENSE_CANDIDATES = int(os.getenv("HYBRID_DENSE_CANDIDATES", "5"))
+RRF_K = int(os.getenv("RRF_K", "60"))
+# Dense matches scoring at or below this cosine similarity are dropped (tune with python -m benchmarks.retrieval_eval)
+DENSE_SCORE_THRESHOLD = float(os.getenv("DENSE_SCORE_THRESHOLD", "0.19"))
+# Answer pure ingredient / category / alcoholic set queries from the structured index
+STRUCTURED_QUERY_ENABLED = os.getenv("STRUCTURED_QUERY_ENABLED", "true").lower() == "true"
+
+# Prompt settings
+# Token budget for the retrieved cocktails in each prompt; lowest-ranked cocktails are dropped first
+CONTEXT_MAX_TOKENS = int(os.getenv("CONTEXT_MAX_TOKENS", "800"))
+# tiktoken encoding used to count prompt tokens (estimated from length when unavailable)
+PROMPT_TOKENIZER_ENCODING = os.getenv("PROMPT_TOKENIZER_ENCODING", "cl100k_base")
+
+# Batch endpoint (/api/chat/batch): items accepted per request and LLM generations in flight per batch,
+# kept below LLM_MAX_CONCURRENCY so interactive chat still gets LLM slots during bulk jobs
+BATCH_MAX_ITEMS = int(os.getenv("BATCH_MAX_ITEMS", "5000"))
+BATCH_LLM_CONCURRENCY = int(os.getenv("BATCH_LLM_CONCURRENCY", "8"))
+
+# Catalog ingestion settings
+COCKTAILS_CSV_PATH = os.getenv(
+    "COCKTAILS_CSV_PATH",
+    os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "cocktails_data.csv")
+)
+INGEST_STATE_PATH = os.getenv("INGEST_STATE_PATH", "data/ingest_state.json")
+INGEST_EMBED_BATCH_SIZE = int(os.getenv("INGEST_EMBED_BATCH_SIZE", "256"))
+INGEST_UPSERT_BATCH_SIZE = int(os.getenv("INGEST_UPSERT_BATCH_SIZE", "100"))
+
+# Similar-cocktail graph built by python -m app.tools.similarity_graph
+SIMILARITY_GRAPH_PATH = os.getenv("SIMILARITY_GRAPH_PATH", "data/similarity_graph.npy")
+SIMILARITY_TOP_N = int(os.getenv("SIMILARITY_TOP_N", "10"))
+# Share of the score taken by ingredient overlap; the rest is embedding similarity
+SIMILARITY_JACCARD_WEIGHT = float(os.getenv("SIMILARITY_JACCARD_WEIGHT", "0.3"))
+
 # Embedding Settings
 EMBEDDING_MODEL = "sentence-transformers/all-MiniLM-L6-v2"
+# "torch" (SentenceTransformer, fp32), "onnx" (graph exported by python -m app.tools.export_onnx, run on onnxruntime)
+# or "remote" (the embedding sidecar below)
+ENCODER_BACKEND = os.getenv("ENCODER_BACKEND", "torch").lower()
+ONNX_MODEL_DIR = os.getenv("ONNX_MODEL_DIR", "data/onnx/all-MiniLM-L6-v2")
+# Use the dynamically int8-quantized graph rather than the fp32 export
+ONNX_QUANTIZED = os.getenv("ONNX_QUANTIZED", "true").lower() == "true"
+# onnxruntime intra-op threads (0 lets onnxruntime decide)
+ONNX_THREADS = int(os.getenv("ONNX_THREADS", "0"))
+# Embedding sidecar (python -m app.tools.embedding_server): one process owns the model and batches requests from
+# every uvicorn worker on the host; workers with ENCODER_BACKEND=remote reach it over this Unix socket
+EMBEDDING_SERVER_SOCKET = os.getenv("EMBEDDING_SERVER_SOCKET", "/tmp/cocktail-embeddings.sock")
+# Encoder backend the sidecar loads ("torch" or "onnx")
+EMBEDDING_SERVER_BACKEND = os.getenv("EMBEDDING_SERVER_BACKEND", "torch").lower()
+# Per request; clients split large inputs into requests of the sidecar's batch size
+EMBEDDING_SERVER_TIMEOUT_SECONDS = float(os.getenv("EMBEDDING_SERVER_TIMEOUT_SECONDS", "10"))
+# Micro-batching: concurrent requests share one encode call
+EMBEDDING_BATCHING_ENABLED = os.getenv("EMBEDDING_BATCHING_ENABLED", "true").lower() == "true"
+EMBEDDING_BATCH_SIZE = int(os.getenv("EMBEDDING_BATCH_SIZE", "32"))
+EMBEDDING_BATCH_WAIT_MS = float(os.getenv("EMBEDDING_BATCH_WAIT_MS", "5"))
+# Content-hashed embedding cache (0 disables it); set a path to persist vectors across restarts
+EMBEDDING_CACHE_SIZE = int(os.getenv("EMBEDDING_CACHE_SIZE", "10000"))
+EMBEDDING_CACHE_TTL_SECONDS = float(os.getenv("EMBEDDING_CACHE_TTL_SECONDS", "86400"))
+EMBEDDING_CACHE_PATH = os.getenv("EMBEDDING_CACHE_PATH", "")
+
 
+# Semantic response cache: reuse an answer when a new query is within the cosine threshold
+RESPONSE_CACHE_ENABLED = os.getenv("RESPONSE_CACHE_ENABLED", "true").lower() == "true"
+RESPONSE_CACHE_THRESHOLD = float(os.getenv("RESPONSE_CACHE_THRESHOLD", "0.95"))
+RESPONSE_CACHE_SIZE = int(os.getenv("RESPONSE_CACHE_SIZE", "1000"))
+RESPONSE_CACHE_TTL_SECONDS = float(os.getenv("RESPONSE_CACHE_TTL_SECONDS", "3600"))
+
+# Observability
+# Prometheus metrics on /metrics
+METRICS_ENABLED = os.getenv("METRICS_ENABLED", "true").lower() == "true"
+# Export pipeline stages as OpenTelemetry spans (needs opentelemetry-sdk and opentelemetry-exporter-otlp)
+OTEL_ENABLED = os.getenv("OTEL_ENABLED", "false").lower() == "true"
+OTEL_EXPORTER_OTLP_ENDPOINT = os.getenv("OTEL_EXPORTER_OTLP_ENDPOINT", "http://localhost:4317")
+OTEL_SERVICE_NAME = os.getenv("OTEL_SERVICE_NAME", "cocktail-advisor")
 
 # User memory detection settings
+# How preference extraction relates to answering the current turn:
+#   "blocking"   - extract and store before retrieval (the turn sees its own preferences)
+#   "concurrent" - run alongside retrieval and generation; the response waits for both
+#   "background" - schedule it and return as soon as the answer is ready
+PREFERENCE_EXTRACTION_MODE = os.getenv("PREFERENCE_EXTRACTION_MODE", "concurrent").lower()
+# Rule-based fast path that skips the LLM for messages without (or with obvious) preferences
+PREFERENCE_PREFILTER_ENABLED = os.getenv("PREFERENCE_PREFILTER_ENABLED", "true").lower() == "true"
+# Per-user preference profiles: "sqlite" (durable) or "memory"
+PREFERENCE_STORE_BACKEND = os.getenv("PREFERENCE_STORE_BACKEND", "sqlite").lower()
+PREFERENCE_DB_PATH = os.getenv("PREFERENCE_DB_PATH", "data/preferences.db")
+PREFERENCE_CACHE_SIZE = int(os.getenv("PREFERENCE_CACHE_SIZE", "10000"))
+# Import preferences that earlier releases stored as vector memories (PINECONE_NAMESPACE_USER_MEMORIES)
+# into a user's profile the first time it is read; disable once every user has been migrated
+LEGACY_MEMORY_FALLBACK_ENABLED = os.getenv("LEGACY_MEMORY_FALLBACK_ENABLED", "true").lower() == "true"
+LEGACY_MEMORY_IMPORT_LIMIT = int(os.getenv("LEGACY_MEMORY_IMPORT_LIMIT", "100"))
+# Upper bound on background extractions running at once
+PREFERENCE_EXTRACTION_CONCURRENCY = int(os.getenv("PREFERENCE_EXTRACTION_CONCURRENCY", "8"))
+
+# Conversation sessions: "sqlite" (durable) or "memory"; each session keeps its last SESSION_MAX_TURNS turns
+SESSION_STORE_BACKEND = os.getenv("SESSION_STORE_BACKEND", "sqlite").lower()
+SESSION_DB_PATH = os.getenv("SESSION_DB_PATH", "data/sessions.db")
+SESSION_MAX_TURNS = int(os.getenv("SESSION_MAX_TURNS", "20"))
+SESSION_CACHE_SIZE = int(os.getenv("SESSION_CACHE_SIZE", "10000"))
+# Token budget for the recent turns included in each prompt (0 leaves history out)
+HISTORY_MAX_TOKENS = int(os.getenv("HISTORY_MAX_TOKENS", "400"))
+
 USER_PREFERENCE_PROMPT = """
 You are a helpful assistant tasked with extracting information about a user's favorite cocktail ingredients and cocktails.
 
@@ -3,6 +3,42 @@ from app.services.vector_store import VectorStoreService
 from app.services.llm_service import LLMService
 from app.services.memory_service import MemoryService
 from app.services.rag_service import RAGService
+from app.services.preference_prefilter import PreferencePrefilter
+from app.services.preference_store import create_preference_store
+from app.services.session_store import create_session_store
+from app.services.response_cache import CatalogVersionWatcher, SemanticResponseCache
+from app.services.sparse_index import BM25Index
+from app.services.structured_index import StructuredIndex
+from app.services.similarity_graph import SimilarityGraph
+from app.services.vector_backends import InMemoryBackend
+from app.services.catalog import load_cocktails
+from typing import Any, Dict
+import asyncio
+import logging
+import os
+import time
+from app.config import (
+    COCKTAILS_CSV_PATH,
+    PREFERENCE_PREFILTER_ENABLED,
+    RETRIEVAL_MODE,
+    STRUCTURED_QUERY_ENABLED,
+    PREFERENCE_STORE_BACKEND,
+    PREFERENCE_DB_PATH,
+    PREFERENCE_CACHE_SIZE,
+    RESPONSE_CACHE_ENABLED,
+    RESPONSE_CACHE_THRESHOLD,
+    RESPONSE_CACHE_SIZE,
+    RESPONSE_CACHE_TTL_SECONDS,
+    INGEST_STATE_PATH,
+    LOCAL_INDEX_PATH,
+    SIMILARITY_GRAPH_PATH,
+    SESSION_STORE_BACKEND,
+    SESSION_DB_PATH,
+    SESSION_MAX_TURNS,
+    SESSION_CACHE_SIZE
+)
+
+logger = logging.getLogger(__name__)
 
 
 # Use singleton pattern to ensure we only create one instance
@@ -10,13 +46,29 @@ _vector_store_instance = None
 _llm_service_instance = None
 _memory_service_instance = None
 _rag_service_instance = None
+_catalog = None
+_similarity_graph = None
+# Set once a load was attempted, so a missing graph is not looked up on every call
+_similarity_graph_loaded = False
+_session_store = None
+# Background catalog reloads; only the newest generation is swapped in
+_reload_tasks = set()
+_catalog_generation = 0
+
+# Readiness state, set once the startup warmup has finished
+_ready = False
+_startup_error = None
 
 
 def get_vector_store():
     """Return a singleton instance of VectorStoreService"""
     global _vector_store_instance
     if _vector_store_instance is None:
-        _vector_store_instance = VectorStoreService()
+        sparse_index = BM25Index.from_catalog(get_catalog()) if RETRIEVAL_MODE != "dense" else None
+        _vector_store_instance = VectorStoreService(
+            sparse_index=sparse_index,
+            similarity_graph=get_similarity_graph()
+        )
     return _vector_store_instance
 
 
@@ -28,13 +80,137 @@ def get_llm_service():
     return _llm_service_instance
 
 
+def get_catalog():
+    """Return the cocktail catalog rows, loaded once from the CSV"""
+    global _catalog
+    if _catalog is None:
+        _catalog = load_cocktails(COCKTAILS_CSV_PATH)
+    return _catalog
+
+
+def _build_catalog_indexes() -> Dict[str, Any]:
+    """
+    Load the reindexed catalog and build everything derived from it.
+    
+    Blocking; runs on a worker thread when a server is running. Nothing is
+    swapped in here, so requests keep using the previous indexes meanwhile.
+    """
+    catalog = load_cocktails(COCKTAILS_CSV_PATH)
+    indexes = {
+        "catalog": catalog,
+        "similarity_graph": SimilarityGraph.load(SIMILARITY_GRAPH_PATH, catalog),
+    }
+    if _vector_store_instance is not None:
+        if RETRIEVAL_MODE != "dense":
+            indexes["sparse_index"] = BM25Index.from_catalog(catalog)
+        # The local backend holds the vectors written by the re-ingest only in its file
+        if isinstance(_vector_store_instance.backend, InMemoryBackend) and os.path.exists(LOCAL_INDEX_PATH):
+            indexes["backend"] = InMemoryBackend(LOCAL_INDEX_PATH)
+    if _rag_service_instance is not None and STRUCTURED_QUERY_ENABLED:
+        indexes["structured_index"] = StructuredIndex.from_catalog(catalog)
+    if _memory_service_instance is not None and PREFERENCE_PREFILTER_ENABLED:
+        indexes["prefilter"] = PreferencePrefilter.from_catalog(catalog)
+    return indexes
+
+
+def _swap_catalog_indexes(indexes: Dict[str, Any]):
+    """Point every service at the indexes built by _build_catalog_indexes."""
+    global _catalog, _similarity_graph, _similarity_graph_loaded
+    _catalog = indexes["catalog"]
+    _similarity_graph = indexes["similarity_graph"]
+    _similarity_graph_loaded = True
+    if _vector_store_instance is not None:
+        _vector_store_instance.similarity_graph = _similarity_graph
+        if "sparse_index" in indexes:
+            _vector_store_instance.sparse_index = indexes["sparse_index"]
+        if "backend" in indexes:
+            _vector_store_instance.backend = indexes["backend"]
+    if _rag_service_instance is not None:
+        if "structured_index" in indexes:
+            _rag_service_instance.structured_index = indexes["structured_index"]
+        # Answers generated while the old indexes were still in use
+        _rag_service_instance.invalidate_response_cache()
+    if _memory_service_instance is not None and "prefilter" in indexes:
+        _memory_service_instance.prefilter = indexes["prefilter"]
+
+
+def reload_catalog(version=None):
+    """
+    Rebuild the in-process catalog indexes after the catalog is reindexed.
+    
+    The catalog rows, BM25 index, structured index, preference prefilter
+    vocabulary, similarity graph and (with VECTOR_BACKEND=local) the vector
+    index are rebuilt, then swapped in together.
+    """
+    started = time.perf_counter()
+    indexes = _build_catalog_indexes()
+    _swap_catalog_indexes(indexes)
+    logger.info("Reloaded catalog version %s (%d cocktails) in %.3fs", version, len(indexes["catalog"]), time.perf_counter() - started)
+
+
+async def areload_catalog(version=None, generation=None):
+    """Async variant of reload_catalog; the rebuild runs on a worker thread."""
+    started = time.perf_counter()
+    indexes = await asyncio.to_thread(_build_catalog_indexes)
+    if generation is not None and generation != _catalog_generation:
+        # A newer version arrived while building; its reload swaps in instead
+        return
+    _swap_catalog_indexes(indexes)
+    logger.info("Reloaded catalog version %s (%d cocktails) in %.3fs", version, len(indexes["catalog"]), time.perf_counter() - started)
+
+
+def _on_catalog_change(version=None):
+    """
+    CatalogVersionWatcher callback.
+    
+    The watcher runs inside whichever request notices the new version, so on
+    the event loop the rebuild is scheduled in the background instead of
+    stalling every in-flight request.
+    """
+    global _catalog_generation
+    try:
+        asyncio.get_running_loop()
+    except RuntimeError:
+        reload_catalog(version)
+        return
+    _catalog_generation += 1
+    task = asyncio.create_task(areload_catalog(version, _catalog_generation))
+    _reload_tasks.add(task)
+    task.add_done_callback(_reload_tasks.discard)
+    task.add_done_callback(_log_reload_failure)
+
+
+def _log_reload_failure(task: asyncio.Task):
+    if not task.cancelled() and task.exception() is not None:
+        logger.error("Catalog reload failed: %s", task.exception())
+
+
+def get_similarity_graph():
+    """Return the precomputed similar-cocktail graph, or None if it has not been built"""
+    global _similarity_graph, _similarity_graph_loaded
+    if not _similarity_graph_loaded:
+        _similarity_graph = SimilarityGraph.load(SIMILARITY_GRAPH_PATH, get_catalog())
+        _similarity_graph_loaded = True
+    return _similarity_graph
+
+
+def get_session_store():
+    """Return a singleton instance of the conversation SessionStore"""
+    global _session_store
+    if _session_store is None:
+        _session_store = create_session_store(SESSION_STORE_BACKEND, SESSION_DB_PATH, SESSION_MAX_TURNS, SESSION_CACHE_SIZE)
+    return _session_store
+
+
 def get_memory_service():
     """Return a singleton instance of MemoryService"""
     global _memory_service_instance
     if _memory_service_instance is None:
         vector_store = get_vector_store()
         llm_service = get_llm_service()
-        _memory_service_instance = MemoryService(vector_store, llm_service)
+        prefilter = PreferencePrefilter.from_catalog(get_catalog()) if PREFERENCE_PREFILTER_ENABLED else None
+        preference_store = create_preference_store(PREFERENCE_STORE_BACKEND, PREFERENCE_DB_PATH, PREFERENCE_CACHE_SIZE)
+        _memory_service_instance = MemoryService(vector_store, llm_service, prefilter, preference_store)
     return _memory_service_instance
 
 
@@ -45,5 +221,110 @@ def get_rag_service():
         vector_store = get_vector_store()
         memory_service = get_memory_service()
         llm_service = get_llm_service()
-        _rag_service_instance = RAGService(vector_store, memory_service, llm_service)
-    return _rag_service_instance
\ No newline at end of file
+        response_cache = None
+        if RESPONSE_CACHE_ENABLED:
+            response_cache = SemanticResponseCache(
+                threshold=RESPONSE_CACHE_THRESHOLD,
+                max_entries=RESPONSE_CACHE_SIZE,
+                ttl_seconds=RESPONSE_CACHE_TTL_SECONDS
+            )
+        structured_index = StructuredIndex.from_catalog(get_catalog()) if STRUCTURED_QUERY_ENABLED else None
+        catalog_watcher = CatalogVersionWatcher(INGEST_STATE_PATH)
+        catalog_watcher.subscribe(_on_catalog_change)
+        _rag_service_instance = RAGService(
+            vector_store,
+            memory_service,
+            llm_service,
+            response_cache=response_cache,
+            catalog_watcher=catalog_watcher,
+            structured_index=structured_index,
+            session_store=get_session_store()
+        )
+    return _rag_service_instance
+
+async def init_services() -> Dict[str, float]:
+    """
+    Build every service singleton and warm up the encoder and vector backend.
+    
+    Called from the application lifespan so the first request does not pay for
+    model loading and client creation.
+    
+    Returns:
+        Seconds spent in each startup phase
+    """
+    global _ready, _startup_error
+    timings = {}
+    started = time.perf_counter()
+    
+    async def timed(phase, func):
+        phase_started = time.perf_counter()
+        result = await asyncio.to_thread(func)
+        timings[phase] = time.perf_counter() - phase_started
+        logger.info("Startup phase '%s' took %.3fs", phase, timings[phase])
+        return result
+    
+    try:
+        await timed("catalog", get_catalog)
+        vector_store = await timed("vector_store", get_vector_store)
+        await timed("llm_service", get_llm_service)
+        await timed("memory_service", get_memory_service)
+        rag_service = await timed("rag_service", get_rag_service)
+        await timed("tokenizer", rag_service.context_builder.token_counter.load)
+        
+        for phase, seconds in (await vector_store.warmup()).items():
+            timings[f"warmup_{phase}"] = seconds
+            logger.info("Startup phase 'warmup_%s' took %.3fs", phase, seconds)
+        
+        _ready = True
+        _startup_error = None
+    except Exception as e:
+        _startup_error = str(e)
+        logger.exception("Service warmup failed: %s", e)
+    
+    timings["total"] = time.perf_counter() - started
+    logger.info("Startup finished in %.3fs (ready=%s)", timings["total"], _ready)
+    return timings
+
+
+def service_stats() -> Dict[str, Any]:
+    """Return the stats() of every service component built so far, for /metrics"""
+    stats = {}
+    if _vector_store_instance is not None:
+        if _vector_store_instance.embedding_cache is not None:
+            stats["embedding_cache"] = _vector_store_instance.embedding_cache.stats()
+        if _vector_store_instance.batcher is not None:
+            stats["embedding_batcher"] = _vector_store_instance.batcher.stats()
+    if _llm_service_instance is not None:
+        stats["llm_client"] = _llm_service_instance.stats()
+    if _memory_service_instance is not None:
+        stats["preference_store"] = _memory_service_instance.preference_store.stats()
+        if _memory_service_instance.prefilter is not None:
+            stats["preference_prefilter"] = _memory_service_instance.prefilter.stats()
+    if _session_store is not None:
+        stats["session_store"] = _session_store.stats()
+    if _rag_service_instance is not None:
+        if _rag_service_instance.response_cache is not None:
+            stats["response_cache"] = _rag_service_instance.response_cache.stats()
+        if _rag_service_instance.structured_index is not None:
+            stats["query_planner"] = _rag_service_instance.structured_index.stats()
+    return stats
+
+
+def readiness() -> Dict[str, Any]:
+    """Return whether the services are warmed up and able to serve traffic"""
+    return {"ready": _ready, "error": _startup_error}
+
+
+async def shutdown_services():
+    """Release resources held by the service singletons"""
+    global _ready
+    _ready = False
+    if _memory_service_instance is not None:
+        await _memory_service_instance.drain()
+        _memory_service_instance.preference_store.close()
+    if _session_store is not None:
+        _session_store.close()
+    if _vector_store_instance is not None:
+        await _vector_store_instance.aclose()
+    if _llm_service_instance is not None:
+        await _llm_service_instance.aclose()
@@ -0,0 +1,122 @@
+from logging.handlers import QueueHandler, QueueListener
+from typing import Optional
+import atexit
+import json
+import logging
+import queue
+import random
+import sys
+
+from app.config import LOG_FORMAT, LOG_LEVEL, LOG_SAMPLE_RATE
+
+# Attributes every LogRecord has; anything else was passed through ``extra``
+_RECORD_ATTRIBUTES = set(vars(logging.LogRecord("", 0, "", 0, "", (), None))) | {"message", "asctime"}
+
+TEXT_FORMAT = "%(asctime)s - %(name)s - %(levelname)s - %(message)s"
+
+_listener: Optional[QueueListener] = None
+
+
+class SamplingFilter(logging.Filter):
+    """
+    Keeps only a fraction of high-volume records.
+
+    Records logged with ``extra={"sample": True}`` pass with probability
+    ``rate``; all other records always pass.
+    """
+
+    def __init__(self, rate: float):
+        super().__init__()
+        self.rate = rate
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if not getattr(record, "sample", False):
+            return True
+        return self.rate >= 1.0 or random.random() < self.rate
+
+
+# Argument types that cannot change between the logging call and the listener formatting it
+_IMMUTABLE_ARGS = (str, bytes, int, float, complex, bool, type(None), BaseException)
+
+
+class DeferredQueueHandler(QueueHandler):
+    """
+    QueueHandler that leaves formatting to the listener thread.
+
+    The stock handler merges the message and its arguments on the calling
+    thread; here a record whose arguments are all immutable (strings,
+    numbers, exceptions) is queued as-is, so neither string formatting nor
+    the write happens on the event loop. A record with a mutable argument
+    (a dict, a list, an object) is formatted before it is queued, since the
+    caller may change that argument before the listener gets to it.
+    """
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        args = record.args
+        if args and (isinstance(args, dict) or not all(isinstance(arg, _IMMUTABLE_ARGS) for arg in args)):
+            record.msg = record.getMessage()
+            record.args = None
+        return record
+
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per line, including any fields passed through ``extra``."""
+
+    def format(self, record: logging.LogRecord) -> str:
+        payload = {
+            "time": self.formatTime(record),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+        }
+        for key, value in vars(record).items():
+            if key not in _RECORD_ATTRIBUTES and key != "sample":
+                payload[key] = value
+        if record.exc_info:
+            payload["exception"] = self.formatException(record.exc_info)
+        return json.dumps(payload, default=str)
+
+
+def configure_logging(level: str = LOG_LEVEL, log_format: str = LOG_FORMAT, sample_rate: float = LOG_SAMPLE_RATE):
+    """
+    Route all logging through a queue drained by a background thread.
+
+    Safe to call more than once; later calls replace the earlier setup.
+
+    Args:
+        level: Root log level name, e.g. "INFO"
+        log_format: "text" or "json"
+        sample_rate: Fraction of sampled (per-request) records kept
+    """
+    global _listener
+    stop_logging()
+
+    stream_handler = logging.StreamHandler(sys.stderr)
+    if log_format == "json":
+        stream_handler.setFormatter(JsonFormatter())
+    else:
+        stream_handler.setFormatter(logging.Formatter(TEXT_FORMAT))
+
+    log_queue = queue.SimpleQueue()
+    queue_handler = DeferredQueueHandler(log_queue)
+    queue_handler.addFilter(SamplingFilter(sample_rate))
+
+    root = logging.getLogger()
+    for handler in list(root.handlers):
+        root.removeHandler(handler)
+    root.addHandler(queue_handler)
+    root.setLevel(level.upper())
+
+    _listener = QueueListener(log_queue, stream_handler, respect_handler_level=True)
+    _listener.start()
+
+
+def stop_logging():
+    """Flush queued records and stop the listener thread."""
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
+
+
+atexit.register(stop_logging)
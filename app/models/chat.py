@@ -8,13 +8,27 @@ class ChatMessage(BaseModel):
 
 
 class ChatRequest(BaseModel):
-    messages: List[ChatMessage]
+    message: Optional[str] = None  # The new user message; history is kept server-side
+    session_id: Optional[str] = None  # Conversation to continue; omitted starts a new one
+    messages: List[ChatMessage] = []  # Legacy: full history, of which only the last user message is used
     user_id: Optional[str] = "default_user"  # To track user sessions/preferences
 
 
 class ChatResponse(BaseModel):
     message: ChatMessage
     sources: Optional[List[Dict[str, Any]]] = None  # For providing source cocktail info
+    session_id: Optional[str] = None  # Send back to continue this conversation
+
+
+class BatchChatItem(BaseModel):
+    message: str
+    id: Optional[str] = None  # Echoed back so results can be matched to items
+    user_id: Optional[str] = "default_user"  # Whose stored preferences to apply
+
+
+class BatchChatRequest(BaseModel):
+    items: List[BatchChatItem]
+    max_concurrency: Optional[int] = None  # LLM generations in flight (capped at BATCH_LLM_CONCURRENCY)
 
 
 class UserMemory(BaseModel):
@@ -1,12 +1,42 @@
 from fastapi import APIRouter, Depends, HTTPException
-from app.models.chat import ChatRequest, ChatResponse, ChatMessage
+from fastapi.responses import StreamingResponse
+from app.config import BATCH_LLM_CONCURRENCY, BATCH_MAX_ITEMS
+from app.models.chat import BatchChatRequest, ChatRequest, ChatResponse, ChatMessage
 from app.services.rag_service import RAGService
-from app.dependencies import get_rag_service
-from typing import List
+from app.services.session_store import SessionStore
+from app.dependencies import get_rag_service, get_session_store
+from typing import Any, Dict, List
+import json
+import uuid
 
 router = APIRouter()
 
 
+def _last_user_message(request: ChatRequest) -> str:
+    """Return the new user message, or reject the request."""
+    if request.message is not None:
+        if not request.message.strip():
+            raise HTTPException(status_code=400, detail="Message must not be empty")
+        return request.message
+    
+    user_messages = [msg for msg in request.messages if msg.role == "user"]
+    if not user_messages:
+        raise HTTPException(status_code=400, detail="No user message found in the request")
+    
+    return user_messages[-1].content
+
+
+def _session_id(request: ChatRequest) -> str:
+    """Conversation the request continues; a request without one starts a new session."""
+    return request.session_id or uuid.uuid4().hex
+
+
+def _format_sse(event: Dict[str, Any]) -> str:
+    """Encode a stream event as a Server-Sent Events frame."""
+    data = json.dumps(event.get("data"), default=str)
+    return f"event: {event['event']}\ndata: {data}\n\n"
+
+
 @router.post("/chat", response_model=ChatResponse)
 async def chat(
     request: ChatRequest, 
@@ -16,41 +46,103 @@ async def chat(
     Chat endpoint for the cocktail advisor.
     
     Args:
-        request: The chat request containing conversation history
+        request: The chat request with the new message and its session id
         
     Returns:
-        Chat response with assistant's message and relevant sources
+        Chat response with assistant's message, relevant sources and the
+        session id to send with the next message
     """
     # Get the last user message
-    user_messages = [msg for msg in request.messages if msg.role == "user"]
-    if not user_messages:
-        raise HTTPException(status_code=400, detail="No user message found in the request")
-    
-    last_user_message = user_messages[-1].content
-    
+    last_user_message = _last_user_message(request)
+    session_id = _session_id(request)
 
-    response_text, sources = await rag_service.process_query(request.user_id, last_user_message)
+    response_text, sources = await rag_service.process_query(request.user_id, last_user_message, session_id)
     
     # Format the response
     return ChatResponse(
         message=ChatMessage(role="assistant", content=response_text),
-        sources=sources
+        sources=sources,
+        session_id=session_id
     )
 
 
-@router.get("/chat/history/{user_id}", response_model=List[ChatMessage])
-async def get_chat_history(user_id: str):
+@router.post("/chat/stream")
+async def chat_stream(
+    request: ChatRequest,
+    rag_service: RAGService = Depends(get_rag_service)
+):
     """
-    Get chat history for a specific user.
+    Streaming chat endpoint for the cocktail advisor.
     
-    In a production app, you'd implement persistent storage for chat history.
-    For this example, we'll return an empty list.
+    Sends Server-Sent Events: a `sources` event as soon as retrieval finishes,
+    a `token` event for every chunk generated by the LLM, then `done` (or `error`).
+    The session the turn was stored in is returned in the `X-Session-Id` header.
     
     Args:
-        user_id: Unique identifier for the user
+        request: The chat request with the new message and its session id
         
     Returns:
-        List of chat messages in the conversation history
+        A text/event-stream response
     """
+    last_user_message = _last_user_message(request)
+    session_id = _session_id(request)
+    
+    async def event_stream():
+        async for event in rag_service.stream_query(request.user_id, last_user_message, session_id):
+            yield _format_sse(event)
+    
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no", "X-Session-Id": session_id}
+    )
+
 
-    return []
\ No newline at end of file
+@router.post("/chat/batch")
+async def chat_batch(
+    request: BatchChatRequest,
+    rag_service: RAGService = Depends(get_rag_service)
+):
+    """
+    Batch endpoint for answering many independent queries in one request.
+    
+    Streams newline-delimited JSON, one line per item as soon as it is answered
+    (not in request order): {"index", "id", "response", "sources"}, or
+    {"index", "id", "error"} for an item that failed. Batch items do not use
+    or update conversation history and do not extract preferences.
+    
+    Args:
+        request: The items to answer and an optional generation concurrency
+        
+    Returns:
+        An application/x-ndjson response
+    """
+    if len(request.items) > BATCH_MAX_ITEMS:
+        raise HTTPException(status_code=413, detail=f"A batch may hold at most {BATCH_MAX_ITEMS} items")
+    
+    max_concurrency = min(request.max_concurrency or BATCH_LLM_CONCURRENCY, BATCH_LLM_CONCURRENCY)
+    items = [item.model_dump() for item in request.items]
+    
+    async def result_stream():
+        async for result in rag_service.process_batch(items, max_concurrency=max_concurrency):
+            yield json.dumps(result, default=str) + "\n"
+    
+    return StreamingResponse(result_stream(), media_type="application/x-ndjson")
+
+
+@router.get("/chat/history/{session_id}", response_model=List[ChatMessage])
+async def get_chat_history(
+    session_id: str,
+    session_store: SessionStore = Depends(get_session_store)
+):
+    """
+    Get the stored history of a conversation.
+    
+    Args:
+        session_id: Conversation identifier returned by the chat endpoints
+        
+    Returns:
+        The session's most recent messages, oldest first
+    """
+    history = await session_store.aget_history(session_id)
+    return [ChatMessage(role=turn["role"], content=turn["content"]) for turn in history]
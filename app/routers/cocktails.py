@@ -0,0 +1,35 @@
+from fastapi import APIRouter, Depends, HTTPException, Query
+from app.services.similarity_graph import SimilarityGraph
+from app.dependencies import get_similarity_graph
+from typing import Any, Dict, Optional
+
+router = APIRouter()
+
+
+@router.get("/cocktails/{name}/similar")
+async def similar_cocktails(
+    name: str,
+    limit: int = Query(5, ge=1, le=50),
+    similarity_graph: Optional[SimilarityGraph] = Depends(get_similarity_graph)
+) -> Dict[str, Any]:
+    """
+    Cocktails most similar to the named one, from the precomputed graph.
+    
+    Args:
+        name: Cocktail name, case-insensitive
+        limit: Maximum number of similar cocktails
+        
+    Returns:
+        The cocktail name and its neighbors with similarity scores
+    """
+    if similarity_graph is None:
+        raise HTTPException(
+            status_code=503,
+            detail="Similarity graph has not been built; run python -m app.tools.similarity_graph"
+        )
+    
+    neighbors = similarity_graph.neighbors(name, limit=limit)
+    if neighbors is None:
+        raise HTTPException(status_code=404, detail=f"Unknown cocktail: {name}")
+    
+    return {"name": name, "similar": neighbors}
@@ -0,0 +1,138 @@
+from typing import Any, Dict, Iterator, List
+import ast
+import csv
+import hashlib
+import json
+import logging
+import re
+
+logger = logging.getLogger(__name__)
+
+
+def _clean_text(value: str) -> str:
+    """Strip whitespace and the stray quotes some CSV descriptions are wrapped in."""
+    return (value or "").strip().strip('"').strip()
+
+
+def parse_ingredients(raw: str) -> List[str]:
+    """
+    Parse the stringified ingredient list stored in the CSV.
+
+    Args:
+        raw: Value such as "['Gin', 'Lemon Juice']"
+
+    Returns:
+        List of ingredient names
+    """
+    if not raw:
+        return []
+    try:
+        parsed = ast.literal_eval(raw)
+    except (ValueError, SyntaxError):
+        # Fall back to a plain comma separated list
+        parsed = raw.strip("[]").split(",")
+    if isinstance(parsed, str):
+        parsed = [parsed]
+    return [str(item).strip().strip("'\"").strip() for item in parsed if str(item).strip()]
+
+
+def iter_cocktails(path: str) -> Iterator[Dict[str, Any]]:
+    """
+    Stream cocktails from the catalog CSV one row at a time.
+
+    Args:
+        path: Path to cocktails_data.csv
+
+    Yields:
+        Dictionaries with name, category, alcoholic, ingredients and desc
+    """
+    with open(path, newline="", encoding="utf-8") as f:
+        for line_number, row in enumerate(csv.DictReader(f), start=2):
+            name = _clean_text(row.get("name"))
+            if not name:
+                logger.warning("Skipping catalog row %d without a name", line_number)
+                continue
+            yield {
+                "name": name,
+                "category": _clean_text(row.get("category")),
+                "alcoholic": _clean_text(row.get("alcoholic")),
+                "ingredients": parse_ingredients(row.get("ingredients", "")),
+                "desc": _clean_text(row.get("desc")),
+            }
+
+
+def load_cocktails(path: str) -> List[Dict[str, Any]]:
+    """Load the whole catalog CSV into memory."""
+    return list(iter_cocktails(path))
+
+
+def cocktail_id(name: str) -> str:
+    """Stable vector id for a cocktail, derived from its name."""
+    slug = re.sub(r"[^a-z0-9]+", "-", name.lower()).strip("-")
+    digest = hashlib.sha1(name.encode("utf-8")).hexdigest()[:8]
+    return f"cocktail-{slug}-{digest}"
+
+
+def cocktail_text(cocktail: Dict[str, Any]) -> str:
+    """Text that is embedded for a cocktail."""
+    return (
+        f"{cocktail['name']}. {cocktail['category']}. {cocktail['alcoholic']}. "
+        f"Ingredients: {', '.join(cocktail['ingredients'])}. {cocktail['desc']}"
+    )
+
+
+def ingredient_keys(ingredients: List[str]) -> List[str]:
+    """
+    Lowercased filter keys for a cocktail's ingredients.
+
+    Every run of consecutive words in a name is a key, so a filter on "rum"
+    matches "Light rum", one on "lime" matches "Lime juice" and one on
+    "lemon juice" matches "Fresh Lemon Juice".
+
+    Args:
+        ingredients: Ingredient names as listed in the catalog
+
+    Returns:
+        Sorted, deduplicated keys
+    """
+    keys = set()
+    for ingredient in ingredients:
+        words = ingredient.lower().split()
+        keys.update(
+            " ".join(words[start:end])
+            for start in range(len(words))
+            for end in range(start + 1, len(words) + 1)
+        )
+    return sorted(keys)
+
+
+def cocktail_metadata(cocktail: Dict[str, Any]) -> Dict[str, Any]:
+    """Metadata stored alongside a cocktail vector."""
+    return {
+        "name": cocktail["name"],
+        "category": cocktail["category"],
+        "alcoholic": cocktail["alcoholic"],
+        "ingredients": cocktail["ingredients"],
+        "desc": cocktail["desc"],
+        # Normalized copies used in metadata filters
+        "category_key": cocktail["category"].lower(),
+        "alcoholic_key": cocktail["alcoholic"].lower(),
+        "ingredient_keys": ingredient_keys(cocktail["ingredients"]),
+    }
+
+
+def row_hash(cocktail: Dict[str, Any]) -> str:
+    """Content hash of everything that ends up in a cocktail's vector or metadata."""
+    payload = json.dumps(
+        {"text": cocktail_text(cocktail), "metadata": cocktail_metadata(cocktail)},
+        sort_keys=True
+    )
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def catalog_version(row_hashes: Dict[str, str]) -> str:
+    """Fingerprint of a whole catalog, built from its per-row hashes."""
+    digest = hashlib.sha256()
+    for record_id in sorted(row_hashes):
+        digest.update(f"{record_id}:{row_hashes[record_id]}\n".encode("utf-8"))
+    return digest.hexdigest()
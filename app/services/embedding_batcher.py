@@ -0,0 +1,136 @@
+from concurrent.futures import Future
+from typing import Any, Dict, List, Tuple
+import logging
+import queue
+import threading
+import time
+
+from app.services.metrics import observe_embedding_batch
+
+logger = logging.getLogger(__name__)
+
+
+class EmbeddingBatcher:
+    """
+    Micro-batching scheduler for the sentence encoder.
+
+    Texts submitted from any thread or event loop are queued; a single worker
+    thread waits up to ``max_wait_ms`` after the first pending text (or until
+    ``max_batch_size`` texts are queued), runs one batched ``encode`` call and
+    resolves each caller's future with its own vector.
+    """
+
+    def __init__(self, model, max_batch_size: int = 32, max_wait_ms: float = 5.0):
+        self.model = model
+        self.max_batch_size = max(1, max_batch_size)
+        self.max_wait = max(0.0, max_wait_ms) / 1000.0
+
+        self._queue: "queue.Queue[Tuple[str, Future]]" = queue.Queue()
+        self._stopped = threading.Event()
+        self._stats_lock = threading.Lock()
+        self._batches = 0
+        self._items = 0
+        self._full_batches = 0
+        self._max_observed = 0
+
+        self._worker = threading.Thread(target=self._run, name="embedding-batcher", daemon=True)
+        self._worker.start()
+
+    def submit(self, text: str) -> Future:
+        """
+        Queue a text for encoding.
+
+        Args:
+            text: Text to embed
+
+        Returns:
+            Future resolving to the embedding as a list of floats
+        """
+        if self._stopped.is_set():
+            raise RuntimeError("EmbeddingBatcher has been stopped")
+        future: Future = Future()
+        self._queue.put((text, future))
+        return future
+
+    def encode(self, text: str) -> List[float]:
+        """Embed a text, blocking the calling thread until its batch has run."""
+        return self.submit(text).result()
+
+    def _collect_batch(self) -> List[Tuple[str, Future]]:
+        """Block for the first pending text, then gather more until the batch is full or the wait expires."""
+        try:
+            first = self._queue.get(timeout=0.5)
+        except queue.Empty:
+            return []
+
+        batch = [first]
+        deadline = time.monotonic() + self.max_wait
+        while len(batch) < self.max_batch_size:
+            remaining = deadline - time.monotonic()
+            try:
+                if remaining <= 0:
+                    batch.append(self._queue.get_nowait())
+                else:
+                    batch.append(self._queue.get(timeout=remaining))
+            except queue.Empty:
+                break
+        return batch
+
+    def _run(self):
+        """Worker loop: collect a batch, encode it once and fan the vectors back out."""
+        while not self._stopped.is_set() or not self._queue.empty():
+            batch = self._collect_batch()
+            if not batch:
+                continue
+
+            # Skip callers that gave up while waiting in the queue
+            batch = [(text, future) for text, future in batch if future.set_running_or_notify_cancel()]
+            if not batch:
+                continue
+
+            texts = [text for text, _ in batch]
+            try:
+                vectors = self.model.encode(texts, batch_size=len(texts))
+            except Exception as e:
+                logger.error("Error encoding batch of %d texts: %s", len(texts), e)
+                for _, future in batch:
+                    future.set_exception(e)
+                continue
+
+            self._record_batch(len(batch))
+            for (_, future), vector in zip(batch, vectors):
+                future.set_result(vector.tolist())
+
+    def _record_batch(self, size: int):
+        with self._stats_lock:
+            self._batches += 1
+            self._items += size
+            self._max_observed = max(self._max_observed, size)
+            if size >= self.max_batch_size:
+                self._full_batches += 1
+        observe_embedding_batch(size)
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        Report batching metrics.
+
+        Returns:
+            Dictionary with batch counts, average batch size and fill rate
+        """
+        with self._stats_lock:
+            average = self._items / self._batches if self._batches else 0.0
+            return {
+                "batches": self._batches,
+                "items": self._items,
+                "full_batches": self._full_batches,
+                "max_batch_size": self.max_batch_size,
+                "max_observed_batch_size": self._max_observed,
+                "average_batch_size": average,
+                "fill_rate": average / self.max_batch_size,
+                "pending": self._queue.qsize(),
+            }
+
+    def stop(self, timeout: float = 5.0):
+        """Stop accepting texts and let the worker drain the queue."""
+        self._stopped.set()
+        self._worker.join(timeout=timeout)
@@ -0,0 +1,225 @@
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Tuple
+import hashlib
+import json
+import logging
+import os
+import tempfile
+import threading
+import time
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+
+class EmbeddingCache:
+    """
+    Bounded, content-hashed cache of text embeddings.
+
+    Entries are evicted least-recently-used once ``max_entries`` is reached and
+    expire ``ttl_seconds`` after they were written. Vectors live in a fixed
+    ``(max_entries, dim)`` float32 slab; when ``path`` is given the slab is a
+    memory-mapped file and the key index is written next to it, so warm vectors
+    survive restarts.
+    """
+
+    def __init__(
+        self,
+        namespace: str,
+        dim: int,
+        max_entries: int = 10000,
+        ttl_seconds: float = 86400.0,
+        path: Optional[str] = None,
+        flush_every: int = 256
+    ):
+        self.namespace = namespace
+        self.dim = dim
+        self.max_entries = max(1, max_entries)
+        self.ttl_seconds = ttl_seconds
+        self.path = path
+        self.flush_every = flush_every
+
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        # key -> (slot, created_at); ordered from least to most recently used
+        self._entries: "OrderedDict[str, Tuple[int, float]]" = OrderedDict()
+        self._free_slots: List[int] = []
+        self._dirty_writes = 0
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+        if path:
+            self._vectors = self._open_mmap(path)
+        else:
+            self._vectors = np.zeros((self.max_entries, dim), dtype=np.float32)
+            self._free_slots = list(range(self.max_entries - 1, -1, -1))
+
+    @property
+    def _index_path(self) -> str:
+        return f"{self.path}.index.json"
+
+    def _open_mmap(self, path: str) -> np.memmap:
+        """Open (or create) the vector slab and restore the key index written by flush()."""
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        expected_bytes = self.max_entries * self.dim * 4
+
+        index = None
+        if os.path.exists(path) and os.path.getsize(path) == expected_bytes and os.path.exists(self._index_path):
+            try:
+                with open(self._index_path, "r", encoding="utf-8") as f:
+                    index = json.load(f)
+                if index.get("namespace") != self.namespace or index.get("dim") != self.dim:
+                    logger.info("Embedding cache at %s was built for a different model, discarding it", path)
+                    index = None
+            except (OSError, ValueError) as e:
+                logger.warning("Could not read embedding cache index %s: %s", self._index_path, e)
+                index = None
+
+        mode = "r+" if index is not None else "w+"
+        vectors = np.memmap(path, dtype=np.float32, mode=mode, shape=(self.max_entries, self.dim))
+
+        used = set()
+        if index is not None:
+            now = time.time()
+            for key, slot, created_at in index.get("entries", []):
+                if now - created_at > self.ttl_seconds or slot in used or not 0 <= slot < self.max_entries:
+                    continue
+                self._entries[key] = (slot, created_at)
+                used.add(slot)
+            logger.info("Loaded %d cached embeddings from %s", len(self._entries), path)
+        self._free_slots = [slot for slot in range(self.max_entries - 1, -1, -1) if slot not in used]
+        return vectors
+
+    def _key(self, text: str) -> str:
+        return hashlib.sha256(f"{self.namespace}\0{text}".encode("utf-8")).hexdigest()
+
+    def get(self, text: str) -> Optional[List[float]]:
+        """
+        Look up the embedding for a text.
+
+        Args:
+            text: Text that was embedded
+
+        Returns:
+            The cached vector, or None on a miss or expired entry
+        """
+        key = self._key(text)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+
+            slot, created_at = entry
+            if time.time() - created_at > self.ttl_seconds:
+                del self._entries[key]
+                self._free_slots.append(slot)
+                self.expirations += 1
+                self.misses += 1
+                return None
+
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return self._vectors[slot].tolist()
+
+    def put(self, text: str, vector: List[float]):
+        """
+        Store the embedding for a text, evicting the least recently used entry if full.
+
+        Writes into the slab and may flush it to disk, so async callers should
+        run it on a worker thread.
+
+        Args:
+            text: Text that was embedded
+            vector: Its embedding
+        """
+        self.put_many([(text, vector)])
+
+    def put_many(self, items: List[Tuple[str, List[float]]]):
+        """
+        Store several embeddings under one lock, flushing at most once.
+
+        Args:
+            items: (text, embedding) pairs
+        """
+        with self._lock:
+            now = time.time()
+            for text, vector in items:
+                key = self._key(text)
+                entry = self._entries.pop(key, None)
+                if entry is not None:
+                    slot = entry[0]
+                elif self._free_slots:
+                    slot = self._free_slots.pop()
+                else:
+                    _, (slot, _) = self._entries.popitem(last=False)
+                    self.evictions += 1
+
+                self._vectors[slot] = vector
+                self._entries[key] = (slot, now)
+
+            self._dirty_writes += len(items)
+            should_flush = self.path and self._dirty_writes >= self.flush_every
+
+        if should_flush:
+            self.flush()
+
+    def flush(self):
+        """Persist the vector slab and key index when backed by a file."""
+        if not self.path:
+            return
+        # Serialized so an older snapshot never replaces a newer one
+        with self._flush_lock:
+            with self._lock:
+                self._vectors.flush()
+                index = {
+                    "namespace": self.namespace,
+                    "dim": self.dim,
+                    "entries": [[key, slot, created_at] for key, (slot, created_at) in self._entries.items()],
+                }
+                self._dirty_writes = 0
+
+            # A temp file of its own, so flushes from other processes sharing the path cannot interleave
+            tmp_path = None
+            try:
+                with tempfile.NamedTemporaryFile(
+                    "w", encoding="utf-8", dir=os.path.dirname(os.path.abspath(self._index_path)),
+                    prefix=f"{os.path.basename(self._index_path)}.", suffix=".tmp", delete=False
+                ) as f:
+                    tmp_path = f.name
+                    json.dump(index, f)
+                os.replace(tmp_path, self._index_path)
+            except OSError as e:
+                logger.error("Failed to persist embedding cache index: %s", e)
+                if tmp_path is not None and os.path.exists(tmp_path):
+                    os.unlink(tmp_path)
+
+    def clear(self):
+        """Drop every cached embedding."""
+        with self._lock:
+            self._entries.clear()
+            self._free_slots = list(range(self.max_entries - 1, -1, -1))
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        Report cache metrics.
+
+        Returns:
+            Dictionary with size, hit/miss counters and hit rate
+        """
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "size": len(self._entries),
+                "max_entries": self.max_entries,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "expirations": self.expirations,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+                "persistent": bool(self.path),
+            }
@@ -0,0 +1,278 @@
+from typing import Any, Dict, List, Tuple, Union
+import json
+import logging
+import os
+import socket
+import struct
+import threading
+
+import numpy as np
+
+from app.config import (
+    EMBEDDING_MODEL,
+    EMBEDDING_SERVER_BACKEND,
+    EMBEDDING_SERVER_SOCKET,
+    EMBEDDING_SERVER_TIMEOUT_SECONDS,
+    ENCODER_BACKEND,
+    ONNX_MODEL_DIR,
+    ONNX_QUANTIZED,
+    ONNX_THREADS
+)
+
+logger = logging.getLogger(__name__)
+
+# Files written by python -m app.tools.export_onnx
+ONNX_FP32_FILE = "model.onnx"
+ONNX_INT8_FILE = "model_int8.onnx"
+TOKENIZER_FILE = "tokenizer.json"
+ENCODER_INFO_FILE = "encoder.json"
+
+# Embedding sidecar wire format: every message is a 4-byte big-endian length and a JSON
+# header; an encode reply is followed by a second length-prefixed frame holding the
+# vectors as little-endian float32, one row per text
+FRAME_HEADER = struct.Struct("!I")
+MAX_FRAME_BYTES = 64 * 1024 * 1024
+
+
+class OnnxEncoder:
+    """
+    Sentence encoder running an exported transformer graph on onnxruntime.
+
+    Reproduces the SentenceTransformer pipeline of the exported model
+    (tokenize, transformer, mean pooling over the attention mask, L2
+    normalization) with only onnxruntime, tokenizers and NumPy, so serving
+    does not need torch. Exposes the same ``encode`` and
+    ``get_sentence_embedding_dimension`` methods the services use.
+    """
+
+    def __init__(self, model_dir: str, quantized: bool = True, threads: int = 0):
+        try:
+            import onnxruntime as ort
+            from tokenizers import Tokenizer
+        except ImportError as e:
+            raise RuntimeError("The onnx encoder backend needs onnxruntime and tokenizers installed") from e
+
+        info_path = os.path.join(model_dir, ENCODER_INFO_FILE)
+        if not os.path.exists(info_path):
+            raise RuntimeError(f"No exported encoder in {model_dir}; run python -m app.tools.export_onnx first")
+        with open(info_path, "r", encoding="utf-8") as f:
+            self.info = json.load(f)
+
+        self.max_length = self.info["max_length"]
+        self.dim = self.info["dim"]
+        self.normalize = self.info.get("normalize", True)
+
+        self.tokenizer = Tokenizer.from_file(os.path.join(model_dir, TOKENIZER_FILE))
+        self.tokenizer.enable_truncation(max_length=self.max_length)
+        self.tokenizer.enable_padding(pad_id=self.info.get("pad_token_id", 0))
+
+        options = ort.SessionOptions()
+        options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        if threads > 0:
+            options.intra_op_num_threads = threads
+        model_path = os.path.join(model_dir, ONNX_INT8_FILE if quantized else ONNX_FP32_FILE)
+        self.session = ort.InferenceSession(model_path, sess_options=options, providers=["CPUExecutionProvider"])
+        self.input_names = {node.name for node in self.session.get_inputs()}
+        logger.info("Loaded ONNX encoder %s", model_path)
+
+    def get_sentence_embedding_dimension(self) -> int:
+        return self.dim
+
+    def _encode_batch(self, texts: List[str]) -> np.ndarray:
+        encodings = self.tokenizer.encode_batch(texts)
+        input_ids = np.asarray([encoding.ids for encoding in encodings], dtype=np.int64)
+        attention_mask = np.asarray([encoding.attention_mask for encoding in encodings], dtype=np.int64)
+        feeds = {"input_ids": input_ids, "attention_mask": attention_mask}
+        if "token_type_ids" in self.input_names:
+            feeds["token_type_ids"] = np.asarray([encoding.type_ids for encoding in encodings], dtype=np.int64)
+
+        token_embeddings = self.session.run(None, feeds)[0]
+        mask = attention_mask[..., None].astype(np.float32)
+        embeddings = (token_embeddings * mask).sum(axis=1) / np.clip(mask.sum(axis=1), 1e-9, None)
+        if self.normalize:
+            embeddings /= np.clip(np.linalg.norm(embeddings, axis=1, keepdims=True), 1e-12, None)
+        return embeddings.astype(np.float32)
+
+    def encode(self, texts: Union[str, List[str]], batch_size: int = 32, **kwargs) -> np.ndarray:
+        """
+        Embed one text or a list of texts.
+
+        Args:
+            texts: A text, or a list of texts
+            batch_size: Texts per forward pass
+
+        Returns:
+            One vector for a single text, otherwise an array with one row per text
+        """
+        single = isinstance(texts, str)
+        if single:
+            texts = [texts]
+        if not texts:
+            return np.zeros((0, self.dim), dtype=np.float32)
+        batch_size = max(1, batch_size)
+        embeddings = np.concatenate(
+            [self._encode_batch(list(texts[i:i + batch_size])) for i in range(0, len(texts), batch_size)]
+        )
+        return embeddings[0] if single else embeddings
+
+
+class RemoteEncoder:
+    """
+    Client for the embedding sidecar (python -m app.tools.embedding_server).
+
+    The sidecar owns the model and batches texts from every worker on the
+    host, so a worker using this encoder never loads torch or the weights.
+    Each thread keeps its own connection; a broken connection is reopened
+    once before the error is raised. Large inputs are sent in requests of
+    the sidecar's batch size, so the per-request timeout covers about one
+    forward pass whatever the input size.
+    """
+
+    # The sidecar micro-batches across workers; callers should not batch again
+    batches_requests = True
+
+    def __init__(self, socket_path: str = EMBEDDING_SERVER_SOCKET, timeout: float = EMBEDDING_SERVER_TIMEOUT_SECONDS):
+        self.socket_path = socket_path
+        self.timeout = timeout
+        self._local = threading.local()
+        try:
+            self.info = self._request({"op": "info"})[0]
+        except OSError as e:
+            raise RuntimeError(
+                f"Embedding server unreachable at {socket_path}; start python -m app.tools.embedding_server"
+            ) from e
+        self.dim = self.info["dim"]
+        self.max_request_texts = max(1, int(self.info.get("max_batch_size", 32)))
+        logger.info("Using embedding server %s (%s)", socket_path, self.info.get("namespace"))
+
+    def get_sentence_embedding_dimension(self) -> int:
+        return self.dim
+
+    @property
+    def namespace(self) -> str:
+        """Namespace of the vectors the sidecar produces (its model and backend)."""
+        return self.info["namespace"]
+
+    def _connection(self) -> socket.socket:
+        connection = getattr(self._local, "connection", None)
+        if connection is None:
+            connection = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            connection.settimeout(self.timeout)
+            try:
+                connection.connect(self.socket_path)
+            except OSError:
+                connection.close()
+                raise
+            self._local.connection = connection
+        return connection
+
+    def _drop_connection(self):
+        connection = getattr(self._local, "connection", None)
+        self._local.connection = None
+        if connection is not None:
+            connection.close()
+
+    def _read_frame(self, connection: socket.socket) -> bytes:
+        size = FRAME_HEADER.unpack(self._read_exactly(connection, FRAME_HEADER.size))[0]
+        if size > MAX_FRAME_BYTES:
+            raise ConnectionError(f"Embedding server frame of {size} bytes exceeds the limit")
+        return self._read_exactly(connection, size)
+
+    @staticmethod
+    def _read_exactly(connection: socket.socket, size: int) -> bytes:
+        buffer = bytearray()
+        while len(buffer) < size:
+            chunk = connection.recv(size - len(buffer))
+            if not chunk:
+                raise ConnectionError("Embedding server closed the connection")
+            buffer.extend(chunk)
+        return bytes(buffer)
+
+    def _request(self, payload: Dict[str, Any]) -> Tuple[Dict[str, Any], bytes]:
+        """Send one request and return the reply header and the vector frame (if any)."""
+        message = json.dumps(payload).encode("utf-8")
+        for attempt in range(2):
+            try:
+                connection = self._connection()
+                connection.sendall(FRAME_HEADER.pack(len(message)) + message)
+                header = json.loads(self._read_frame(connection))
+                body = self._read_frame(connection) if header.get("count") else b""
+                break
+            except socket.timeout:
+                # A slow server is not helped by sending the request again
+                self._drop_connection()
+                raise
+            except OSError:
+                # Server restarted or the connection went stale; reconnect once
+                self._drop_connection()
+                if attempt:
+                    raise
+        if "error" in header:
+            raise RuntimeError(f"Embedding server error: {header['error']}")
+        return header, body
+
+    def encode(self, texts: Union[str, List[str]], batch_size: int = 32, **kwargs) -> np.ndarray:
+        """
+        Embed one text or a list of texts on the embedding server.
+
+        Args:
+            texts: A text, or a list of texts
+            batch_size: Ignored; requests follow the sidecar's batch size
+
+        Returns:
+            One vector for a single text, otherwise an array with one row per text
+        """
+        single = isinstance(texts, str)
+        if single:
+            texts = [texts]
+        if not texts:
+            return np.zeros((0, self.dim), dtype=np.float32)
+        chunks = []
+        for start in range(0, len(texts), self.max_request_texts):
+            header, body = self._request({"op": "encode", "texts": list(texts[start:start + self.max_request_texts])})
+            chunks.append(np.frombuffer(body, dtype="<f4").reshape(header["count"], header["dim"]))
+        embeddings = chunks[0] if len(chunks) == 1 else np.concatenate(chunks)
+        return embeddings[0] if single else embeddings
+
+    def close(self):
+        self._drop_connection()
+
+
+def encoder_namespace(model_name: str = EMBEDDING_MODEL, backend: str = ENCODER_BACKEND, quantized: bool = ONNX_QUANTIZED) -> str:
+    """Key identifying the vectors an encoder produces, e.g. for embedding caches."""
+    if backend == "remote":
+        backend = EMBEDDING_SERVER_BACKEND
+    if backend == "onnx":
+        return f"{model_name}#onnx-{'int8' if quantized else 'fp32'}"
+    return model_name
+
+
+def create_encoder(model_name: str = EMBEDDING_MODEL, backend: str = ENCODER_BACKEND):
+    """
+    Load the sentence encoder used for cocktails, queries and memories.
+
+    Args:
+        model_name: Hugging Face model id
+        backend: "torch" (SentenceTransformer in fp32), "onnx" (the graph
+            exported by app.tools.export_onnx, int8 unless ONNX_QUANTIZED is false)
+            or "remote" (the embedding sidecar at EMBEDDING_SERVER_SOCKET)
+
+    Returns:
+        An encoder exposing ``encode(texts, batch_size=...)``
+    """
+    if backend == "onnx":
+        encoder = OnnxEncoder(ONNX_MODEL_DIR, quantized=ONNX_QUANTIZED, threads=ONNX_THREADS)
+        if encoder.info.get("model") != model_name:
+            raise RuntimeError(f"ONNX encoder in {ONNX_MODEL_DIR} was exported from {encoder.info.get('model')}, not {model_name}")
+        return encoder
+    if backend == "remote":
+        encoder = RemoteEncoder(EMBEDDING_SERVER_SOCKET, timeout=EMBEDDING_SERVER_TIMEOUT_SECONDS)
+        if encoder.info.get("model") != model_name:
+            raise RuntimeError(f"Embedding server at {EMBEDDING_SERVER_SOCKET} serves {encoder.info.get('model')}, not {model_name}")
+        return encoder
+    if backend != "torch":
+        raise ValueError(f"Unknown encoder backend: {backend}")
+
+    from sentence_transformers import SentenceTransformer
+
+    return SentenceTransformer(model_name)
@@ -0,0 +1,117 @@
+from collections import deque
+from typing import Any, Dict, Iterable, List, NamedTuple, Tuple
+
+
+class KeywordMatch(NamedTuple):
+    start: int
+    end: int
+    term: str
+    values: Tuple[Any, ...]
+
+
+def _is_word_char(char: str) -> bool:
+    return char.isalnum() or char in "'’"
+
+
+class KeywordMatcher:
+    """
+    Case-insensitive Aho–Corasick automaton over a fixed vocabulary.
+
+    Every term maps to one or more values; a scan of the text reports all
+    whole-word occurrences in a single pass, independent of vocabulary size.
+    """
+
+    def __init__(self, terms: Iterable[Tuple[str, Any]] = ()):
+        # Trie nodes: outgoing edges, failure link and terms ending at the node
+        self._goto: List[Dict[str, int]] = [{}]
+        self._fail: List[int] = [0]
+        self._output: List[List[str]] = [[]]
+        self._values: Dict[str, List[Any]] = {}
+        self._built = False
+        for term, value in terms:
+            self.add(term, value)
+        self.build()
+
+    def __len__(self) -> int:
+        return len(self._values)
+
+    def add(self, term: str, value: Any):
+        """Register a term; building is deferred until build() or the next scan."""
+        key = " ".join(term.lower().split())
+        if not key:
+            return
+        values = self._values.setdefault(key, [])
+        if value not in values:
+            values.append(value)
+
+        node = 0
+        for char in key:
+            next_node = self._goto[node].get(char)
+            if next_node is None:
+                next_node = len(self._goto)
+                self._goto[node][char] = next_node
+                self._goto.append({})
+                self._fail.append(0)
+                self._output.append([])
+            node = next_node
+        if key not in self._output[node]:
+            self._output[node].append(key)
+        self._built = False
+
+    def build(self):
+        """Compute failure links breadth-first."""
+        queue = deque()
+        for child in self._goto[0].values():
+            self._fail[child] = 0
+            queue.append(child)
+        while queue:
+            node = queue.popleft()
+            for char, child in self._goto[node].items():
+                queue.append(child)
+                fallback = self._fail[node]
+                while fallback and char not in self._goto[fallback]:
+                    fallback = self._fail[fallback]
+                self._fail[child] = self._goto[fallback].get(char, 0)
+                self._output[child] = self._output[child] + [
+                    term for term in self._output[self._fail[child]] if term not in self._output[child]
+                ]
+        self._built = True
+
+    def find_all(self, text: str) -> List[KeywordMatch]:
+        """
+        Find every whole-word vocabulary term in the text.
+
+        Args:
+            text: Text to scan
+
+        Returns:
+            Matches ordered by start position, overlaps included
+        """
+        if not self._built:
+            self.build()
+        normalized = text.lower()
+        matches = []
+        node = 0
+        for position, char in enumerate(normalized):
+            while node and char not in self._goto[node]:
+                node = self._fail[node]
+            node = self._goto[node].get(char, 0)
+            for term in self._output[node]:
+                start = position - len(term) + 1
+                end = position + 1
+                # Only keep whole-word occurrences
+                if start > 0 and _is_word_char(normalized[start - 1]):
+                    continue
+                if end < len(normalized) and _is_word_char(normalized[end]):
+                    continue
+                matches.append(KeywordMatch(start, end, term, tuple(self._values[term])))
+        matches.sort(key=lambda match: (match.start, -match.end))
+        return matches
+
+    def find_longest(self, text: str) -> List[KeywordMatch]:
+        """Find whole-word terms, keeping only the longest of any overlapping matches."""
+        selected = []
+        for match in sorted(self.find_all(text), key=lambda m: (-(m.end - m.start), m.start)):
+            if all(match.end <= other.start or match.start >= other.end for other in selected):
+                selected.append(match)
+        return sorted(selected, key=lambda match: match.start)
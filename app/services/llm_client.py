@@ -0,0 +1,431 @@
+from collections import deque
+from typing import Any, AsyncIterator, Dict, List, Optional
+import asyncio
+import json
+import logging
+import random
+import time
+
+import httpx
+import numpy as np
+
+from app.services.metrics import observe_llm_attempt, observe_llm_hedge, observe_llm_queue_wait
+
+logger = logging.getLogger(__name__)
+
+# Upstream statuses worth another attempt; other 4xx responses are final
+RETRYABLE_STATUS = {408, 409, 425, 429, 500, 502, 503, 504}
+
+
+class LLMError(Exception):
+    """An LLM call failed; ``retryable`` tells whether another attempt might succeed."""
+
+    def __init__(self, message: str, retryable: bool = False, retry_after: Optional[float] = None):
+        super().__init__(message)
+        self.retryable = retryable
+        self.retry_after = retry_after
+
+
+class LLMTimeoutError(LLMError):
+    """The call did not finish before its deadline."""
+
+    def __init__(self, message: str):
+        super().__init__(message, retryable=True)
+
+
+class RetryBudget:
+    """
+    Caps retries (and hedges) at a fraction of recent call volume.
+
+    Each call deposits ``ratio`` tokens and each retry withdraws one, so an
+    upstream outage causes at most ``ratio`` extra load instead of
+    multiplying it by the retry count. ``min_tokens`` lets a quiet service
+    still retry the occasional failure.
+    """
+
+    def __init__(self, ratio: float = 0.1, min_tokens: float = 10.0):
+        self.ratio = ratio
+        self.max_tokens = max(min_tokens, 1.0)
+        self._tokens = self.max_tokens
+
+    def deposit(self):
+        self._tokens = min(self.max_tokens, self._tokens + self.ratio)
+
+    def withdraw(self) -> bool:
+        if self._tokens < 1.0:
+            return False
+        self._tokens -= 1.0
+        return True
+
+    @property
+    def tokens(self) -> float:
+        return self._tokens
+
+
+class LatencyTracker:
+    """Rolling window of successful call latencies, used to time hedged requests."""
+
+    def __init__(self, window: int = 200):
+        self._samples = deque(maxlen=window)
+
+    def add(self, seconds: float):
+        self._samples.append(seconds)
+
+    def percentile(self, q: float, min_samples: int) -> Optional[float]:
+        if len(self._samples) < min_samples:
+            return None
+        return float(np.percentile(np.fromiter(self._samples, dtype=float), q))
+
+
+class LLMClient:
+    """
+    Resilient client for an OpenAI-compatible chat completions API.
+
+    One pooled ``httpx.AsyncClient`` is shared by every call, so connections
+    and TLS sessions are reused. Each call has an overall deadline, and
+    retryable failures (timeouts, connection errors, 429 and 5xx) are retried
+    with full-jitter exponential backoff while the retry budget allows. A
+    semaphore bounds the calls in flight; time spent waiting for it is
+    recorded. With hedging enabled, a non-streaming call that is still
+    running after the recent latency percentile gets a second, identical
+    request, and whichever finishes first is used.
+    """
+
+    def __init__(
+        self,
+        base_url: str,
+        api_key: Optional[str],
+        model: str,
+        timeout: float = 30.0,
+        connect_timeout: float = 5.0,
+        max_retries: int = 2,
+        backoff_base: float = 0.2,
+        backoff_max: float = 2.0,
+        retry_budget: Optional[RetryBudget] = None,
+        max_concurrency: int = 16,
+        max_connections: int = 32,
+        hedge_enabled: bool = False,
+        hedge_percentile: float = 95.0,
+        hedge_min_samples: int = 20,
+        transport: Optional[httpx.AsyncBaseTransport] = None
+    ):
+        self.model = model
+        self.timeout = timeout
+        self.max_retries = max(0, max_retries)
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.retry_budget = retry_budget or RetryBudget()
+        self.max_concurrency = max(1, max_concurrency)
+        self.hedge_enabled = hedge_enabled
+        self.hedge_percentile = hedge_percentile
+        self.hedge_min_samples = hedge_min_samples
+        self.latencies = LatencyTracker()
+
+        headers = {"Content-Type": "application/json"}
+        if api_key:
+            headers["Authorization"] = f"Bearer {api_key}"
+        self._http = httpx.AsyncClient(
+            base_url=base_url.rstrip("/"),
+            headers=headers,
+            # Per-attempt timeouts are enforced against the call deadline; these only bound the socket operations
+            timeout=httpx.Timeout(timeout, connect=connect_timeout),
+            limits=httpx.Limits(max_connections=max_connections, max_keepalive_connections=max_connections),
+            transport=transport
+        )
+        self._semaphore = asyncio.Semaphore(self.max_concurrency)
+        self._in_flight = 0
+        self._waiting = 0
+        self._calls = 0
+        self._retries = 0
+        self._retries_denied = 0
+        self._hedges = 0
+        self._hedge_wins = 0
+        self._timeouts = 0
+
+    def _payload(self, messages: List[Dict[str, str]], stream: bool, **params) -> Dict[str, Any]:
+        payload = {"model": self.model, "messages": messages, **params}
+        if stream:
+            payload["stream"] = True
+        return payload
+
+    async def _acquire(self):
+        """Take a concurrency slot, recording how long the call queued for it."""
+        started = time.perf_counter()
+        self._waiting += 1
+        try:
+            await self._semaphore.acquire()
+        finally:
+            self._waiting -= 1
+        observe_llm_queue_wait(time.perf_counter() - started)
+        self._in_flight += 1
+
+    def _release(self):
+        self._in_flight -= 1
+        self._semaphore.release()
+
+    def _backoff(self, attempt: int, error: LLMError) -> float:
+        delay = random.uniform(0.0, min(self.backoff_max, self.backoff_base * (2 ** attempt)))
+        if error.retry_after is not None:
+            delay = max(delay, error.retry_after)
+        return delay
+
+    @staticmethod
+    def _raise_for_status(response: httpx.Response):
+        if response.status_code < 400:
+            return
+        retry_after = None
+        if response.headers.get("Retry-After"):
+            try:
+                retry_after = float(response.headers["Retry-After"])
+            except ValueError:
+                pass
+        raise LLMError(
+            f"LLM upstream returned HTTP {response.status_code}: {response.text[:200]}",
+            retryable=response.status_code in RETRYABLE_STATUS,
+            retry_after=retry_after
+        )
+
+    async def _post(self, payload: Dict[str, Any]) -> Dict[str, Any]:
+        """One HTTP attempt, holding a concurrency slot for its duration."""
+        await self._acquire()
+        started = time.perf_counter()
+        outcome = "error"
+        try:
+            response = await self._http.post("/chat/completions", json=payload)
+            self._raise_for_status(response)
+            body = response.json()
+            outcome = "ok"
+            self.latencies.add(time.perf_counter() - started)
+            return body
+        except asyncio.CancelledError:
+            outcome = "cancelled"
+            raise
+        except httpx.TimeoutException as e:
+            outcome = "timeout"
+            raise LLMTimeoutError(f"LLM request timed out: {e}") from e
+        except httpx.TransportError as e:
+            raise LLMError(f"LLM connection failed: {e}", retryable=True) from e
+        finally:
+            observe_llm_attempt(outcome, time.perf_counter() - started)
+            self._release()
+
+    async def _hedged_post(self, payload: Dict[str, Any]) -> Dict[str, Any]:
+        """Send the request, and a duplicate if it outlives the hedge delay; return the first success."""
+        delay = self.latencies.percentile(self.hedge_percentile, self.hedge_min_samples) if self.hedge_enabled else None
+        primary = asyncio.ensure_future(self._post(payload))
+        tasks = [primary]
+        try:
+            if delay is None:
+                return await primary
+
+            done, _ = await asyncio.wait({primary}, timeout=delay)
+            # Only hedge when a slot is free and the retry budget allows the extra load
+            if done or self._semaphore.locked() or not self.retry_budget.withdraw():
+                return await primary
+
+            self._hedges += 1
+            observe_llm_hedge("launched")
+            hedge = asyncio.ensure_future(self._post(payload))
+            tasks.append(hedge)
+            pending = set(tasks)
+            error = None
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is None:
+                        if task is hedge:
+                            self._hedge_wins += 1
+                            observe_llm_hedge("won")
+                        return task.result()
+                    error = task.exception()
+            raise error
+        finally:
+            # Also runs when the caller is cancelled (client disconnect, batch deadline):
+            # an orphaned request would keep its concurrency slot and retry budget
+            unfinished = [task for task in tasks if not task.done()]
+            for task in unfinished:
+                task.cancel()
+            if unfinished:
+                await asyncio.gather(*unfinished, return_exceptions=True)
+            for task in tasks:
+                # The loser's failure is expected; retrieve it so asyncio does not log it
+                _discard_result(task)
+
+    async def _with_deadline(self, coro, deadline: float):
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            coro.close()
+            raise LLMTimeoutError(f"LLM call exceeded its {self.timeout:.1f}s deadline")
+        try:
+            return await asyncio.wait_for(coro, timeout=remaining)
+        except asyncio.TimeoutError as e:
+            raise LLMTimeoutError(f"LLM call exceeded its {self.timeout:.1f}s deadline") from e
+
+    async def _sleep_before_retry(self, attempt: int, error: LLMError, deadline: float) -> bool:
+        """Wait out the backoff if a retry is allowed and fits the deadline; False means give up."""
+        if not error.retryable or attempt >= self.max_retries:
+            return False
+        delay = self._backoff(attempt, error)
+        if time.monotonic() + delay >= deadline:
+            return False
+        if not self.retry_budget.withdraw():
+            self._retries_denied += 1
+            logger.warning("LLM retry budget exhausted, not retrying: %s", error)
+            return False
+        self._retries += 1
+        logger.info("Retrying LLM call in %.2fs after: %s", delay, error)
+        await asyncio.sleep(delay)
+        return True
+
+    async def complete(self, messages: List[Dict[str, str]], timeout: Optional[float] = None, **params) -> Dict[str, Any]:
+        """
+        Run a chat completion with deadline, retries and optional hedging.
+
+        Args:
+            messages: Chat messages as {"role": ..., "content": ...}
+            timeout: Deadline for the whole call including retries (default: client timeout)
+            **params: Extra request fields, e.g. temperature or max_tokens
+
+        Returns:
+            Dictionary with "content" and "usage" ({"input_tokens", "output_tokens"} or None)
+
+        Raises:
+            LLMError: The call failed and was not (or no longer) retryable
+            LLMTimeoutError: The deadline passed
+        """
+        self._calls += 1
+        self.retry_budget.deposit()
+        deadline = time.monotonic() + (timeout or self.timeout)
+        payload = self._payload(messages, stream=False, **params)
+        attempt = 0
+        while True:
+            try:
+                body = await self._with_deadline(self._hedged_post(payload), deadline)
+                return {"content": body["choices"][0]["message"]["content"] or "", "usage": _usage(body)}
+            except LLMError as e:
+                if isinstance(e, LLMTimeoutError):
+                    self._timeouts += 1
+                if not await self._sleep_before_retry(attempt, e, deadline):
+                    raise
+                attempt += 1
+
+    async def stream(self, messages: List[Dict[str, str]], timeout: Optional[float] = None, **params) -> AsyncIterator[Dict[str, Any]]:
+        """
+        Stream a chat completion.
+
+        Failures before the first chunk are retried like complete(); once
+        text has been yielded the call can no longer be replayed, so later
+        failures are raised. Streams are never hedged.
+
+        Args:
+            messages: Chat messages as {"role": ..., "content": ...}
+            timeout: Deadline for the whole call including retries (default: client timeout)
+            **params: Extra request fields
+
+        Yields:
+            {"content": "..."} per text chunk, then {"usage": ...} if the upstream reports it
+        """
+        self._calls += 1
+        self.retry_budget.deposit()
+        deadline = time.monotonic() + (timeout or self.timeout)
+        payload = self._payload(messages, stream=True, **params)
+        attempt = 0
+        while True:
+            yielded = False
+            try:
+                async for event in self._stream_attempt(payload, deadline):
+                    yielded = yielded or "content" in event
+                    yield event
+                return
+            except LLMError as e:
+                if isinstance(e, LLMTimeoutError):
+                    self._timeouts += 1
+                if yielded or not await self._sleep_before_retry(attempt, e, deadline):
+                    raise
+                attempt += 1
+
+    async def _stream_attempt(self, payload: Dict[str, Any], deadline: float) -> AsyncIterator[Dict[str, Any]]:
+        await self._acquire()
+        started = time.perf_counter()
+        outcome = "error"
+        try:
+            async with self._http.stream("POST", "/chat/completions", json=payload) as response:
+                if response.status_code >= 400:
+                    await response.aread()
+                    self._raise_for_status(response)
+                lines = response.aiter_lines()
+                while True:
+                    line = await self._with_deadline(_next_line(lines), deadline)
+                    if line is None:
+                        break
+                    if not line.startswith("data:"):
+                        continue
+                    data = line[5:].strip()
+                    if data == "[DONE]":
+                        break
+                    chunk = json.loads(data)
+                    choices = chunk.get("choices") or []
+                    content = (choices[0].get("delta") or {}).get("content") if choices else None
+                    if content:
+                        yield {"content": content}
+                    if chunk.get("usage"):
+                        yield {"usage": _usage(chunk)}
+            outcome = "ok"
+            self.latencies.add(time.perf_counter() - started)
+        except asyncio.CancelledError:
+            outcome = "cancelled"
+            raise
+        except httpx.TimeoutException as e:
+            outcome = "timeout"
+            raise LLMTimeoutError(f"LLM stream timed out: {e}") from e
+        except httpx.TransportError as e:
+            raise LLMError(f"LLM connection failed: {e}", retryable=True) from e
+        except LLMTimeoutError:
+            outcome = "timeout"
+            raise
+        finally:
+            observe_llm_attempt(outcome, time.perf_counter() - started)
+            self._release()
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        Report client metrics.
+
+        Returns:
+            Dictionary with calls in flight and queued, retry, hedge and timeout counts
+        """
+        return {
+            "in_flight": self._in_flight,
+            "queued": self._waiting,
+            "max_concurrency": self.max_concurrency,
+            "calls": self._calls,
+            "retries": self._retries,
+            "retries_denied": self._retries_denied,
+            "retry_budget_tokens": self.retry_budget.tokens,
+            "hedges": self._hedges,
+            "hedge_wins": self._hedge_wins,
+            "timeouts": self._timeouts,
+        }
+
+    async def aclose(self):
+        await self._http.aclose()
+
+
+def _discard_result(task: asyncio.Task):
+    if not task.cancelled():
+        task.exception()
+
+
+async def _next_line(lines: AsyncIterator[str]) -> Optional[str]:
+    """Next line of a streamed response, or None at the end."""
+    try:
+        return await lines.__anext__()
+    except StopAsyncIteration:
+        return None
+
+
+def _usage(body: Dict[str, Any]) -> Optional[Dict[str, int]]:
+    usage = body.get("usage")
+    if not usage:
+        return None
+    return {"input_tokens": usage.get("prompt_tokens", 0), "output_tokens": usage.get("completion_tokens", 0)}
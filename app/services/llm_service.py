@@ -1,92 +1,174 @@
-from langchain_together import ChatTogether
-from langchain.prompts import PromptTemplate
-from langchain.schema import HumanMessage, SystemMessage, AIMessage
-from app.config import TOGETHER_API_KEY, DEFAULT_LLM_MODEL
-import asyncio
+from app.config import (
+    TOGETHER_API_KEY,
+    DEFAULT_LLM_MODEL,
+    LLM_BASE_URL,
+    LLM_TIMEOUT_SECONDS,
+    LLM_CONNECT_TIMEOUT_SECONDS,
+    LLM_MAX_RETRIES,
+    LLM_RETRY_BACKOFF_SECONDS,
+    LLM_RETRY_BUDGET_RATIO,
+    LLM_MAX_CONCURRENCY,
+    LLM_MAX_CONNECTIONS,
+    LLM_HEDGE_ENABLED,
+    LLM_HEDGE_PERCENTILE
+)
+from app.services.llm_client import LLMClient, LLMError, RetryBudget
+from app.services.metrics import estimate_tokens, record_llm_call
+from typing import AsyncIterator, Optional
 
 class LLMService:
-    def __init__(self):
-        """Initialize the LLM service with ChatTogether model."""
-        self.llm = ChatTogether(
+    def __init__(self, client: Optional[LLMClient] = None):
+        """
+        Initialize the LLM service.
+
+        Args:
+            client: Client for the chat completions API; built from the LLM_* settings when omitted
+        """
+        self.client = client or LLMClient(
+            base_url=LLM_BASE_URL,
+            api_key=TOGETHER_API_KEY,
             model=DEFAULT_LLM_MODEL,
-            together_api_key=TOGETHER_API_KEY,
-            temperature=0.7,
-            max_tokens=1000
+            timeout=LLM_TIMEOUT_SECONDS,
+            connect_timeout=LLM_CONNECT_TIMEOUT_SECONDS,
+            max_retries=LLM_MAX_RETRIES,
+            backoff_base=LLM_RETRY_BACKOFF_SECONDS,
+            retry_budget=RetryBudget(ratio=LLM_RETRY_BUDGET_RATIO),
+            max_concurrency=LLM_MAX_CONCURRENCY,
+            max_connections=LLM_MAX_CONNECTIONS,
+            hedge_enabled=LLM_HEDGE_ENABLED,
+            hedge_percentile=LLM_HEDGE_PERCENTILE
         )
+        self.params = {"temperature": 0.7, "max_tokens": 1000}
 
         self.system_prompt = "You are a helpful AI assistant."
-    
+
+    def _build_messages(self, prompt: str, system_prompt: str = None) -> list:
+        """Wrap a prompt and system prompt into chat messages."""
+        return [
+            {"role": "system", "content": system_prompt if system_prompt is not None else self.system_prompt},
+            {"role": "user", "content": prompt},
+        ]
+
+    def _record_usage(self, operation: str, messages: list, completion: str, usage: dict = None):
+        """Count tokens from the provider's usage report, estimating them when it has none."""
+        usage = usage or {}
+        prompt_tokens = usage.get("input_tokens") or sum(estimate_tokens(message["content"]) for message in messages)
+        completion_tokens = usage.get("output_tokens") or estimate_tokens(completion)
+        record_llm_call(operation, "ok", prompt_tokens, completion_tokens)
+
     async def generate_text(self, prompt: str, system_prompt: str = None) -> str:
         """
         Generate text using the LLM.
-        
+
         Args:
             prompt: The user prompt
             system_prompt: Optional system prompt to override the default
-        
+
         Returns:
             Generated text response
+
+        Raises:
+            LLMError: The call failed after any retries, or missed its deadline (LLMTimeoutError)
         """
         try:
+            messages = self._build_messages(prompt, system_prompt)
 
-            messages = []
-            
+            response = await self.client.complete(messages, **self.params)
+            self._record_usage("generate", messages, response["content"], response["usage"])
+            return response["content"].strip()
 
-            if system_prompt is not None:
-                messages.append(SystemMessage(content=system_prompt))
-            else:
-                messages.append(SystemMessage(content=self.system_prompt))
-            
+        except LLMError:
+            record_llm_call("generate", "error")
+            raise
+        except Exception as e:
+            record_llm_call("generate", "error")
+            raise LLMError(f"Error generating text: {str(e)}") from e
+
+    async def stream_text(self, prompt: str, system_prompt: str = None) -> AsyncIterator[str]:
+        """
+        Generate text using the LLM, yielding chunks as they arrive.
+
+        Args:
+            prompt: The user prompt
+            system_prompt: Optional system prompt to override the default
 
-            messages.append(HumanMessage(content=prompt))
-            
+        Yields:
+            Generated text chunks
 
-            response = await self.llm.ainvoke(messages)
-            return response.content.strip()
-            
+        Raises:
+            LLMError: The call failed, or missed its deadline (LLMTimeoutError)
+        """
+        try:
+            messages = self._build_messages(prompt, system_prompt)
+
+            completion = []
+            usage = None
+            async for event in self.client.stream(messages, **self.params):
+                usage = event.get("usage") or usage
+                if event.get("content"):
+                    completion.append(event["content"])
+                    yield event["content"]
+            self._record_usage("stream", messages, "".join(completion), usage)
+
+        except LLMError:
+            record_llm_call("stream", "error")
+            raise
         except Exception as e:
-            raise Exception(f"Error generating text: {str(e)}")
-    
+            record_llm_call("stream", "error")
+            raise LLMError(f"Error streaming text: {str(e)}") from e
+
     async def chat_completion(self, messages: list) -> str:
         """
         Generate a response based on a list of chat messages.
-        
+
         Args:
             messages: List of chat messages, each with 'role' and 'content'
-        
+
         Returns:
             Generated response
+
+        Raises:
+            ValueError: The messages are malformed
+            LLMError: The call failed after any retries, or missed its deadline (LLMTimeoutError)
         """
+        if not messages or not isinstance(messages, list):
+            raise ValueError("Messages must be a non-empty list")
+
+        formatted_messages = []
+        system_message = self.system_prompt
+
+        for msg in messages:
+            if not isinstance(msg, dict) or "role" not in msg or "content" not in msg:
+                raise ValueError("Each message must be a dict with 'role' and 'content' keys")
+
+            role = msg["role"]
+            content = msg["content"]
+
+            if role == "system":
+                system_message = content
+            elif role in ("user", "assistant"):
+                formatted_messages.append({"role": role, "content": content})
+            else:
+                raise ValueError(f"Invalid role: {role}")
+
+        final_messages = [{"role": "system", "content": system_message}] + formatted_messages
+
         try:
-            if not messages or not isinstance(messages, list):
-                raise ValueError("Messages must be a non-empty list")
-
-            # Convert input messages to LangChain message types
-            formatted_messages = []
-            system_message = self.system_prompt
-            
-            for msg in messages:
-                if not isinstance(msg, dict) or "role" not in msg or "content" not in msg:
-                    raise ValueError("Each message must be a dict with 'role' and 'content' keys")
-                    
-                role = msg["role"]
-                content = msg["content"]
-                
-                if role == "system":
-                    system_message = content
-                elif role == "user":
-                    formatted_messages.append(HumanMessage(content=content))
-                elif role == "assistant":
-                    formatted_messages.append(AIMessage(content=content))
-                else:
-                    raise ValueError(f"Invalid role: {role}")
-            
-
-            final_messages = [SystemMessage(content=system_message)] + formatted_messages
-            
-
-            response = await self.llm.ainvoke(final_messages)
-            return response.content.strip()
-            
+            response = await self.client.complete(final_messages, **self.params)
+            self._record_usage("chat", final_messages, response["content"], response["usage"])
+            return response["content"].strip()
+
+        except LLMError:
+            record_llm_call("chat", "error")
+            raise
         except Exception as e:
-            raise Exception(f"Error in chat completion: {str(e)}")
\ No newline at end of file
+            record_llm_call("chat", "error")
+            raise LLMError(f"Error in chat completion: {str(e)}") from e
+
+    def stats(self):
+        """Report the client's concurrency, retry and hedging counters."""
+        return self.client.stats()
+
+    async def aclose(self):
+        """Close the pooled HTTP connections."""
+        await self.client.aclose()
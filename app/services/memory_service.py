@@ -1,8 +1,17 @@
 from app.services.vector_store import VectorStoreService
 from app.services.llm_service import LLMService
-from app.config import USER_PREFERENCE_PROMPT
+from app.services.preference_prefilter import PreferencePrefilter
+from app.services.preference_store import InMemoryPreferenceBackend, PreferenceStore
+from app.services.tracing import stage
+from app.config import (
+    USER_PREFERENCE_PROMPT,
+    PREFERENCE_EXTRACTION_CONCURRENCY,
+    LEGACY_MEMORY_FALLBACK_ENABLED,
+    LEGACY_MEMORY_IMPORT_LIMIT
+)
+import asyncio
 import json
-from typing import Dict, List, Any
+from typing import Dict, List, Any, Optional, Set
 import logging
 from datetime import datetime
 import re
@@ -11,9 +20,25 @@ import re
 logger = logging.getLogger(__name__)
 
 class MemoryService:
-    def __init__(self, vector_store: VectorStoreService, llm_service: LLMService):
+    def __init__(
+        self,
+        vector_store: VectorStoreService,
+        llm_service: LLMService,
+        prefilter: Optional[PreferencePrefilter] = None,
+        preference_store: Optional[PreferenceStore] = None
+    ):
         self.vector_store = vector_store
         self.llm_service = llm_service
+        # Merge-on-write preference profiles, read without any embedding or vector query
+        self.preference_store = preference_store or PreferenceStore(InMemoryPreferenceBackend())
+        # Rule-based fast path that avoids the LLM call for clear-cut messages
+        self.prefilter = prefilter
+        # Read-through import of preferences stored as vector memories by earlier releases
+        self.legacy_memory_fallback = LEGACY_MEMORY_FALLBACK_ENABLED
+        
+        # Background preference extraction
+        self._background_tasks: Set[asyncio.Task] = set()
+        self._extraction_slots = asyncio.Semaphore(PREFERENCE_EXTRACTION_CONCURRENCY)
     
     async def detect_preferences(self, user_message: str) -> Dict[str, List[str]]:
         """
@@ -36,41 +61,48 @@ class MemoryService:
             
             # Make sure user_message is a string
             if not isinstance(user_message, str) or not user_message.strip():
-                logger.warning(f"Invalid user_message: {user_message}")
+                logger.warning("Invalid user_message: %s", user_message)
                 return {
                     "favorite_ingredients": [],
                     "favorite_cocktails": []
                 }
             
+            # Answer locally when the rules are confident
+            if self.prefilter is not None:
+                result = self.prefilter.analyze(user_message)
+                if result.decision != "llm":
+                    logger.debug("Preference prefilter decided '%s': %s", result.decision, result.preferences)
+                    return result.preferences
+            
             # Format the prompt with the user message
             try:
                 prompt = USER_PREFERENCE_PROMPT.format(message=user_message)
             except Exception as format_error:
-                logger.error(f"Error formatting USER_PREFERENCE_PROMPT: {str(format_error)}")
+                logger.error("Error formatting USER_PREFERENCE_PROMPT: %s", format_error)
                 # Fall back to a basic prompt if formatting fails
                 prompt = f"Extract favorite cocktail ingredients and cocktails from this message: {user_message}. Return as JSON with keys 'favorite_ingredients' and 'favorite_cocktails'."
             
             # Log the prompt for debugging
-            logger.debug(f"Formatted prompt for preference detection: {prompt}")
+            logger.debug("Formatted prompt for preference detection: %s", prompt)
             
             # Use the LLM to detect preferences with specific JSON instruction
             system_prompt = "You are an assistant that extracts user preferences and returns them in valid JSON format only."
             response = await self.llm_service.generate_text(prompt, system_prompt=system_prompt)
-            logger.info(f"LLM response for preference detection: {response}")
+            logger.debug("LLM response for preference detection: %s", response)
             
             try:
                 # Try to find and extract JSON from the response
                 json_match = re.search(r'(\{.*\})', response, re.DOTALL)
                 if json_match:
                     json_str = json_match.group(1)
-                    logger.debug(f"Extracted JSON string: {json_str}")
+                    logger.debug("Extracted JSON string: %s", json_str)
                     
                     # Try to parse JSON response
                     preferences = json.loads(json_str)
                     
                     # Ensure the expected keys are present, with defaults if not
                     if not isinstance(preferences, dict):
-                        logger.warning(f"LLM response is not a dictionary: {preferences}")
+                        logger.warning("LLM response is not a dictionary: %s", preferences)
                         return {
                             "favorite_ingredients": [],
                             "favorite_cocktails": []
@@ -87,23 +119,23 @@ class MemoryService:
                         preferences["favorite_cocktails"] = []
                     
                     # Log detected preferences
-                    logger.info(f"Detected preferences: {preferences}")
+                    logger.debug("Detected preferences: %s", preferences)
                     return preferences
                 else:
-                    logger.error(f"No JSON found in LLM response: {response}")
+                    logger.error("No JSON found in LLM response: %s", response)
                     return {
                         "favorite_ingredients": [],
                         "favorite_cocktails": []
                     }
             except json.JSONDecodeError as e:
-                logger.error(f"Failed to parse JSON from LLM response: {response}. Error: {str(e)}")
+                logger.error("Failed to parse JSON from LLM response: %s. Error: %s", response, e)
 
                 return {
                     "favorite_ingredients": [],
                     "favorite_cocktails": []
                 }
         except Exception as e:
-            logger.exception(f"Error detecting preferences: {str(e)}")
+            logger.exception("Error detecting preferences: %s", e)
             return {
                 "favorite_ingredients": [],
                 "favorite_cocktails": []
@@ -121,8 +153,9 @@ class MemoryService:
             True if preferences were detected and saved, False otherwise
         """
         try:
-            preferences = await self.detect_preferences(user_message)
-            logger.info(f"Detected preferences for user {user_id}: {preferences}")
+            with stage("preference_detection"):
+                preferences = await self.detect_preferences(user_message)
+            logger.debug("Detected preferences for user %s: %s", user_id, preferences)
             
 
             has_preferences = len(preferences["favorite_ingredients"]) > 0 or len(preferences["favorite_cocktails"]) > 0
@@ -132,21 +165,61 @@ class MemoryService:
                 preferences["timestamp"] = datetime.now().isoformat()
                 
 
-                memory_id = self.vector_store.store_user_memory(user_id, preferences)
-                if memory_id:
-                    logger.info(f"Successfully stored preferences with ID {memory_id}")
-                    return True
-                else:
-                    logger.error("Failed to store preferences in vector store")
-                    return False
+                with stage("memory_write"):
+                    profile = await self.preference_store.amerge(user_id, preferences)
+                logger.info(
+                    "Merged preferences into profile for user %s: %d ingredients, %d cocktails",
+                    user_id, len(profile['ingredients']), len(profile['cocktails']),
+                    extra={"sample": True, "user_id": user_id}
+                )
+                return True
             else:
-                logger.info(f"No preferences detected for user {user_id}")
+                logger.debug("No preferences detected for user %s", user_id)
             
             return False
         except Exception as e:
-            logger.exception(f"Error saving user preferences: {str(e)}")
+            logger.exception("Error saving user preferences: %s", e)
             return False
     
+    async def _extract_in_background(self, user_id: str, user_message: str):
+        async with self._extraction_slots:
+            await self.save_user_preferences(user_id, user_message)
+    
+    def schedule_preference_extraction(self, user_id: str, user_message: str) -> asyncio.Task:
+        """
+        Detect and save preferences from a message without waiting for the result.
+        
+        Args:
+            user_id: Unique identifier for the user
+            user_message: The message from the user
+        
+        Returns:
+            The scheduled task
+        """
+        task = asyncio.create_task(self._extract_in_background(user_id, user_message))
+        self._background_tasks.add(task)
+        task.add_done_callback(self._background_tasks.discard)
+        return task
+    
+    async def drain(self, timeout: float = 10.0):
+        """
+        Wait for scheduled preference extractions to finish.
+        
+        Args:
+            timeout: Seconds to wait before giving up on the remaining tasks
+        """
+        if not self._background_tasks:
+            return
+        done, pending = await asyncio.wait(set(self._background_tasks), timeout=timeout)
+        if pending:
+            logger.warning("%d preference extractions still running at shutdown", len(pending))
+    
+    def prefilter_stats(self) -> Dict[str, Any]:
+        """Return how many preference extractions skipped the LLM."""
+        if self.prefilter is None:
+            return {"enabled": False}
+        return {"enabled": True, **self.prefilter.stats()}
+    
     def get_user_preferences(self, user_id: str) -> Dict[str, List[str]]:
         """
         Get the latest user preferences.
@@ -158,42 +231,62 @@ class MemoryService:
             Dictionary with user preferences
         """
         try:
-            logger.info(f"Retrieving preferences for user {user_id}")
-            memories = self.vector_store.get_user_memories(user_id)
-            logger.info(f"Retrieved {len(memories)} memory entries for user {user_id}")
-            
-
-            all_ingredients = set()
-            all_cocktails = set()
-            
-            for memory in memories:
-                metadata = memory.get("metadata", {})
-                
-                if not isinstance(metadata, dict):
-                    logger.warning(f"Unexpected metadata format: {metadata}")
-                    continue
-                
-                ingredients = metadata.get("favorite_ingredients", [])
-                cocktails = metadata.get("favorite_cocktails", [])
-                
-                if isinstance(ingredients, list):
-                    all_ingredients.update(ingredients)
-                elif ingredients:
-                    logger.warning(f"Unexpected ingredients format: {ingredients}")
-                    
-                if isinstance(cocktails, list):
-                    all_cocktails.update(cocktails)
-                elif cocktails:
-                    logger.warning(f"Unexpected cocktails format: {cocktails}")
-            
-            result = {
-                "favorite_ingredients": list(all_ingredients),
-                "favorite_cocktails": list(all_cocktails)
+            return self.preference_store.get_preferences(user_id)
+        except Exception as e:
+            logger.exception("Error getting user preferences: %s", e)
+            return {
+                "favorite_ingredients": [],
+                "favorite_cocktails": []
             }
-            logger.info(f"Aggregated preferences for user {user_id}: {result}")
-            return result
+    
+    async def _import_legacy_memories(self, user_id: str):
+        """
+        Merge the user's legacy vector memories into their profile, once.
+        
+        Earlier releases stored each detected preference set as a record in the
+        user memories namespace of the vector backend. On a user's first read
+        those records are fetched and merged; a failed lookup is retried on the
+        next read.
+        
+        Args:
+            user_id: Unique identifier for the user
+        """
+        if await self.preference_store.alegacy_imported(user_id):
+            return
+        try:
+            with stage("legacy_memory_import"):
+                query_embedding = await self.vector_store.aembed(f"User {user_id} preferences")
+                results = await self.vector_store.backend.aquery(
+                    vector=query_embedding,
+                    top_k=LEGACY_MEMORY_IMPORT_LIMIT,
+                    namespace=self.vector_store.memory_namespace,
+                    filter={"user_id": {"$eq": user_id}},
+                    include_metadata=True
+                )
+        except Exception as e:
+            logger.warning("Could not read legacy memories for user %s: %s", user_id, e)
+            return
+        memories = [match["metadata"] or {} for match in results["matches"]]
+        await self.preference_store.aimport_legacy(user_id, memories)
+        if memories:
+            logger.info("Imported %d legacy memories for user %s", len(memories), user_id)
+    
+    async def aget_user_preferences(self, user_id: str) -> Dict[str, List[str]]:
+        """
+        Get the latest user preferences without blocking the event loop.
+        
+        Args:
+            user_id: Unique identifier for the user
+        
+        Returns:
+            Dictionary with user preferences
+        """
+        try:
+            if self.legacy_memory_fallback:
+                await self._import_legacy_memories(user_id)
+            return await self.preference_store.aget_preferences(user_id)
         except Exception as e:
-            logger.exception(f"Error getting user preferences: {str(e)}")
+            logger.exception("Error getting user preferences: %s", e)
             return {
                 "favorite_ingredients": [],
                 "favorite_cocktails": []
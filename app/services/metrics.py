@@ -0,0 +1,247 @@
+from typing import Any, Callable, Dict, Iterable, Optional
+import logging
+
+from prometheus_client import CONTENT_TYPE_LATEST, REGISTRY, Counter, Histogram, generate_latest
+from prometheus_client.core import CounterMetricFamily, GaugeMetricFamily
+
+from app.services.tracing import add_stage_observer, start_trace
+
+logger = logging.getLogger(__name__)
+
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+STAGE_SECONDS = Histogram(
+    "cocktail_stage_duration_seconds",
+    "Time spent in each stage of the RAG pipeline",
+    ["stage"],
+    buckets=LATENCY_BUCKETS
+)
+HTTP_REQUEST_SECONDS = Histogram(
+    "cocktail_http_request_duration_seconds",
+    "HTTP request latency by route",
+    ["method", "route", "status"],
+    buckets=LATENCY_BUCKETS
+)
+LLM_REQUESTS = Counter(
+    "cocktail_llm_requests_total",
+    "LLM calls by operation and outcome",
+    ["operation", "outcome"]
+)
+LLM_TOKENS = Counter(
+    "cocktail_llm_tokens_total",
+    "Tokens sent to (prompt) and received from (completion) the LLM",
+    ["operation", "direction"]
+)
+EMBEDDING_BATCH_SIZE = Histogram(
+    "cocktail_embedding_batch_size",
+    "Texts per encoder forward pass",
+    buckets=(1, 2, 4, 8, 16, 32, 64, 128, 256)
+)
+LLM_ATTEMPT_SECONDS = Histogram(
+    "cocktail_llm_attempt_duration_seconds",
+    "Latency of each HTTP attempt to the LLM, including retries and hedges",
+    ["outcome"],
+    buckets=LATENCY_BUCKETS
+)
+LLM_QUEUE_SECONDS = Histogram(
+    "cocktail_llm_queue_wait_seconds",
+    "Time LLM calls waited for a concurrency slot",
+    buckets=LATENCY_BUCKETS
+)
+LLM_HEDGES = Counter(
+    "cocktail_llm_hedges_total",
+    "Hedged LLM requests launched, and how many of them finished first",
+    ["result"]
+)
+PROMPT_CONTEXT_TOKENS = Histogram(
+    "cocktail_prompt_context_tokens",
+    "Tokens of the retrieved cocktails before (candidates) and after (context) budgeting",
+    ["part"],
+    buckets=(50, 100, 200, 400, 600, 800, 1000, 1500, 2000, 4000)
+)
+
+
+def estimate_tokens(text: str) -> int:
+    """Rough token count (about four characters per token) when the provider reports no usage."""
+    return max(1, len(text) // 4) if text else 0
+
+
+def record_llm_call(operation: str, outcome: str, prompt_tokens: int = 0, completion_tokens: int = 0):
+    """
+    Count one LLM call and its token usage.
+
+    Args:
+        operation: "generate", "stream" or "chat"
+        outcome: "ok" or "error"
+        prompt_tokens: Tokens sent
+        completion_tokens: Tokens received
+    """
+    LLM_REQUESTS.labels(operation, outcome).inc()
+    if prompt_tokens:
+        LLM_TOKENS.labels(operation, "prompt").inc(prompt_tokens)
+    if completion_tokens:
+        LLM_TOKENS.labels(operation, "completion").inc(completion_tokens)
+
+
+def observe_embedding_batch(size: int):
+    EMBEDDING_BATCH_SIZE.observe(size)
+
+
+def observe_llm_attempt(outcome: str, seconds: float):
+    LLM_ATTEMPT_SECONDS.labels(outcome).observe(seconds)
+
+
+def observe_llm_queue_wait(seconds: float):
+    LLM_QUEUE_SECONDS.observe(seconds)
+
+
+def observe_llm_hedge(result: str):
+    LLM_HEDGES.labels(result).inc()
+
+
+def observe_prompt_tokens(candidate_tokens: int, context_tokens: int):
+    PROMPT_CONTEXT_TOKENS.labels("candidates").observe(candidate_tokens)
+    PROMPT_CONTEXT_TOKENS.labels("context").observe(context_tokens)
+
+
+class RequestMetricsMiddleware:
+    """
+    ASGI middleware that traces each HTTP request and records its latency by route.
+
+    Latency is taken when the last body chunk is sent, so streamed responses
+    (SSE from /api/chat/stream, NDJSON from /api/chat/batch) are timed until
+    they finish rather than until their headers go out.
+
+    Args:
+        app: The wrapped ASGI application
+        enabled: Record the latency histogram (stage tracing runs either way)
+    """
+
+    def __init__(self, app, enabled: bool = True):
+        self.app = app
+        self.enabled = enabled
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        trace = start_trace()
+        status = 500
+        recorded = False
+
+        def record():
+            nonlocal recorded
+            if recorded or not self.enabled:
+                return
+            recorded = True
+            # The router stores the matched route in the shared scope
+            route = scope.get("route")
+            HTTP_REQUEST_SECONDS.labels(
+                scope["method"],
+                route.path if route is not None else "unmatched",
+                str(status)
+            ).observe(trace.elapsed())
+
+        async def send_and_time(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+            if message["type"] == "http.response.body" and not message.get("more_body", False):
+                record()
+
+        try:
+            await self.app(scope, receive, send_and_time)
+        finally:
+            # Responses that failed or were cut off before their last chunk
+            record()
+
+
+class ServiceStatsCollector:
+    """
+    Exposes the stats() counters the services already keep (cache hit rates,
+    prefilter and query-planner decisions, LLM client load) at scrape time.
+    """
+
+    def __init__(self, stats: Callable[[], Dict[str, Optional[Dict[str, Any]]]]):
+        self._stats = stats
+
+    def collect(self) -> Iterable:
+        try:
+            components = self._stats()
+        except Exception as e:
+            logger.error("Error collecting service stats: %s", e)
+            return
+
+        hits = CounterMetricFamily("cocktail_cache_hits", "Cache hits by cache", labels=["cache"])
+        misses = CounterMetricFamily("cocktail_cache_misses", "Cache misses by cache", labels=["cache"])
+        hit_ratio = GaugeMetricFamily("cocktail_cache_hit_ratio", "Lifetime cache hit ratio by cache", labels=["cache"])
+        entries = GaugeMetricFamily("cocktail_cache_entries", "Entries held by cache", labels=["cache"])
+        for cache in ("embedding_cache", "response_cache", "preference_store", "session_store"):
+            stats = components.get(cache)
+            if not stats:
+                continue
+            hits.add_metric([cache], stats.get("hits", 0))
+            misses.add_metric([cache], stats.get("misses", 0))
+            hit_ratio.add_metric([cache], stats.get("hit_rate", 0.0))
+            entries.add_metric([cache], stats.get("size", stats.get("cached_profiles", 0)))
+        yield from (hits, misses, hit_ratio, entries)
+
+        decisions = CounterMetricFamily(
+            "cocktail_decisions", "Fast-path decisions by component", labels=["component", "decision"]
+        )
+        for component, keys in (("preference_prefilter", ("skip", "local", "llm")), ("query_planner", ("structured", "fuzzy"))):
+            stats = components.get(component)
+            if stats:
+                for key in keys:
+                    decisions.add_metric([component, key], stats.get(key, 0))
+        yield decisions
+
+        batcher = components.get("embedding_batcher")
+        if batcher:
+            yield GaugeMetricFamily(
+                "cocktail_embedding_batch_fill_ratio",
+                "Average batch size relative to the maximum",
+                value=batcher.get("fill_rate", 0.0)
+            )
+            yield GaugeMetricFamily(
+                "cocktail_embedding_queue_depth",
+                "Texts waiting for the encoder",
+                value=batcher.get("pending", 0)
+            )
+
+        llm_client = components.get("llm_client")
+        if llm_client:
+            yield GaugeMetricFamily("cocktail_llm_in_flight", "LLM requests in flight", value=llm_client.get("in_flight", 0))
+            yield GaugeMetricFamily("cocktail_llm_queued", "LLM calls waiting for a concurrency slot", value=llm_client.get("queued", 0))
+            retries = CounterMetricFamily("cocktail_llm_retries", "LLM retries sent, and denied by the retry budget", labels=["result"])
+            retries.add_metric(["sent"], llm_client.get("retries", 0))
+            retries.add_metric(["denied"], llm_client.get("retries_denied", 0))
+            yield retries
+
+
+_collector = None
+
+
+def setup_metrics(stats: Callable[[], Dict[str, Optional[Dict[str, Any]]]]):
+    """
+    Feed stage timings into Prometheus and register the service stats collector.
+
+    Args:
+        stats: Returns the current stats() of each service component
+    """
+    global _collector
+    add_stage_observer(_observe_stage)
+    if _collector is None:
+        _collector = ServiceStatsCollector(stats)
+        REGISTRY.register(_collector)
+
+
+def _observe_stage(stage: str, seconds: float):
+    STAGE_SECONDS.labels(stage).observe(seconds)
+
+
+def render_metrics():
+    """Return the Prometheus exposition payload and its content type."""
+    return generate_latest(REGISTRY), CONTENT_TYPE_LATEST
@@ -0,0 +1,167 @@
+from typing import Any, Dict, Iterable, List, NamedTuple
+import logging
+import re
+import threading
+
+from app.services.keyword_matcher import KeywordMatch, KeywordMatcher
+
+logger = logging.getLogger(__name__)
+
+# Phrases that introduce a stated preference
+TRIGGER_PHRASES = [
+    "i love", "i really love", "i like", "i really like", "i enjoy", "i really enjoy",
+    "i prefer", "i adore", "my favorite", "my favourite", "my favorites", "my favourites",
+    "favorite", "favourite", "i'm a fan of", "i am a fan of", "i'm into", "i am into",
+    "i'm fond of", "i am fond of", "my go-to", "my go to", "i usually drink", "i always order",
+]
+
+# Words that make a message too subtle for the rules: negation, contrast, questions
+AMBIGUITY_PATTERN = re.compile(
+    r"\b(?:not|no|never|don't|dont|do not|doesn't|didn't|hate|hates|dislike|dislikes|"
+    r"but|except|without|unless|instead|anymore|used to|allergic)\b|\?"
+)
+
+# Words allowed between vocabulary terms in a message the rules extract themselves
+FILLER_PATTERN = re.compile(
+    r"\b(?:and|or|also|too|as well|especially|really|very|much|a lot|lot|the|a|an|with|of|"
+    r"is|are|be|it|its|all|any|kind|kinds|drink|drinks|cocktail|cocktails|based|flavors?|"
+    r"flavours?|taste|things|stuff|anything|ones?|mixed|i|me|my|so|just|lately|always|"
+    r"favorite|favourite|favorites|favourites|ingredient|ingredients|spirit|spirits|is|are)\b"
+)
+
+# Openers of requests and questions ("show me 3 gin drinks", "what is a negroni"); without a
+# trigger phrase these ask for cocktails rather than state a preference
+REQUEST_PATTERN = re.compile(
+    r"^(?:please |hey |hi |so |ok |okay )*(?:show|list|recommend|suggest|find|search|give|get|make|"
+    r"mix|tell|describe|explain|name|what|what's|whats|which|how|why|where|who|when|is|are|"
+    r"was|can|could|would|will|should|do|does|did|any|i want|i'd like|i would like|i need|"
+    r"i'm looking for|i am looking for)\b"
+)
+
+# First-person or sentiment wording: a message without a trigger phrase that still states a
+# preference ("I am obsessed with tequila", "rum is what I drink every weekend")
+STATEMENT_PATTERN = re.compile(
+    r"\b(?:i|i'm|im|i've|ive|i'd|me|my|mine|we|we're|our|obsessed|crave|craving|addicted|"
+    r"adore|love|loved|loving|enjoy|enjoyed|hate|hated|dislike|can't stand|cant stand|"
+    r"can't get enough|cant get enough|best|worst|delicious|disgusting|gross|yummy|tasty)\b"
+)
+
+EMPTY_PREFERENCES = {"favorite_ingredients": [], "favorite_cocktails": []}
+
+
+class PrefilterResult(NamedTuple):
+    # "skip" (no preferences), "local" (extracted by rules) or "llm" (needs the model)
+    decision: str
+    preferences: Dict[str, List[str]]
+
+
+class PreferencePrefilter:
+    """
+    Decides locally whether a message needs LLM-based preference extraction.
+
+    Messages without a trigger phrase ("I love", "my favorite", ...) skip the
+    LLM when they are requests or questions ("show me 3 gin drinks", "what is
+    a negroni?") or mention no catalog ingredient (or any word of one) and no
+    cocktail; only first-person or sentiment statements about the catalog
+    ("I am obsessed with tequila") go to the LLM. Messages whose trigger is
+    followed only by known ingredients and cocktails (found with an
+    Aho–Corasick scan over the catalog vocabulary) are extracted directly.
+    Anything else goes to the LLM.
+    """
+
+    def __init__(self, ingredients: Iterable[str], cocktails: Iterable[str]):
+        ingredients = list(ingredients)
+        cocktails = list(cocktails)
+        vocabulary = [(name, ("ingredient", name)) for name in ingredients]
+        vocabulary += [(name, ("cocktail", name)) for name in cocktails]
+        self.vocabulary = KeywordMatcher(vocabulary)
+        # Single words of ingredient names catch loose mentions ("rum" for "Light rum")
+        words = {word for name in ingredients for word in name.lower().split() if not FILLER_PATTERN.fullmatch(word)}
+        self.mentions = KeywordMatcher([(name, name) for name in cocktails] + [(word, word) for word in words])
+        self.triggers = KeywordMatcher((phrase, phrase) for phrase in TRIGGER_PHRASES)
+
+        self._lock = threading.Lock()
+        self._counts = {"skip": 0, "local": 0, "llm": 0}
+
+    @classmethod
+    def from_catalog(cls, cocktails: List[Dict[str, Any]]) -> "PreferencePrefilter":
+        """Build the prefilter from catalog rows loaded with app.services.catalog."""
+        ingredients = sorted({ingredient for cocktail in cocktails for ingredient in cocktail["ingredients"]})
+        names = sorted({cocktail["name"] for cocktail in cocktails})
+        return cls(ingredients, names)
+
+    def _extract(self, message: str, trigger: KeywordMatch):
+        """Return preferences when everything after the trigger is vocabulary or filler, else None."""
+        tail_start = trigger.end
+        tail = message[tail_start:]
+        matches = self.vocabulary.find_longest(tail)
+        if not matches:
+            return None
+
+        preferences = {"favorite_ingredients": [], "favorite_cocktails": []}
+        residual = []
+        position = 0
+        for match in matches:
+            kinds = {kind for kind, _ in match.values}
+            if len(kinds) > 1:
+                # Both an ingredient and a cocktail name: let the LLM decide
+                return None
+            kind, name = match.values[0]
+            key = "favorite_ingredients" if kind == "ingredient" else "favorite_cocktails"
+            if name not in preferences[key]:
+                preferences[key].append(name)
+            residual.append(tail[position:match.start])
+            position = match.end
+        residual.append(tail[position:])
+
+        leftover = FILLER_PATTERN.sub(" ", " ".join(residual).lower())
+        if re.search(r"[a-z0-9]", leftover):
+            return None
+        return preferences
+
+    def _states_preference(self, message: str) -> bool:
+        """Whether a message without a trigger phrase may still state a preference."""
+        if REQUEST_PATTERN.search(message) or message.rstrip().endswith("?"):
+            return False
+        return bool(STATEMENT_PATTERN.search(message)) and bool(self.mentions.find_all(message))
+
+    def analyze(self, message: str) -> PrefilterResult:
+        """
+        Classify a user message.
+
+        Args:
+            message: The message from the user
+
+        Returns:
+            PrefilterResult with the decision and, unless it is "llm", the preferences
+        """
+        normalized = " ".join(message.lower().split())
+        triggers = self.triggers.find_all(normalized)
+
+        if not triggers:
+            result = PrefilterResult("llm" if self._states_preference(normalized) else "skip", EMPTY_PREFERENCES)
+        elif AMBIGUITY_PATTERN.search(normalized) or len(triggers) > 1 and triggers[-1].start >= triggers[0].end:
+            result = PrefilterResult("llm", EMPTY_PREFERENCES)
+        else:
+            preferences = self._extract(normalized, triggers[0])
+            result = PrefilterResult("local", preferences) if preferences else PrefilterResult("llm", EMPTY_PREFERENCES)
+
+        with self._lock:
+            self._counts[result.decision] += 1
+        return PrefilterResult(result.decision, {key: list(value) for key, value in result.preferences.items()})
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        Report how often the LLM call was avoided.
+
+        Returns:
+            Dictionary with per-decision counts and the skip rate
+        """
+        with self._lock:
+            total = sum(self._counts.values())
+            avoided = self._counts["skip"] + self._counts["local"]
+            return {
+                "messages": total,
+                **self._counts,
+                "skip_rate": avoided / total if total else 0.0,
+            }
@@ -0,0 +1,275 @@
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+import asyncio
+import json
+import logging
+import os
+import sqlite3
+import threading
+
+logger = logging.getLogger(__name__)
+
+# Profile sections and the preference keys they are read from / rendered to
+SECTIONS = {
+    "ingredients": "favorite_ingredients",
+    "cocktails": "favorite_cocktails",
+}
+
+
+def empty_profile() -> Dict[str, Any]:
+    return {"ingredients": {}, "cocktails": {}, "updated_at": None}
+
+
+class PreferenceBackend(ABC):
+    """Durable storage for per-user preference profiles."""
+
+    @abstractmethod
+    def get(self, user_id: str) -> Optional[Dict[str, Any]]:
+        """Return the stored profile, or None if the user has none."""
+
+    @abstractmethod
+    def put(self, user_id: str, profile: Dict[str, Any]):
+        """Store the profile, replacing any previous one."""
+
+    def close(self):
+        """Release any resources held by the backend."""
+
+
+class InMemoryPreferenceBackend(PreferenceBackend):
+    """Non-durable backend, for tests and single-process development."""
+
+    def __init__(self):
+        self._profiles: Dict[str, str] = {}
+
+    def get(self, user_id):
+        raw = self._profiles.get(user_id)
+        return json.loads(raw) if raw is not None else None
+
+    def put(self, user_id, profile):
+        self._profiles[user_id] = json.dumps(profile)
+
+
+class SQLitePreferenceBackend(PreferenceBackend):
+    """Profiles stored as one JSON row per user in a local SQLite database."""
+
+    def __init__(self, path: str):
+        if path != ":memory:":
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._connection = sqlite3.connect(path, check_same_thread=False)
+        self._lock = threading.Lock()
+        with self._lock, self._connection:
+            self._connection.execute("PRAGMA journal_mode=WAL")
+            self._connection.execute(
+                "CREATE TABLE IF NOT EXISTS user_preferences ("
+                "user_id TEXT PRIMARY KEY, profile TEXT NOT NULL, updated_at TEXT)"
+            )
+
+    def get(self, user_id):
+        with self._lock:
+            row = self._connection.execute(
+                "SELECT profile FROM user_preferences WHERE user_id = ?", (user_id,)
+            ).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def put(self, user_id, profile):
+        with self._lock, self._connection:
+            self._connection.execute(
+                "INSERT INTO user_preferences (user_id, profile, updated_at) VALUES (?, ?, ?) "
+                "ON CONFLICT(user_id) DO UPDATE SET profile = excluded.profile, updated_at = excluded.updated_at",
+                (user_id, json.dumps(profile), profile.get("updated_at"))
+            )
+
+    def close(self):
+        with self._lock:
+            self._connection.close()
+
+
+class PreferenceStore:
+    """
+    Keyed, merge-on-write preference profile per user.
+
+    A profile holds a deduplicated set of favorite ingredients and cocktails,
+    each with a mention count and first/last seen timestamps. Reads are served
+    from an in-process LRU cache in front of the durable backend.
+    """
+
+    def __init__(self, backend: PreferenceBackend, cache_size: int = 10000):
+        self.backend = backend
+        self.cache_size = max(1, cache_size)
+        self._cache: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        self._lock = threading.RLock()
+        self.hits = 0
+        self.misses = 0
+
+    def _cache_put(self, user_id: str, profile: Dict[str, Any]):
+        self._cache[user_id] = profile
+        self._cache.move_to_end(user_id)
+        while len(self._cache) > self.cache_size:
+            self._cache.popitem(last=False)
+
+    def get_profile(self, user_id: str) -> Dict[str, Any]:
+        """
+        Return the full profile for a user.
+
+        Args:
+            user_id: Unique identifier for the user
+
+        Returns:
+            Profile with per-item counts and timestamps (empty if unknown)
+        """
+        with self._lock:
+            profile = self._cache.get(user_id)
+            if profile is not None:
+                self._cache.move_to_end(user_id)
+                self.hits += 1
+                return profile
+            self.misses += 1
+            profile = self.backend.get(user_id) or empty_profile()
+            self._cache_put(user_id, profile)
+            return profile
+
+    @staticmethod
+    def _merged(current: Dict[str, Any], preferences: Dict[str, Any]) -> Dict[str, Any]:
+        """Return a copy of the profile with one set of detected preferences counted in."""
+        seen_at = preferences.get("timestamp") or datetime.now().isoformat()
+        profile = dict(current)
+        profile.update({section: dict(current.get(section, {})) for section in SECTIONS})
+        for section, key in SECTIONS.items():
+            for name in preferences.get(key, []) or []:
+                if not isinstance(name, str) or not name.strip():
+                    continue
+                item_key = name.strip().lower()
+                item = dict(profile[section].get(item_key) or {"name": name.strip(), "count": 0, "first_seen": seen_at})
+                item["count"] += 1
+                item["last_seen"] = seen_at
+                profile[section][item_key] = item
+        profile["updated_at"] = seen_at
+        return profile
+
+    def merge(self, user_id: str, preferences: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Merge newly detected preferences into the user's profile and persist it.
+
+        Args:
+            user_id: Unique identifier for the user
+            preferences: Dictionary with favorite_ingredients, favorite_cocktails
+                and an optional ISO timestamp
+
+        Returns:
+            The updated profile
+        """
+        with self._lock:
+            profile = self._merged(self.get_profile(user_id), preferences)
+            self.backend.put(user_id, profile)
+            self._cache_put(user_id, profile)
+            return profile
+
+    def import_legacy(self, user_id: str, memories: List[Dict[str, Any]]) -> Dict[str, Any]:
+        """
+        Merge preferences stored as vector memories by earlier releases, once per user.
+
+        The profile is marked as imported (even when there was nothing to
+        import), so later calls are no-ops.
+
+        Args:
+            user_id: Unique identifier for the user
+            memories: Legacy memory metadata, each with favorite_ingredients,
+                favorite_cocktails and an optional ISO timestamp
+
+        Returns:
+            The updated profile
+        """
+        with self._lock:
+            profile = self.get_profile(user_id)
+            if profile.get("legacy_imported"):
+                return profile
+            for memory in sorted(memories, key=lambda memory: memory.get("timestamp") or ""):
+                profile = self._merged(profile, memory)
+            profile = {**profile, "legacy_imported": True}
+            self.backend.put(user_id, profile)
+            self._cache_put(user_id, profile)
+            return profile
+
+    def legacy_imported(self, user_id: str) -> bool:
+        """Whether import_legacy already ran for the user."""
+        return bool(self.get_profile(user_id).get("legacy_imported"))
+
+    def get_preferences(self, user_id: str) -> Dict[str, List[str]]:
+        """
+        Return the user's favorites, most mentioned and most recent first.
+
+        Args:
+            user_id: Unique identifier for the user
+
+        Returns:
+            Dictionary with favorite_ingredients and favorite_cocktails
+        """
+        profile = self.get_profile(user_id)
+        result = {}
+        for section, key in SECTIONS.items():
+            items = sorted(
+                profile.get(section, {}).values(),
+                key=lambda item: (item.get("count", 0), item.get("last_seen") or ""),
+                reverse=True
+            )
+            result[key] = [item["name"] for item in items]
+        return result
+
+    def is_cached(self, user_id: str) -> bool:
+        with self._lock:
+            return user_id in self._cache
+
+    async def amerge(self, user_id: str, preferences: Dict[str, Any]) -> Dict[str, Any]:
+        """Async variant of merge; the backend write runs on a worker thread."""
+        return await asyncio.to_thread(self.merge, user_id, preferences)
+
+    async def aimport_legacy(self, user_id: str, memories: List[Dict[str, Any]]) -> Dict[str, Any]:
+        """Async variant of import_legacy; the backend write runs on a worker thread."""
+        return await asyncio.to_thread(self.import_legacy, user_id, memories)
+
+    async def alegacy_imported(self, user_id: str) -> bool:
+        """Async variant of legacy_imported; only cache misses leave the event loop."""
+        if self.is_cached(user_id):
+            return self.legacy_imported(user_id)
+        return await asyncio.to_thread(self.legacy_imported, user_id)
+
+    async def aget_preferences(self, user_id: str) -> Dict[str, List[str]]:
+        """Async variant of get_preferences; only cache misses leave the event loop."""
+        if self.is_cached(user_id):
+            return self.get_preferences(user_id)
+        return await asyncio.to_thread(self.get_preferences, user_id)
+
+    def stats(self) -> Dict[str, Any]:
+        """Return LRU cache metrics."""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "cached_profiles": len(self._cache),
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+            }
+
+    def close(self):
+        self.backend.close()
+
+
+def create_preference_store(backend: str, path: str, cache_size: int) -> PreferenceStore:
+    """
+    Build the preference store selected in config.
+
+    Args:
+        backend: "sqlite" or "memory"
+        path: SQLite database path
+        cache_size: Number of profiles kept in the LRU cache
+
+    Returns:
+        The configured PreferenceStore
+    """
+    if backend == "sqlite":
+        return PreferenceStore(SQLitePreferenceBackend(path), cache_size=cache_size)
+    if backend == "memory":
+        return PreferenceStore(InMemoryPreferenceBackend(), cache_size=cache_size)
+    raise ValueError(f"Unknown preference store backend: {backend}")
@@ -0,0 +1,243 @@
+from typing import Any, Dict, List, Optional, Tuple
+import logging
+import re
+import threading
+
+from app.config import PROMPT_TOKENIZER_ENCODING
+from app.services.metrics import estimate_tokens
+
+logger = logging.getLogger(__name__)
+
+# Static instructions, sent as the system prompt so each request only carries
+# the question, the user's preferences and the retrieved cocktails
+COCKTAIL_ADVISOR_SYSTEM_PROMPT = """You are a professional bartender and Cocktail Advisor chatbot. Answer the user's question using only the retrieved cocktails in the message.
+
+Rules:
+1. Focus on the retrieved cocktails; all information must come from them.
+2. If information is not available, say "I don't have that information about that" without generating placeholder content.
+3. If no cocktails were retrieved, say so directly without creating empty lists.
+4. Only give as many cocktails as requested if they are available; if fewer are available, discuss only those.
+5. If the user asks about their favorite ingredients or flavors, use their known preferences to personalize the answer.
+6. When the retrieved cocktails match the user's preferences, say "Based on your preference for [preference]...".
+
+Formatting:
+1. Use relevant emojis where appropriate.
+2. Format cocktail names in **bold**.
+3. Use bullet points for ingredients and instructions.
+4. Keep formatting proportional to the amount of actual content.
+5. End with a friendly closing if cocktail information was provided.
+
+Adapt the length and style of the answer to the available data."""
+
+# Column order of each rendered cocktail line
+CONTEXT_SCHEMA = "name | category | alcoholic | ingredients | description"
+
+_QUOTES = "\"'“”"
+
+
+class TokenCounter:
+    """
+    Counts prompt tokens with a tiktoken encoding.
+
+    The encoding is loaded by ``load()`` (called during startup warmup, off
+    the event loop) or else on first use. It is only read from the local
+    tiktoken cache (TIKTOKEN_CACHE_DIR), never downloaded; when tiktoken is
+    missing or the encoding is not cached, counts fall back to a
+    four-characters-per-token estimate.
+    """
+
+    def __init__(self, encoding_name: str = PROMPT_TOKENIZER_ENCODING):
+        self.encoding_name = encoding_name
+        self._encoding = None
+        self._loaded = False
+        self._lock = threading.Lock()
+
+    def load(self):
+        """Load the encoding from the local tiktoken cache, if not done yet."""
+        with self._lock:
+            if self._loaded:
+                return
+            try:
+                import tiktoken
+                import tiktoken.load
+
+                fetch = tiktoken.load.read_file
+
+                def read_local(blobpath):
+                    # tiktoken reads cached files itself and calls this only to fetch
+                    if "://" in blobpath:
+                        raise FileNotFoundError(f"{blobpath} is not in the local tiktoken cache")
+                    return fetch(blobpath)
+
+                tiktoken.load.read_file = read_local
+                try:
+                    self._encoding = tiktoken.get_encoding(self.encoding_name)
+                finally:
+                    tiktoken.load.read_file = fetch
+            except Exception as e:
+                logger.warning("tiktoken encoding %s unavailable, estimating token counts: %s", self.encoding_name, e)
+            self._loaded = True
+
+    def count(self, text: str) -> int:
+        if not text:
+            return 0
+        if not self._loaded:
+            self.load()
+        if self._encoding is None:
+            return estimate_tokens(text)
+        return len(self._encoding.encode(text, disallowed_special=()))
+
+
+def _clean_description(name: str, description: str) -> str:
+    """Strip wrapping quotes and a leading "Name:" that repeats the name column."""
+    text = " ".join(str(description).split()).strip(_QUOTES).strip()
+    prefix = re.match(rf"^(?:introducing\s+)?(?:the\s+)?{re.escape(name)}\s*[:\-–—]\s*", text, re.IGNORECASE)
+    if prefix:
+        text = text[prefix.end():]
+    return text[:1].upper() + text[1:]
+
+
+def render_cocktail(metadata: Dict[str, Any], with_description: bool = True) -> str:
+    """
+    Render one cocktail as a single line in the CONTEXT_SCHEMA column order.
+
+    Only the display fields are kept (the normalized *_key filter fields are
+    dropped) and ingredients listed twice appear once.
+
+    Args:
+        metadata: Cocktail metadata as stored in the vector index
+        with_description: Include the free-text description column
+
+    Returns:
+        Rendered line
+    """
+    name = str(metadata.get("name", "")).strip()
+    ingredients = []
+    seen = set()
+    for ingredient in metadata.get("ingredients") or []:
+        key = str(ingredient).strip().lower()
+        if key and key not in seen:
+            seen.add(key)
+            ingredients.append(str(ingredient).strip())
+    columns = [
+        name,
+        str(metadata.get("category", "")).strip(),
+        str(metadata.get("alcoholic", "")).strip(),
+        ", ".join(ingredients),
+    ]
+    if with_description and metadata.get("desc"):
+        columns.append(_clean_description(name, metadata["desc"]))
+    return " | ".join(columns)
+
+
+class ContextBuilder:
+    """
+    Builds the retrieved-cocktail section of the prompt within a token budget.
+
+    Cocktails are deduplicated by name and added in the order the retriever
+    ranked them until the budget is reached; a cocktail that does not fit
+    with its description is tried once more without it, and the list is
+    cut there if it still does not fit. Scores are not re-sorted on: they
+    come from different scales (exact-name hits, BM25, cosine, RRF).
+    """
+
+    def __init__(self, max_tokens: int, token_counter: Optional[TokenCounter] = None):
+        self.max_tokens = max_tokens
+        self.token_counter = token_counter or TokenCounter()
+
+    def build(self, results: List[Dict[str, Any]], limit: int) -> Tuple[List[Dict[str, Any]], str, Dict[str, int]]:
+        """
+        Render search results into the prompt context.
+
+        Args:
+            results: Search results as {"metadata": ..., "score": ...}, best first
+            limit: Maximum number of cocktails to include
+
+        Returns:
+            Tuple of (results included in the context, context text, token
+            stats with the tokens of every candidate rendered in full and of
+            the final context)
+        """
+        candidates = []
+        seen = set()
+        for result in results:
+            metadata = result.get("metadata")
+            if not isinstance(metadata, dict):
+                continue
+            key = str(metadata.get("name", "")).strip().lower()
+            if key in seen:
+                continue
+            seen.add(key)
+            candidates.append(result)
+
+        count = self.token_counter.count
+        header = f"Cocktails ({CONTEXT_SCHEMA}):"
+        used = count(header)
+        candidate_tokens = used
+        included = []
+        lines = []
+        exhausted = False
+        for result in candidates:
+            full_line = render_cocktail(result["metadata"])
+            full_tokens = count(full_line) + 1
+            candidate_tokens += full_tokens
+            if exhausted or len(included) >= limit:
+                continue
+            line, tokens = full_line, full_tokens
+            if used + tokens > self.max_tokens:
+                line = render_cocktail(result["metadata"], with_description=False)
+                tokens = count(line) + 1
+                if used + tokens > self.max_tokens:
+                    # Truncate from the tail so a lower-ranked cocktail never displaces a better one
+                    exhausted = True
+                    continue
+            included.append(result)
+            lines.append(f"{len(lines) + 1}. {line}")
+            used += tokens
+
+        if not lines:
+            return [], "Cocktails: none retrieved", {"candidate_tokens": candidate_tokens, "context_tokens": 0}
+        return included, "\n".join([header, *lines]), {"candidate_tokens": candidate_tokens, "context_tokens": used}
+
+
+def render_history(turns: List[Dict[str, Any]]) -> str:
+    """Render conversation turns, oldest first, one "Role: text" line each."""
+    lines = ["Conversation so far:"]
+    for turn in turns:
+        role = "User" if turn["role"] == "user" else "Assistant"
+        lines.append(f"{role}: {' '.join(turn['content'].split())}")
+    return "\n".join(lines)
+
+
+def build_user_prompt(
+    query: str,
+    user_preferences: Dict[str, List[str]],
+    context: str,
+    history: Optional[List[Dict[str, Any]]] = None,
+    modifications: Optional[List[str]] = None
+) -> str:
+    """
+    Build the per-request message that accompanies COCKTAIL_ADVISOR_SYSTEM_PROMPT.
+
+    Args:
+        query: The user's query
+        user_preferences: User preferences dictionary
+        context: Output of ContextBuilder.build
+        history: Recent conversation turns, already trimmed to the history budget
+        modifications: Changes asked for to named cocktails, e.g. "Margarita without salt"
+
+    Returns:
+        Prompt text
+    """
+    ingredients = ", ".join(user_preferences.get("favorite_ingredients") or []) or "none shared yet"
+    cocktails = ", ".join(user_preferences.get("favorite_cocktails") or []) or "none shared yet"
+    prompt = (
+        f"Question: {query}\n"
+        f"Known preferences: favorite ingredients: {ingredients}; favorite cocktails: {cocktails}\n"
+    )
+    if modifications:
+        prompt += f"Requested modifications (adapt the recipe accordingly): {'; '.join(modifications)}\n"
+    prompt += context
+    if history:
+        prompt = f"{render_history(history)}\n{prompt}"
+    return prompt
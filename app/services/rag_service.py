@@ -1,7 +1,15 @@
 from app.services.vector_store import VectorStoreService
 from app.services.memory_service import MemoryService
 from app.services.llm_service import LLMService
-from typing import Dict, List, Any, Tuple
+from app.services.metrics import observe_prompt_tokens
+from app.services.prompt_builder import COCKTAIL_ADVISOR_SYSTEM_PROMPT, ContextBuilder, build_user_prompt
+from app.services.session_store import SessionStore
+from app.services.response_cache import CatalogVersionWatcher, SemanticResponseCache, preference_fingerprint
+from app.services.structured_index import NEGATION_PATTERN, StructuredIndex
+from app.services.tracing import stage
+from app.config import BATCH_LLM_CONCURRENCY, CONTEXT_MAX_TOKENS, HISTORY_MAX_TOKENS, PREFERENCE_EXTRACTION_MODE
+from typing import AsyncIterator, Dict, List, Any, Optional, Tuple
+import asyncio
 import logging
 import re
 
@@ -9,10 +17,31 @@ import re
 logger = logging.getLogger(__name__)
 
 class RAGService:
-    def __init__(self, vector_store: VectorStoreService, memory_service: MemoryService, llm_service: LLMService):
+    def __init__(
+        self,
+        vector_store: VectorStoreService,
+        memory_service: MemoryService,
+        llm_service: LLMService,
+        response_cache: Optional[SemanticResponseCache] = None,
+        catalog_watcher: Optional[CatalogVersionWatcher] = None,
+        structured_index: Optional[StructuredIndex] = None,
+        context_builder: Optional[ContextBuilder] = None,
+        session_store: Optional[SessionStore] = None
+    ):
         self.vector_store = vector_store
         self.memory_service = memory_service
         self.llm_service = llm_service
+        self.preference_mode = PREFERENCE_EXTRACTION_MODE
+        # Semantic cache of generated answers, invalidated when the catalog is reindexed
+        self.response_cache = response_cache
+        self.catalog_watcher = catalog_watcher
+        # Exact answers to set queries over ingredients, category and alcoholic
+        self.structured_index = structured_index
+        # Renders retrieved cocktails compactly within the prompt token budget
+        self.context_builder = context_builder or ContextBuilder(CONTEXT_MAX_TOKENS)
+        # Server-side conversation history; recent turns go into the prompt within HISTORY_MAX_TOKENS
+        self.session_store = session_store
+        self.history_max_tokens = HISTORY_MAX_TOKENS
     
     def _enhance_query_with_preferences(self, query: str, preferences: Dict[str, List[str]]) -> str:
         """
@@ -27,7 +56,7 @@ class RAGService:
         """
         # Skip enhancement for certain query types
         if any(term in query.lower() for term in ["how to", "what is", "explain", "history", "define"]):
-            logger.info("Query appears to be informational - not enhancing with preferences")
+            logger.debug("Query appears to be informational - not enhancing with preferences")
             return query
             
         # Extract preferences
@@ -53,123 +82,486 @@ class RAGService:
                 cocktails_str = ", ".join(favorite_cocktails[:2])  # Limit to top 2
                 enhanced_query += f" similar to {cocktails_str}"
         
-        logger.info(f"Enhanced query: '{query}' -> '{enhanced_query}'")
+        logger.debug("Enhanced query: '%s' -> '%s'", query, enhanced_query)
         return enhanced_query
     
-    async def process_query(self, user_id: str, query: str) -> Tuple[str, List[Dict[str, Any]]]:
+    async def process_query(self, user_id: str, query: str, session_id: Optional[str] = None) -> Tuple[str, List[Dict[str, Any]]]:
         """
         Process a user query using RAG with preference-enhanced retrieval.
         
         Args:
             user_id: Unique identifier for the user
             query: The user's query
+            session_id: Conversation the query belongs to; its recent turns are
+                included in the prompt and the new turn is stored in it
         
         Returns:
             Tuple of (response text, source documents)
         """
+        history = await self._load_history(session_id)
         
+        if self.preference_mode == "blocking":
+            # Strongly consistent: preferences in this message shape this turn's answer
+            await self._save_preferences(user_id, query)
+            result = await self._answer_query(user_id, query, history)
+        elif self.preference_mode == "background":
+            # Fire and forget: later turns see the preferences once extraction finishes
+            self.memory_service.schedule_preference_extraction(user_id, query)
+            result = await self._answer_query(user_id, query, history)
+        else:
+            # Concurrent: extraction overlaps retrieval and generation, and the turn uses
+            # the preferences already known; the response waits until both have finished
+            _, result = await asyncio.gather(
+                self._save_preferences(user_id, query),
+                self._answer_query(user_id, query, history)
+            )
+        
+        await self._save_turns(session_id, query, result[0])
+        return result
+    
+    async def _load_history(self, session_id: Optional[str]) -> List[Dict[str, Any]]:
+        """Load the session's most recent turns that fit the history budget, or none on failure."""
+        if self.session_store is None or not session_id or self.history_max_tokens <= 0:
+            return []
         try:
-            # Process user preferences
-            try:
-                await self.memory_service.save_user_preferences(user_id, query)
-            except Exception as e:
-                logger.exception(f"Error saving user preferences: {str(e)}")
+            with stage("session_read"):
+                return await self.session_store.arecent_turns(
+                    session_id, self.history_max_tokens, self.context_builder.token_counter.count
+                )
+        except Exception as e:
+            logger.exception("Error loading session history: %s", e)
+            return []
+    
+    async def _save_turns(self, session_id: Optional[str], query: str, response: str):
+        """Append the user's message and the answer to the session, logging any failure."""
+        if self.session_store is None or not session_id:
+            return
+        try:
+            await self.session_store.aappend(
+                session_id, [{"role": "user", "content": query}, {"role": "assistant", "content": response}]
+            )
+        except Exception as e:
+            logger.exception("Error saving session turns: %s", e)
+    
+    async def _save_preferences(self, user_id: str, query: str):
+        """Extract and store preferences from the message, logging any failure."""
+        try:
+            await self.memory_service.save_user_preferences(user_id, query)
+        except Exception as e:
+            logger.exception("Error saving user preferences: %s", e)
+    
+    async def _load_preferences(self, user_id: str) -> Dict[str, List[str]]:
+        """Load the user's known preferences, falling back to none on failure."""
+        try:
+            with stage("memory_read"):
+                user_preferences = await self.memory_service.aget_user_preferences(user_id)
+            logger.debug("Retrieved user preferences: %s", user_preferences)
+            return user_preferences
+        except Exception as e:
+            logger.exception("Error retrieving user preferences: %s", e)
+            return {"favorite_ingredients": [], "favorite_cocktails": []}
+    
+    def _requested_limit(self, query: str) -> int:
+        """Number of cocktails to put in the context, honouring counts like 'show me 3'."""
+        requested_limit = 5  # Default value
+        
+        # Check if user specified a number in their query
+        number_match = re.search(r'(?:show|give|get|list|display|recommend|suggest|find|want|need)\s+(?:me\s+)?(\d+)', query.lower())
+        if number_match:
+            requested_number = int(number_match.group(1))
+            requested_limit = max(1, max(10, requested_number))
+        return requested_limit
+    
+    async def _lookup_cached_response(
+        self,
+        query: str,
+        user_preferences: Dict[str, List[str]],
+        history: Optional[List[Dict[str, Any]]] = None
+    ):
+        """
+        Look for a cached answer to a semantically equivalent query.
+        
+        Answers to follow-up turns depend on the conversation, so they are
+        neither served from nor stored in the cache.
+        
+        Args:
+            query: The user's query
+            user_preferences: User preferences dictionary
+            history: Conversation turns included in the prompt
+        
+        Returns:
+            Tuple of ((response text, sources) or None, key to store the answer under or None)
+        """
+        if self.response_cache is None or history:
+            return None, None
+        try:
+            with stage("response_cache"):
+                query_embedding = await self.vector_store.aembed(query)
+                fingerprint = preference_fingerprint(
+                    user_preferences, self._requested_limit(query), self._query_constraints(query)
+                )
+                hit = self.response_cache.lookup(query_embedding, fingerprint)
+            if hit is not None:
+                response, sources, similarity = hit
+                logger.info("Response cache hit (similarity %.3f)", similarity, extra={"sample": True})
+                return (response, sources), None
+            return None, (query_embedding, fingerprint)
+        except Exception as e:
+            logger.exception("Error looking up response cache: %s", e)
+            return None, None
+    
+    def _store_cached_response(self, cache_key, response: str, sources: List[Dict[str, Any]]):
+        """Cache a generated answer; answers without retrieved sources are not reused."""
+        if self.response_cache is None or cache_key is None or not sources:
+            return
+        query_embedding, fingerprint = cache_key
+        self.response_cache.store(query_embedding, fingerprint, response, sources)
+    
+    def _query_constraints(self, query: str) -> Any:
+        """
+        Constraints that decide which cocktails qualify, for keying cached answers.
+        
+        "gin drinks with lime" and "gin drinks without lime" embed almost
+        identically, so the semantic match alone would serve one the other's
+        answer.
+        """
+        if self.structured_index is not None:
+            plan = self.structured_index.parse(query, record=False)
+            return [
+                sorted(plan.include),
+                sorted(plan.exclude),
+                sorted(sorted(group) for group in plan.any_of),
+                sorted(plan.categories),
+                sorted(plan.alcoholic),
+                plan.exact,
+            ]
+        # Without the parser, at least tell negated queries apart from the rest
+        lowered = query.lower()
+        negated = []
+        for match in NEGATION_PATTERN.finditer(lowered):
+            following = lowered[match.end():].split()
+            if following:
+                negated.append(following[0])
+        return sorted(negated)
+    
+    def _sync_catalog(self):
+        """Pick up a reindexed catalog: reload hooks run in the watcher, cached answers are dropped."""
+        if self.catalog_watcher is None:
+            return
+        version = self.catalog_watcher.current()
+        if self.response_cache is not None:
+            self.response_cache.sync_catalog_version(version)
+    
+    def invalidate_response_cache(self):
+        """Drop every cached answer, e.g. after the cocktail catalog is reindexed."""
+        if self.response_cache is not None:
+            self.response_cache.invalidate()
+    
+    def _plan_search(
+        self,
+        query: str,
+        user_preferences: Dict[str, List[str]],
+        limit: int
+    ) -> Tuple[Optional[List[Dict[str, Any]]], str, Optional[Dict[str, Any]]]:
+        """
+        Plan the cocktail search for a query.
+        
+        Queries made only of ingredient, category and alcoholic constraints
+        ("gin and grenadine, no lemon") are answered exactly from the structured
+        index. Other queries go to the embedding search, with any constraints
+        they state applied as metadata pre-filters so top-k is taken over the
+        matching subset only. Exclusions in a query naming a catalog cocktail
+        ("a margarita without salt") modify that cocktail rather than filter it
+        out, so they go to the prompt instead (see _cocktail_modifications).
+        
+        Args:
+            query: The user's query
+            user_preferences: User preferences dictionary
+            limit: Number of cocktails needed
+        
+        Returns:
+            Tuple of (exact results or None, query for the embedding search,
+            metadata filter or None)
+        """
+        filters = None
+        if self.structured_index is not None:
+            plan = self.structured_index.parse(query)
+            if plan.exact:
+                logger.debug("Answering set query from the structured index: %s", plan)
+                return self.structured_index.search(plan, limit=limit), query, None
+            if plan.cocktails and plan.exclude:
+                plan = plan._replace(exclude=frozenset())
+            filters = self.structured_index.to_filter(plan)
+            if filters:
+                logger.debug("Searching with metadata filter: %s", filters)
+        
+        enhanced_query = self._enhance_query_with_preferences(query, user_preferences)
+        logger.debug("Searching with enhanced query: %s", enhanced_query)
+        return None, enhanced_query, filters
+    
+    async def _search(self, query: str, user_preferences: Dict[str, List[str]], limit: int) -> List[Dict[str, Any]]:
+        """
+        Plan and run the cocktail search for a query (see _plan_search).
+        
+        Args:
+            query: The user's query
+            user_preferences: User preferences dictionary
+            limit: Number of cocktails needed
+        
+        Returns:
+            Matching cocktails, best first
+        """
+        exact, search_query, filters = self._plan_search(query, user_preferences, limit)
+        if exact is not None:
+            return exact
+        return await self.vector_store.asearch_cocktails(search_query, limit=limit, filters=filters)
+    
+    async def _retrieve_context(self, query: str, user_preferences: Dict[str, List[str]]) -> Tuple[List[Dict[str, Any]], str]:
+        """
+        Retrieve cocktails matching the query and the user's known preferences.
+        
+        Args:
+            query: The user's query
+            user_preferences: User preferences dictionary
+        
+        Returns:
+            Tuple of (source documents, formatted context)
+        """
+        sources = []
+        context = ""
+        
+        requested_limit = self._requested_limit(query)
+        
+        try:
+            with stage("retrieval"):
+                cocktail_results = await self._search(query, user_preferences, requested_limit)
             
-            # Retrieve user preferences
-            try:
-                user_preferences = self.memory_service.get_user_preferences(user_id)
-                logger.info(f"Retrieved user preferences: {user_preferences}")
-            except Exception as e:
-                logger.exception(f"Error retrieving user preferences: {str(e)}")
-                user_preferences = {"favorite_ingredients": [], "favorite_cocktails": []}
+            # Only the cocktails that fit the token budget are used, so only those are returned as sources
+            sources, context, tokens = self.context_builder.build(cocktail_results, requested_limit)
+            observe_prompt_tokens(tokens["candidate_tokens"], tokens["context_tokens"])
             
-            # Initialize variables
-            sources = []
-            context = ""
-            retrieved_cocktails = []
+            logger.info(
+                "Retrieved %d cocktails, %d in context (%d of %d tokens)",
+                len(cocktail_results), len(sources), tokens["context_tokens"], tokens["candidate_tokens"],
+                extra={"sample": True, "cocktails": [source["metadata"].get("name") for source in sources]}
+            )
             
-
-            requested_limit = 5  # Default value
+        except Exception as e:
+            logger.exception("Error in retrieval process: %s", e)
+        
+        return sources, context
+    
+    def _build_prompt(
+        self,
+        query: str,
+        user_preferences: Dict[str, List[str]],
+        context: str,
+        history: Optional[List[Dict[str, Any]]] = None
+    ) -> str:
+        """Build the per-request prompt; the instructions are in COCKTAIL_ADVISOR_SYSTEM_PROMPT."""
+        return build_user_prompt(query, user_preferences, context, history, self._cocktail_modifications(query))
+    
+    def _cocktail_modifications(self, query: str) -> List[str]:
+        """Exclusions applied to the catalog cocktails a query names, e.g. "Margarita without salt"."""
+        if self.structured_index is None:
+            return []
+        plan = self.structured_index.parse(query, record=False)
+        if not plan.cocktails or not plan.exclude:
+            return []
+        excluded = ", ".join(sorted(plan.exclude))
+        return [f"{name} without {excluded}" for name in sorted(plan.cocktails)]
+    
+    async def _answer_query(
+        self,
+        user_id: str,
+        query: str,
+        history: Optional[List[Dict[str, Any]]] = None
+    ) -> Tuple[str, List[Dict[str, Any]]]:
+        """
+        Retrieve cocktails with the user's known preferences and generate the answer.
+        
+        Args:
+            user_id: Unique identifier for the user
+            query: The user's query
+            history: Recent conversation turns to include in the prompt
+        
+        Returns:
+            Tuple of (response text, source documents)
+        """
+        try:
+            self._sync_catalog()
+            user_preferences = await self._load_preferences(user_id)
             
-            # Check if user specified a number in their query
-            number_match = re.search(r'(?:show|give|get|list|display|recommend|suggest|find|want|need)\s+(?:me\s+)?(\d+)', query.lower())
-            if number_match:
-                requested_number = int(number_match.group(1))
-                requested_limit = max(1, max(10, requested_number))
+            # Repeat questions are answered without retrieval or the LLM
+            cached, cache_key = await self._lookup_cached_response(query, user_preferences, history)
+            if cached is not None:
+                return cached
             
-            try:
-    
-                enhanced_query = self._enhance_query_with_preferences(query, user_preferences)
-                logger.info(f"Searching with enhanced query: {enhanced_query}")
-                
-
-                cocktail_results = self.vector_store.search_cocktails(enhanced_query, limit=10)
-                
-                
-                limited_results = cocktail_results[:requested_limit]
-                sources = limited_results
-
-                # Build context from retrieved results without assuming metadata fields
-                if requested_limit == 1:
-                    context += "Based on your query, here is a relevant cocktail:\n\n"
-                else:
-                    context += f"Based on your query, here are {requested_limit} relevant cocktails:\n\n"
-                
-                # Format retrieved cocktail information as raw text
-                for i, cocktail in enumerate(limited_results):
-                    content = cocktail.get("metadata", "No information available")
-                    context += f"{i+1}. {content}\n\n"
-                    
-                    # Extract cocktail name if available
-                    if isinstance(content, dict) and "name" in content:
-                        retrieved_cocktails.append(content["name"])
-                
-                # Log the retrieved cocktails
-                logger.info(f"Retrieved cocktails: {retrieved_cocktails}")
-                
-            except Exception as e:
-                logger.exception(f"Error in retrieval process: {str(e)}")
+            sources, context = await self._retrieve_context(query, user_preferences)
             
             # Generate response using LLM
             try:
-
-                augmented_prompt = f"""
-                You are a Cocktail Advisor chatbot that provides information about cocktails based on available data. Answer the user's question using the information provided below.
-
-                User's question: {query}
-
-                User's known preferences:
-                - Favorite ingredients: {', '.join(user_preferences['favorite_ingredients']) if user_preferences['favorite_ingredients'] else 'None shared yet'}
-                - Favorite cocktails: {', '.join(user_preferences['favorite_cocktails']) if user_preferences['favorite_cocktails'] else 'None shared yet'}
-
-                Retrieved cocktail information:
-                {context}
-
-                INSTRUCTIONS:
-                1. Focus on cocktails mentioned in the retrieved information above. Information must be from retrieved data.
-                2. If information is not available, simply state "I don't have that information about that" without generating placeholder content.
-                3. Base your answers on the retrieved information provided.
-                4. If no cocktails are available in the retrieved data, acknowledge this directly without creating empty lists.
-                5. Only provide the number of cocktails requested if they're actually available in the data. If fewer cocktails are available than requested, only discuss those that are available.
-                6. If user asks about his loved ingredients or flavors, use User's known preferences to personalize your response.
-                7. When the retrieval included user preferences, acknowledge this by mentioning "Based on your preference for [relevant preference]..."
-                
-                Formatting:
-                1. Use relevant emojis where appropriate
-                2. Format cocktail names in **bold**
-                3. Use bullet points for ingredients and instructions
-                4. Keep formatting elements proportional to the amount of actual content
-                5. End with a friendly closing if cocktail information was provided
-
-                Be informative while strictly using only the retrieved information. Adapt your response length and style to match the available data.
-                """
+                augmented_prompt = self._build_prompt(query, user_preferences, context, history)
                 
-                response = await self.llm_service.generate_text(augmented_prompt, system_prompt="You are a professional bartender who can identify drinks and make personalized recommendations")
+                with stage("generation"):
+                    response = await self.llm_service.generate_text(augmented_prompt, system_prompt=COCKTAIL_ADVISOR_SYSTEM_PROMPT)
+                self._store_cached_response(cache_key, response, sources)
                 return response, sources
             except Exception as e:
-                logger.exception(f"Error generating response: {str(e)}")
+                logger.exception("Error generating response: %s", e)
                 return "I'm sorry, I encountered an error while generating a response. Please try again.", sources
         
         except Exception as e:
-            logger.exception(f"Unhandled error in process_query: {str(e)}")
-            return "I'm sorry, something went wrong. Please try again later.", []
\ No newline at end of file
+            logger.exception("Unhandled error in process_query: %s", e)
+            return "I'm sorry, something went wrong. Please try again later.", []
+    
+    async def process_batch(
+        self,
+        items: List[Dict[str, Any]],
+        max_concurrency: int = BATCH_LLM_CONCURRENCY
+    ) -> AsyncIterator[Dict[str, Any]]:
+        """
+        Answer many independent queries, yielding each result as soon as it is ready.
+        
+        Meant for offline and bulk jobs. Preferences are read but not extracted,
+        no session history is used or written, and the response cache is
+        bypassed so every answer is freshly generated. Retrieval runs once for
+        the whole batch: every query needing the embedding search is embedded
+        in one encode call and sent to the vector backend as one bulk query.
+        Generations then run at most ``max_concurrency`` at a time.
+        
+        Args:
+            items: Queries as {"message": ..., "user_id": ..., "id": ...};
+                user_id and id are optional
+            max_concurrency: LLM generations in flight at once
+        
+        Yields:
+            {"index", "id", "response", "sources"} per answered item, or
+            {"index", "id", "error"} for an item that failed, in completion order
+        """
+        queries = []
+        for index, item in enumerate(items):
+            message = (item.get("message") or "").strip()
+            if not message:
+                yield {"index": index, "id": item.get("id"), "error": "Message must not be empty"}
+                continue
+            queries.append((index, item.get("id"), item.get("user_id") or "default_user", message))
+        if not queries:
+            return
+        
+        self._sync_catalog()
+        user_ids = list(dict.fromkeys(user_id for _, _, user_id, _ in queries))
+        loaded = await asyncio.gather(*(self._load_preferences(user_id) for user_id in user_ids))
+        preferences = dict(zip(user_ids, loaded))
+        
+        # Plan every query, then run all the embedding searches together
+        limits, plans, searches = {}, {}, []
+        for index, _, user_id, message in queries:
+            limits[index] = self._requested_limit(message)
+            exact, search_query, filters = self._plan_search(message, preferences[user_id], limits[index])
+            if exact is not None:
+                plans[index] = exact
+            else:
+                searches.append((index, search_query, filters))
+        
+        search_error = None
+        if searches:
+            try:
+                with stage("retrieval"):
+                    results = await self.vector_store.asearch_cocktails_many(
+                        [search_query for _, search_query, _ in searches],
+                        [limits[index] for index, _, _ in searches],
+                        [filters for _, _, filters in searches]
+                    )
+                plans.update((index, result) for (index, _, _), result in zip(searches, results))
+            except Exception as e:
+                logger.exception("Error in batch retrieval: %s", e)
+                search_error = f"Retrieval failed: {e}"
+        
+        semaphore = asyncio.Semaphore(max(1, max_concurrency))
+        
+        async def answer(index: int, item_id: Any, user_id: str, message: str) -> Dict[str, Any]:
+            if index not in plans:
+                return {"index": index, "id": item_id, "error": search_error}
+            try:
+                sources, context, tokens = self.context_builder.build(plans[index], limits[index])
+                observe_prompt_tokens(tokens["candidate_tokens"], tokens["context_tokens"])
+                prompt = self._build_prompt(message, preferences[user_id], context)
+                async with semaphore:
+                    with stage("generation"):
+                        response = await self.llm_service.generate_text(prompt, system_prompt=COCKTAIL_ADVISOR_SYSTEM_PROMPT)
+                return {"index": index, "id": item_id, "response": response, "sources": sources}
+            except Exception as e:
+                logger.warning("Batch item %d failed: %s", index, e)
+                return {"index": index, "id": item_id, "error": str(e) or type(e).__name__}
+        
+        tasks = [asyncio.ensure_future(answer(*query)) for query in queries]
+        try:
+            for completed in asyncio.as_completed(tasks):
+                yield await completed
+        finally:
+            # The consumer may stop early, e.g. when the client disconnects
+            for task in tasks:
+                task.cancel()
+    
+    async def stream_query(self, user_id: str, query: str, session_id: Optional[str] = None) -> AsyncIterator[Dict[str, Any]]:
+        """
+        Process a user query like process_query, streaming the answer as it is generated.
+        
+        Args:
+            user_id: Unique identifier for the user
+            query: The user's query
+            session_id: Conversation the query belongs to; the turn is stored
+                in it once the answer is complete
+        
+        Yields:
+            Events: {"event": "sources", "data": [...]} once retrieval finishes,
+            {"event": "token", "data": "..."} per LLM chunk, then {"event": "done"}
+            or {"event": "error", "data": "..."}
+        """
+        history = await self._load_history(session_id)
+        
+        extraction = None
+        if self.preference_mode == "blocking":
+            await self._save_preferences(user_id, query)
+        elif self.preference_mode == "background":
+            self.memory_service.schedule_preference_extraction(user_id, query)
+        else:
+            extraction = asyncio.create_task(self._save_preferences(user_id, query))
+        
+        try:
+            self._sync_catalog()
+            user_preferences = await self._load_preferences(user_id)
+            
+            cached, cache_key = await self._lookup_cached_response(query, user_preferences, history)
+            if cached is not None:
+                response, sources = cached
+                yield {"event": "sources", "data": sources}
+                yield {"event": "token", "data": response}
+                await self._save_turns(session_id, query, response)
+                yield {"event": "done"}
+                return
+            
+            sources, context = await self._retrieve_context(query, user_preferences)
+            yield {"event": "sources", "data": sources}
+            
+            try:
+                augmented_prompt = self._build_prompt(query, user_preferences, context, history)
+                chunks = []
+                async for token in self.llm_service.stream_text(augmented_prompt, system_prompt=COCKTAIL_ADVISOR_SYSTEM_PROMPT):
+                    chunks.append(token)
+                    yield {"event": "token", "data": token}
+                response = "".join(chunks).strip()
+                self._store_cached_response(cache_key, response, sources)
+                await self._save_turns(session_id, query, response)
+                yield {"event": "done"}
+            except Exception as e:
+                logger.exception("Error streaming response: %s", e)
+                yield {"event": "error", "data": "I'm sorry, I encountered an error while generating a response. Please try again."}
+        
+        except Exception as e:
+            logger.exception("Unhandled error in stream_query: %s", e)
+            yield {"event": "error", "data": "I'm sorry, something went wrong. Please try again later."}
+        finally:
+            if extraction is not None:
+                await extraction
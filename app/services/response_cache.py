@@ -0,0 +1,221 @@
+from collections import OrderedDict
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+import hashlib
+import itertools
+import json
+import logging
+import os
+import threading
+import time
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+
+def preference_fingerprint(preferences: Dict[str, List[str]], *extra: Any) -> str:
+    """
+    Hash the inputs besides the query that shape an answer.
+
+    Args:
+        preferences: User preferences dictionary
+        *extra: Further values that must match for a cached answer to be reused
+
+    Returns:
+        Short hex digest
+    """
+    payload = {
+        "ingredients": sorted(item.lower() for item in preferences.get("favorite_ingredients", [])),
+        "cocktails": sorted(item.lower() for item in preferences.get("favorite_cocktails", [])),
+        "extra": list(extra),
+    }
+    return hashlib.sha1(json.dumps(payload, sort_keys=True, default=str).encode("utf-8")).hexdigest()
+
+
+class CatalogVersionWatcher:
+    """
+    Reads the catalog version recorded by the ingestion checkpoint.
+
+    The file is re-read only when its modification time changes, and stat'ed
+    at most once per ``interval`` seconds. Callbacks registered with
+    ``subscribe`` run when the version changes after the first read, so
+    in-process indexes built from the catalog can be rebuilt.
+    """
+
+    def __init__(self, state_path: str, interval: float = 1.0):
+        self.state_path = state_path
+        self.interval = interval
+        self._checked_at = 0.0
+        self._mtime = None
+        self._version = None
+        self._observed = False
+        self._listeners: List[Callable[[Optional[str]], None]] = []
+        self._lock = threading.Lock()
+
+    def subscribe(self, callback: Callable[[Optional[str]], None]):
+        """Call ``callback(new_version)`` whenever the catalog version changes."""
+        self._listeners.append(callback)
+
+    def current(self) -> Optional[str]:
+        changed = False
+        with self._lock:
+            now = time.monotonic()
+            if now - self._checked_at < self.interval:
+                return self._version
+            self._checked_at = now
+            previous, observed = self._version, self._observed
+            self._observed = True
+            try:
+                mtime = os.stat(self.state_path).st_mtime
+            except OSError:
+                return self._version
+            if mtime != self._mtime:
+                self._mtime = mtime
+                try:
+                    with open(self.state_path, "r", encoding="utf-8") as f:
+                        self._version = json.load(f).get("catalog_version")
+                except (OSError, ValueError) as e:
+                    logger.warning("Could not read catalog version from %s: %s", self.state_path, e)
+            version = self._version
+            changed = observed and version != previous
+
+        if changed:
+            for callback in self._listeners:
+                try:
+                    callback(version)
+                except Exception as e:
+                    logger.exception("Catalog change handler failed: %s", e)
+        return version
+
+
+class SemanticResponseCache:
+    """
+    Cache of generated answers keyed on query embedding plus a fingerprint.
+
+    A lookup returns a stored answer when an entry with the same fingerprint
+    has a query embedding within ``threshold`` cosine similarity. Entries are
+    evicted least-recently-used past ``max_entries``, expire after
+    ``ttl_seconds`` and are all dropped when the catalog version changes.
+    """
+
+    def __init__(self, threshold: float = 0.95, max_entries: int = 1000, ttl_seconds: float = 3600.0):
+        self.threshold = threshold
+        self.max_entries = max(1, max_entries)
+        self.ttl_seconds = ttl_seconds
+
+        self._lock = threading.Lock()
+        self._ids = itertools.count()
+        # entry id -> entry; ordered from least to most recently used
+        self._entries: "OrderedDict[int, Dict[str, Any]]" = OrderedDict()
+        self._by_fingerprint: Dict[str, set] = {}
+        self._catalog_version = None
+
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+
+    @staticmethod
+    def _normalize(vector: Sequence[float]) -> np.ndarray:
+        array = np.asarray(vector, dtype=np.float32)
+        norm = np.linalg.norm(array)
+        return array / norm if norm else array
+
+    def _remove(self, entry_id: int):
+        entry = self._entries.pop(entry_id, None)
+        if entry is None:
+            return
+        ids = self._by_fingerprint.get(entry["fingerprint"])
+        if ids is not None:
+            ids.discard(entry_id)
+            if not ids:
+                del self._by_fingerprint[entry["fingerprint"]]
+
+    def sync_catalog_version(self, version: Optional[str]):
+        """Drop every entry if the catalog was reindexed since they were stored."""
+        with self._lock:
+            if version == self._catalog_version:
+                return
+            had_entries = bool(self._entries)
+            self._catalog_version = version
+        if had_entries:
+            logger.info("Catalog version changed to %s, invalidating response cache", version)
+            self.invalidate()
+
+    def invalidate(self):
+        """Drop every cached answer."""
+        with self._lock:
+            self._entries.clear()
+            self._by_fingerprint.clear()
+            self.invalidations += 1
+
+    def lookup(self, vector: Sequence[float], fingerprint: str) -> Optional[Tuple[str, List[Dict[str, Any]], float]]:
+        """
+        Find a cached answer for a semantically equivalent query.
+
+        Args:
+            vector: Embedding of the new query
+            fingerprint: Fingerprint of the user's preferences and other answer inputs
+
+        Returns:
+            Tuple of (response text, sources, similarity), or None on a miss
+        """
+        query_vector = self._normalize(vector)
+        now = time.time()
+        with self._lock:
+            candidates = []
+            for entry_id in list(self._by_fingerprint.get(fingerprint, ())):
+                entry = self._entries[entry_id]
+                if now - entry["created_at"] > self.ttl_seconds:
+                    self._remove(entry_id)
+                    continue
+                candidates.append(entry_id)
+
+            if candidates:
+                matrix = np.vstack([self._entries[entry_id]["vector"] for entry_id in candidates])
+                similarities = matrix @ query_vector
+                best = int(np.argmax(similarities))
+                if similarities[best] >= self.threshold:
+                    entry_id = candidates[best]
+                    self._entries.move_to_end(entry_id)
+                    self.hits += 1
+                    entry = self._entries[entry_id]
+                    return entry["response"], entry["sources"], float(similarities[best])
+
+            self.misses += 1
+            return None
+
+    def store(self, vector: Sequence[float], fingerprint: str, response: str, sources: List[Dict[str, Any]]):
+        """
+        Cache an answer.
+
+        Args:
+            vector: Embedding of the query
+            fingerprint: Fingerprint of the user's preferences and other answer inputs
+            response: Generated answer
+            sources: Retrieved cocktails returned with the answer
+        """
+        with self._lock:
+            entry_id = next(self._ids)
+            self._entries[entry_id] = {
+                "vector": self._normalize(vector),
+                "fingerprint": fingerprint,
+                "response": response,
+                "sources": sources,
+                "created_at": time.time(),
+            }
+            self._by_fingerprint.setdefault(fingerprint, set()).add(entry_id)
+            while len(self._entries) > self.max_entries:
+                self._remove(next(iter(self._entries)))
+
+    def stats(self) -> Dict[str, Any]:
+        """Return cache size and hit/miss counters."""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "size": len(self._entries),
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+                "invalidations": self.invalidations,
+                "catalog_version": self._catalog_version,
+            }
@@ -0,0 +1,227 @@
+from abc import ABC, abstractmethod
+from collections import OrderedDict, deque
+from datetime import datetime
+from typing import Any, Callable, Deque, Dict, List, Optional
+import asyncio
+import logging
+import os
+import sqlite3
+import threading
+
+logger = logging.getLogger(__name__)
+
+
+class SessionBackend(ABC):
+    """Durable storage for conversation turns."""
+
+    @abstractmethod
+    def load(self, session_id: str, limit: int) -> List[Dict[str, Any]]:
+        """Return up to ``limit`` most recent turns, oldest first."""
+
+    @abstractmethod
+    def append(self, session_id: str, turns: List[Dict[str, Any]], keep: int):
+        """Add turns to the session and drop all but the ``keep`` most recent."""
+
+    def close(self):
+        """Release any resources held by the backend."""
+
+
+class InMemorySessionBackend(SessionBackend):
+    """Non-durable backend, for tests and single-process development."""
+
+    def __init__(self):
+        self._sessions: Dict[str, List[Dict[str, Any]]] = {}
+        self._lock = threading.Lock()
+
+    def load(self, session_id, limit):
+        with self._lock:
+            return list(self._sessions.get(session_id, [])[-limit:])
+
+    def append(self, session_id, turns, keep):
+        with self._lock:
+            self._sessions[session_id] = (self._sessions.get(session_id, []) + list(turns))[-keep:]
+
+
+class SQLiteSessionBackend(SessionBackend):
+    """Turns stored one row each in a local SQLite database, trimmed to the ring size on write."""
+
+    def __init__(self, path: str):
+        if path != ":memory:":
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._connection = sqlite3.connect(path, check_same_thread=False)
+        self._lock = threading.Lock()
+        with self._lock, self._connection:
+            self._connection.execute("PRAGMA journal_mode=WAL")
+            self._connection.execute(
+                "CREATE TABLE IF NOT EXISTS session_turns ("
+                "id INTEGER PRIMARY KEY AUTOINCREMENT, session_id TEXT NOT NULL, "
+                "role TEXT NOT NULL, content TEXT NOT NULL, created_at TEXT)"
+            )
+            self._connection.execute(
+                "CREATE INDEX IF NOT EXISTS session_turns_session ON session_turns (session_id, id)"
+            )
+
+    def load(self, session_id, limit):
+        with self._lock:
+            rows = self._connection.execute(
+                "SELECT role, content, created_at FROM session_turns WHERE session_id = ? ORDER BY id DESC LIMIT ?",
+                (session_id, limit)
+            ).fetchall()
+        return [{"role": role, "content": content, "created_at": created_at} for role, content, created_at in reversed(rows)]
+
+    def append(self, session_id, turns, keep):
+        with self._lock, self._connection:
+            self._connection.executemany(
+                "INSERT INTO session_turns (session_id, role, content, created_at) VALUES (?, ?, ?, ?)",
+                [(session_id, turn["role"], turn["content"], turn.get("created_at")) for turn in turns]
+            )
+            self._connection.execute(
+                "DELETE FROM session_turns WHERE session_id = ? AND id NOT IN ("
+                "SELECT id FROM session_turns WHERE session_id = ? ORDER BY id DESC LIMIT ?)",
+                (session_id, session_id, keep)
+            )
+
+    def close(self):
+        with self._lock:
+            self._connection.close()
+
+
+class SessionStore:
+    """
+    Server-side conversation history.
+
+    Each session keeps its last ``max_turns`` turns in a ring buffer. Recently
+    used sessions stay in an in-process LRU cache in front of the durable
+    backend, so the history of an active conversation is read from memory.
+    """
+
+    def __init__(self, backend: SessionBackend, max_turns: int = 20, cache_size: int = 10000):
+        self.backend = backend
+        self.max_turns = max(1, max_turns)
+        self.cache_size = max(1, cache_size)
+        self._cache: "OrderedDict[str, Deque[Dict[str, Any]]]" = OrderedDict()
+        self._lock = threading.RLock()
+        self.hits = 0
+        self.misses = 0
+
+    def _cache_put(self, session_id: str, turns: Deque[Dict[str, Any]]):
+        self._cache[session_id] = turns
+        self._cache.move_to_end(session_id)
+        while len(self._cache) > self.cache_size:
+            self._cache.popitem(last=False)
+
+    def _ring(self, session_id: str) -> Deque[Dict[str, Any]]:
+        with self._lock:
+            turns = self._cache.get(session_id)
+            if turns is not None:
+                self._cache.move_to_end(session_id)
+                self.hits += 1
+                return turns
+            self.misses += 1
+            turns = deque(self.backend.load(session_id, self.max_turns), maxlen=self.max_turns)
+            self._cache_put(session_id, turns)
+            return turns
+
+    def get_history(self, session_id: str) -> List[Dict[str, Any]]:
+        """
+        Return the stored turns of a session, oldest first.
+
+        Args:
+            session_id: Conversation identifier
+
+        Returns:
+            Turns as {"role", "content", "created_at"} (empty for a new session)
+        """
+        with self._lock:
+            return list(self._ring(session_id))
+
+    def recent_turns(self, session_id: str, max_tokens: int, count_tokens: Callable[[str], int]) -> List[Dict[str, Any]]:
+        """
+        Return the most recent turns that fit a token budget, oldest first.
+
+        Args:
+            session_id: Conversation identifier
+            max_tokens: Token budget for the turns' content
+            count_tokens: Token counter for a text
+
+        Returns:
+            The longest suffix of the history within the budget
+        """
+        selected = []
+        used = 0
+        for turn in reversed(self.get_history(session_id)):
+            tokens = count_tokens(turn["content"]) + 2
+            if used + tokens > max_tokens:
+                break
+            selected.append(turn)
+            used += tokens
+        selected.reverse()
+        return selected
+
+    def append(self, session_id: str, turns: List[Dict[str, str]]):
+        """
+        Add turns to a session and persist them.
+
+        Args:
+            session_id: Conversation identifier
+            turns: Turns as {"role", "content"}, oldest first
+        """
+        created_at = datetime.now().isoformat()
+        turns = [{"role": turn["role"], "content": turn["content"], "created_at": created_at} for turn in turns]
+        with self._lock:
+            self._ring(session_id).extend(turns)
+            self.backend.append(session_id, turns, self.max_turns)
+
+    def is_cached(self, session_id: str) -> bool:
+        with self._lock:
+            return session_id in self._cache
+
+    async def aget_history(self, session_id: str) -> List[Dict[str, Any]]:
+        """Async variant of get_history; only cache misses leave the event loop."""
+        if self.is_cached(session_id):
+            return self.get_history(session_id)
+        return await asyncio.to_thread(self.get_history, session_id)
+
+    async def arecent_turns(self, session_id: str, max_tokens: int, count_tokens: Callable[[str], int]) -> List[Dict[str, Any]]:
+        """Async variant of recent_turns; only cache misses leave the event loop."""
+        if not self.is_cached(session_id):
+            await asyncio.to_thread(self.get_history, session_id)
+        return self.recent_turns(session_id, max_tokens, count_tokens)
+
+    async def aappend(self, session_id: str, turns: List[Dict[str, str]]):
+        """Async variant of append; the backend write runs on a worker thread."""
+        await asyncio.to_thread(self.append, session_id, turns)
+
+    def stats(self) -> Dict[str, Any]:
+        """Return LRU cache metrics."""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "size": len(self._cache),
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+            }
+
+    def close(self):
+        self.backend.close()
+
+
+def create_session_store(backend: str, path: str, max_turns: int, cache_size: int) -> SessionStore:
+    """
+    Build the session store selected in config.
+
+    Args:
+        backend: "sqlite" or "memory"
+        path: SQLite database path
+        max_turns: Turns kept per session
+        cache_size: Number of sessions kept in the LRU cache
+
+    Returns:
+        The configured SessionStore
+    """
+    if backend == "sqlite":
+        return SessionStore(SQLiteSessionBackend(path), max_turns=max_turns, cache_size=cache_size)
+    if backend == "memory":
+        return SessionStore(InMemorySessionBackend(), max_turns=max_turns, cache_size=cache_size)
+    raise ValueError(f"Unknown session store backend: {backend}")
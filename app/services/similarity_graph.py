@@ -0,0 +1,168 @@
+from typing import Any, Dict, List, Optional, Sequence
+import json
+import logging
+import os
+
+import numpy as np
+
+from app.services.catalog import catalog_version, cocktail_id, row_hash
+
+logger = logging.getLogger(__name__)
+
+# One row per cocktail, one (neighbor, score) pair per column
+NEIGHBOR_DTYPE = np.dtype([("index", "<i4"), ("score", "<f4")])
+
+
+def _sidecar_path(path: str) -> str:
+    return os.path.splitext(path)[0] + ".json"
+
+
+def ingredient_jaccard(ingredient_sets: Sequence[set]) -> np.ndarray:
+    """
+    Pairwise Jaccard overlap of ingredient sets.
+
+    Args:
+        ingredient_sets: Lowercased ingredient names per cocktail
+
+    Returns:
+        Symmetric (n, n) float32 matrix
+    """
+    vocabulary = {name: column for column, name in enumerate(sorted(set().union(*ingredient_sets)))}
+    incidence = np.zeros((len(ingredient_sets), len(vocabulary)), dtype=np.float32)
+    for row, ingredients in enumerate(ingredient_sets):
+        for name in ingredients:
+            incidence[row, vocabulary[name]] = 1.0
+    intersection = incidence @ incidence.T
+    sizes = incidence.sum(axis=1)
+    union = sizes[:, None] + sizes[None, :] - intersection
+    return np.divide(intersection, union, out=np.zeros_like(intersection), where=union > 0)
+
+
+def build_similarity_graph(
+    embeddings: np.ndarray,
+    ingredient_sets: Sequence[set],
+    top_n: int = 10,
+    jaccard_weight: float = 0.3
+) -> np.ndarray:
+    """
+    Compute each cocktail's nearest neighbors.
+
+    The score blends cosine similarity of the cocktail embeddings with the
+    Jaccard overlap of their ingredients.
+
+    Args:
+        embeddings: (n, dim) cocktail embeddings
+        ingredient_sets: Lowercased ingredient names per cocktail
+        top_n: Neighbors kept per cocktail
+        jaccard_weight: Weight of the ingredient overlap, between 0 and 1
+
+    Returns:
+        (n, top_n) array of NEIGHBOR_DTYPE, best neighbor first
+    """
+    vectors = np.asarray(embeddings, dtype=np.float32)
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    vectors = vectors / np.where(norms == 0, 1.0, norms)
+
+    scores = (1.0 - jaccard_weight) * (vectors @ vectors.T) + jaccard_weight * ingredient_jaccard(ingredient_sets)
+    np.fill_diagonal(scores, -np.inf)
+
+    count = len(vectors)
+    top_n = min(top_n, count - 1)
+    graph = np.zeros((count, top_n), dtype=NEIGHBOR_DTYPE)
+    if top_n <= 0:
+        return graph
+    candidates = np.argpartition(-scores, top_n - 1, axis=1)[:, :top_n]
+    candidate_scores = np.take_along_axis(scores, candidates, axis=1)
+    order = np.argsort(-candidate_scores, axis=1)
+    graph["index"] = np.take_along_axis(candidates, order, axis=1)
+    graph["score"] = np.take_along_axis(candidate_scores, order, axis=1)
+    return graph
+
+
+def save_similarity_graph(path: str, graph: np.ndarray, names: List[str], info: Optional[Dict[str, Any]] = None):
+    """
+    Write the graph as a .npy array plus a JSON sidecar with the cocktail names.
+
+    Args:
+        path: Target .npy path
+        graph: Array returned by build_similarity_graph
+        names: Cocktail name for each row
+        info: Extra fields recorded in the sidecar (catalog version, weights)
+    """
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    tmp_path = f"{path}.tmp.npy"
+    np.save(tmp_path, graph)
+    os.replace(tmp_path, path)
+    with open(_sidecar_path(path), "w", encoding="utf-8") as f:
+        json.dump({"names": names, **(info or {})}, f)
+
+
+class SimilarityGraph:
+    """
+    Precomputed cocktail-to-cocktail neighbors, memory-mapped from disk.
+
+    Lookups are a dictionary access plus a row read; no encoder or vector
+    backend is involved.
+    """
+
+    def __init__(self, graph: np.ndarray, names: List[str], cocktails: Dict[str, Dict[str, Any]], info: Optional[Dict[str, Any]] = None):
+        self.graph = graph
+        self.names = names
+        self.info = info or {}
+        self._rows = {name.lower(): row for row, name in enumerate(names)}
+        self._cocktails = {name.lower(): cocktail for name, cocktail in cocktails.items()}
+
+    @classmethod
+    def load(cls, path: str, cocktails: List[Dict[str, Any]]) -> Optional["SimilarityGraph"]:
+        """
+        Memory-map a graph written by the similarity graph job.
+
+        Args:
+            path: .npy path passed to save_similarity_graph
+            cocktails: Catalog metadata used to render neighbors
+
+        Returns:
+            The graph, or None if it has not been built yet or was built from
+            another version of the catalog
+        """
+        if not os.path.exists(path):
+            logger.warning("Similarity graph not found at %s; run python -m app.tools.similarity_graph", path)
+            return None
+        with open(_sidecar_path(path), "r", encoding="utf-8") as f:
+            info = json.load(f)
+        built_for = info.get("catalog_version")
+        current = catalog_version({cocktail_id(cocktail["name"]): row_hash(cocktail) for cocktail in cocktails})
+        if built_for != current:
+            # Neighbors of removed or changed rows would be served as if current
+            logger.warning(
+                "Similarity graph at %s was built for catalog version %s, not %s; "
+                "run python -m app.tools.similarity_graph", path, built_for, current
+            )
+            return None
+        names = info.pop("names")
+        graph = np.load(path, mmap_mode="r")
+        return cls(graph, names, {cocktail["name"]: cocktail for cocktail in cocktails}, info)
+
+    def __contains__(self, name: str) -> bool:
+        return name.lower() in self._rows
+
+    def neighbors(self, name: str, limit: int = 5) -> Optional[List[Dict[str, Any]]]:
+        """
+        Return the cocktails most similar to the named one.
+
+        Args:
+            name: Cocktail name, case-insensitive
+            limit: Maximum number of neighbors
+
+        Returns:
+            Results as {"metadata": ..., "score": ...}, or None for an unknown cocktail
+        """
+        row = self._rows.get(name.lower())
+        if row is None:
+            return None
+        results = []
+        for neighbor in self.graph[row][:limit]:
+            neighbor_name = self.names[int(neighbor["index"])]
+            metadata = self._cocktails.get(neighbor_name.lower(), {"name": neighbor_name})
+            results.append({"metadata": metadata, "score": float(neighbor["score"])})
+        return results
@@ -0,0 +1,151 @@
+from collections import Counter, defaultdict
+from typing import Any, Callable, Dict, List, Optional
+import math
+import re
+
+from app.services.catalog import cocktail_metadata
+from app.services.keyword_matcher import KeywordMatcher
+from app.services.vector_backends import matches_filter
+
+TOKEN_PATTERN = re.compile(r"[a-z0-9]+")
+
+STOPWORDS = {
+    "a", "an", "and", "are", "as", "at", "be", "by", "can", "for", "from", "give", "i", "in", "is",
+    "it", "me", "my", "of", "on", "or", "show", "some", "that", "the", "this", "to", "what",
+    "which", "with", "you", "your", "cocktail", "cocktails", "drink", "drinks", "recommend",
+}
+
+# How many times each field's tokens are counted, a simple BM25F-style boost
+FIELD_WEIGHTS = {"name": 3, "ingredients": 2, "category": 1, "desc": 1}
+
+
+def tokenize(text: str) -> List[str]:
+    """Lowercase word tokens with stopwords removed."""
+    return [token for token in TOKEN_PATTERN.findall(text.lower()) if token not in STOPWORDS]
+
+
+class BM25Index:
+    """
+    In-process inverted index over cocktail names, ingredients and descriptions.
+
+    Scores use Okapi BM25 with field boosts applied as repeated term counts.
+    Results have the same shape as VectorStoreService search results.
+    """
+
+    def __init__(self, documents: List[Dict[str, Any]], k1: float = 1.5, b: float = 0.75):
+        self.documents = documents
+        self.k1 = k1
+        self.b = b
+
+        self._postings: Dict[str, List[tuple]] = defaultdict(list)
+        self._lengths: List[int] = []
+        for position, document in enumerate(documents):
+            counts = Counter()
+            for field, weight in FIELD_WEIGHTS.items():
+                value = document.get(field, "")
+                text = " ".join(value) if isinstance(value, list) else str(value or "")
+                for token in tokenize(text):
+                    counts[token] += weight
+            self._lengths.append(sum(counts.values()))
+            for token, frequency in counts.items():
+                self._postings[token].append((position, frequency))
+
+        self._average_length = sum(self._lengths) / len(self._lengths) if self._lengths else 0.0
+        total = len(documents)
+        self._idf = {
+            token: math.log(1 + (total - len(postings) + 0.5) / (len(postings) + 0.5))
+            for token, postings in self._postings.items()
+        }
+        # Names that are also ingredients ("Irish Cream", "Limeade") do not identify a cocktail on their own
+        ingredient_names = {ingredient.lower() for document in documents for ingredient in document.get("ingredients", [])}
+        self._names = KeywordMatcher(
+            (document["name"], position)
+            for position, document in enumerate(documents)
+            if document["name"].lower() not in ingredient_names
+        )
+
+    @classmethod
+    def from_catalog(cls, cocktails: List[Dict[str, Any]]) -> "BM25Index":
+        """Build the index from catalog rows loaded with app.services.catalog."""
+        return cls([cocktail_metadata(cocktail) for cocktail in cocktails])
+
+    def search(self, query: str, limit: int = 10, filters: Optional[Dict[str, Any]] = None) -> List[Dict[str, Any]]:
+        """
+        Rank cocktails against the query with BM25.
+
+        Args:
+            query: Free-text query
+            limit: Maximum number of results
+            filters: Optional Pinecone-style metadata filter
+
+        Returns:
+            Results as {"metadata": ..., "score": ...}, best first
+        """
+        scores: Dict[int, float] = defaultdict(float)
+        for token in set(tokenize(query)):
+            idf = self._idf.get(token)
+            if idf is None:
+                continue
+            for position, frequency in self._postings[token]:
+                length_norm = 1 - self.b + self.b * self._lengths[position] / self._average_length
+                scores[position] += idf * frequency * (self.k1 + 1) / (frequency + self.k1 * length_norm)
+
+        ranked = sorted(scores.items(), key=lambda item: item[1], reverse=True)
+        results = []
+        for position, score in ranked:
+            document = self.documents[position]
+            if filters and not matches_filter(document, filters):
+                continue
+            results.append({"metadata": document, "score": score})
+            if len(results) >= limit:
+                break
+        return results
+
+    def exact_name_matches(self, query: str, filters: Optional[Dict[str, Any]] = None) -> List[Dict[str, Any]]:
+        """
+        Cocktails whose full name appears in the query as a whole phrase.
+
+        Args:
+            query: Free-text query
+            filters: Optional Pinecone-style metadata filter
+
+        Returns:
+            Results as {"metadata": ..., "score": 1.0}, longest names first
+        """
+        results = []
+        seen = set()
+        for match in self._names.find_longest(query):
+            for position in match.values:
+                document = self.documents[position]
+                if position in seen or (filters and not matches_filter(document, filters)):
+                    continue
+                seen.add(position)
+                results.append({"metadata": document, "score": 1.0})
+        return results
+
+
+def reciprocal_rank_fusion(
+    result_lists: Dict[str, List[Dict[str, Any]]],
+    k: int = 60,
+    key: Callable[[Dict[str, Any]], Any] = lambda result: result["metadata"].get("name")
+) -> List[Dict[str, Any]]:
+    """
+    Merge ranked result lists with reciprocal rank fusion.
+
+    Args:
+        result_lists: Ranked results per retriever, e.g. {"dense": [...], "sparse": [...]}
+        k: RRF damping constant
+        key: Identifies the same document across lists
+
+    Returns:
+        Fused results, best first; "score" is the RRF score and each retriever's
+        original score is kept as "<name>_score"
+    """
+    fused: Dict[Any, Dict[str, Any]] = {}
+    for retriever, results in result_lists.items():
+        for rank, result in enumerate(results, start=1):
+            document_key = key(result)
+            entry = fused.setdefault(document_key, {"metadata": result["metadata"], "score": 0.0})
+            entry["score"] += 1.0 / (k + rank)
+            entry[f"{retriever}_score"] = result["score"]
+    return sorted(fused.values(), key=lambda entry: entry["score"], reverse=True)
@@ -0,0 +1,284 @@
+from typing import Any, Dict, FrozenSet, Iterator, List, NamedTuple, Optional, Tuple
+import logging
+import re
+import threading
+
+from app.services.catalog import cocktail_metadata
+from app.services.keyword_matcher import KeywordMatcher
+
+logger = logging.getLogger(__name__)
+
+# Phrases mapped to values of the catalog's "alcoholic" column
+ALCOHOLIC_PHRASES = {
+    "non alcoholic": "non alcoholic", "non-alcoholic": "non alcoholic", "nonalcoholic": "non alcoholic",
+    "alcohol free": "non alcoholic", "alcohol-free": "non alcoholic", "without alcohol": "non alcoholic",
+    "no alcohol": "non alcoholic", "virgin": "non alcoholic", "mocktail": "non alcoholic",
+    "mocktails": "non alcoholic", "alcoholic": "alcoholic", "boozy": "alcoholic",
+    "with alcohol": "alcoholic", "optional alcohol": "optional alcohol",
+}
+
+# Phrases mapped to values of the catalog's "category" column; words that are
+# also ingredients ("coffee", "beer") are left to the ingredient vocabulary
+CATEGORY_PHRASES = {
+    "shot": "shot", "shots": "shot", "shooter": "shot", "shooters": "shot",
+    "shake": "shake", "shakes": "shake", "milkshake": "shake", "milkshakes": "shake",
+    "punch": "punch / party drink", "punches": "punch / party drink",
+    "party drink": "punch / party drink", "party drinks": "punch / party drink",
+    "ordinary drink": "ordinary drink", "ordinary drinks": "ordinary drink",
+    "homemade liqueur": "homemade liqueur", "homemade liqueurs": "homemade liqueur",
+    "soft drink": "soft drink", "soft drinks": "soft drink", "cocoa": "cocoa",
+}
+
+# Words between terms that switch following ingredients to excluded or required
+NEGATION_PATTERN = re.compile(
+    r"\b(?:without|no|not|none of|nothing with|except|excluding|minus|free of|hold the|skip the|but not)\b"
+)
+# Between two required ingredients, makes them alternatives ("rum or tequila")
+DISJUNCTION_PATTERN = re.compile(r"\bor\b")
+INCLUSION_PATTERN = re.compile(
+    r"\b(?:with|containing|contains|contain|including|includes|include|has|have|having|made with|using|uses)\b"
+)
+# An inclusion verb negated right before it ("not made with", "doesn't have") excludes
+NEGATED_INCLUSION_PATTERN = re.compile(
+    r"\b(?:not|never|no longer|don't|dont|doesn't|doesnt|do not|does not|isn't|isnt|aren't|arent)\s+"
+    r"(?:be\s+|been\s+|being\s+)?(?:with|containing|contains|contain|including|includes|include|"
+    r"has|have|having|made with|using|uses|use)\b"
+)
+
+# Words allowed around the terms of a set query; anything else is fuzzy intent
+FILLER_PATTERN = re.compile(
+    r"\b(?:and|or|also|both|either|a|an|the|any|all|some|of|in|with|without|no|not|none|nothing|"
+    r"never|don't|dont|doesn't|doesnt|isn't|isnt|aren't|arent|be|been|being|use|"
+    r"except|excluding|minus|free|hold|skip|but|containing|contains|contain|including|includes|"
+    r"include|has|have|having|made|using|uses|that|which|what|are|is|there|do|does|you|your|"
+    r"can|could|i|me|my|we|us|show|list|give|find|get|name|tell|suggest|recommend|want|need|"
+    r"looking|for|please|some|drink|drinks|cocktail|cocktails|recipe|recipes|options|ones|"
+    r"only|just|other|ingredients?|\d+)\b"
+)
+
+EMPTY = frozenset()
+
+
+class StructuredQuery(NamedTuple):
+    # Ingredient, category and alcoholic terms, lowercased
+    include: FrozenSet[str] = EMPTY
+    exclude: FrozenSet[str] = EMPTY
+    # Groups of alternatives, at least one ingredient of each group is required
+    any_of: Tuple[FrozenSet[str], ...] = ()
+    categories: FrozenSet[str] = EMPTY
+    alcoholic: FrozenSet[str] = EMPTY
+    # True when nothing but the constraints above remains in the query
+    exact: bool = False
+    # Catalog cocktails named in the query; they are not constraints themselves
+    cocktails: FrozenSet[str] = EMPTY
+
+    def is_empty(self) -> bool:
+        return not (self.include or self.exclude or self.any_of or self.categories or self.alcoholic)
+
+
+class StructuredIndex:
+    """
+    Precomputed posting lists over the catalog's structured columns.
+
+    Every ingredient, category and alcoholic value maps to a bitmap (a Python
+    int, bit i set for cocktail i), so set queries such as "gin and grenadine
+    but no lemon" are answered with bitwise AND / AND NOT instead of a vector
+    search. Postings are keyed on the normalized ``ingredient_keys`` metadata,
+    so a generic ingredient also covers its family: "rum" matches "Light rum".
+    Alternatives ("rum or tequila") are answered with a bitwise OR.
+    """
+
+    def __init__(self, documents: List[Dict[str, Any]]):
+        self.documents = documents
+        self._all = (1 << len(documents)) - 1
+        self._ingredients: Dict[str, int] = {}
+        self._categories: Dict[str, int] = {}
+        self._alcoholic: Dict[str, int] = {}
+        for position, document in enumerate(documents):
+            bit = 1 << position
+            for key in document["ingredient_keys"]:
+                self._ingredients[key] = self._ingredients.get(key, 0) | bit
+            self._categories[document["category_key"]] = self._categories.get(document["category_key"], 0) | bit
+            self._alcoholic[document["alcoholic_key"]] = self._alcoholic.get(document["alcoholic_key"], 0) | bit
+
+        ingredient_names = {ingredient.lower() for document in documents for ingredient in document["ingredients"]}
+        vocabulary = [(ingredient, ("ingredient", ingredient)) for ingredient in ingredient_names]
+        vocabulary += [
+            (phrase, ("category", category))
+            for phrase, category in CATEGORY_PHRASES.items() if category in self._categories
+        ]
+        vocabulary += [
+            (phrase, ("alcoholic", value))
+            for phrase, value in ALCOHOLIC_PHRASES.items() if value in self._alcoholic
+        ]
+        # Cocktail names shadow the ingredients inside them ("Gin Fizz" is not a constraint on gin)
+        vocabulary += [(document["name"], ("cocktail", document["name"])) for document in documents]
+        self.vocabulary = KeywordMatcher(vocabulary)
+
+        self._lock = threading.Lock()
+        self._counts = {"structured": 0, "fuzzy": 0}
+
+    @classmethod
+    def from_catalog(cls, cocktails: List[Dict[str, Any]]) -> "StructuredIndex":
+        """Build the index from catalog rows loaded with app.services.catalog."""
+        return cls([cocktail_metadata(cocktail) for cocktail in cocktails])
+
+    def parse(self, query: str, record: bool = True) -> StructuredQuery:
+        """
+        Extract ingredient, category and alcoholic constraints from a query.
+
+        Args:
+            query: Free-text query
+            record: Count the query in stats(); off for lookups that are not plans
+
+        Returns:
+            StructuredQuery; ``exact`` is set when the query holds nothing but
+            constraints and filler, so the index can answer it on its own
+        """
+        normalized = " ".join(query.lower().split())
+        exclude, categories, alcoholic, cocktails = set(), set(), set(), set()
+        # Required ingredients in order; alternatives joined by "or" share a group
+        groups: List[set] = []
+        residual = []
+        negated = False
+        previous_required = False
+        position = 0
+        for match in self.vocabulary.find_longest(normalized):
+            gap = normalized[position:match.start]
+            residual.append(gap)
+            position = match.end
+
+            # The nearest connective before a term decides whether it is required or excluded
+            negations = [*NEGATION_PATTERN.finditer(gap), *NEGATED_INCLUSION_PATTERN.finditer(gap)]
+            last_negation = max((m.end() for m in negations), default=-1)
+            last_inclusion = max((m.end() for m in INCLUSION_PATTERN.finditer(gap)), default=-1)
+            # A negated inclusion ends where its verb does, so a tie means "not made with"
+            if last_negation >= 0 and last_negation >= last_inclusion:
+                negated = True
+            elif last_inclusion > last_negation:
+                negated = False
+
+            kinds = {kind for kind, _ in match.values}
+            required = False
+            if kinds == {"cocktail"}:
+                residual.append(match.term)
+                cocktails.add(match.values[0][1])
+            elif "alcoholic" in kinds:
+                alcoholic.add(next(value for kind, value in match.values if kind == "alcoholic"))
+            elif "category" in kinds:
+                categories.add(next(value for kind, value in match.values if kind == "category"))
+            else:
+                ingredient = next(value for kind, value in match.values if kind == "ingredient")
+                if negated:
+                    # "without rum or tequila" excludes both
+                    exclude.add(ingredient)
+                elif previous_required and DISJUNCTION_PATTERN.search(gap):
+                    groups[-1].add(ingredient)
+                    required = True
+                else:
+                    groups.append({ingredient})
+                    required = True
+            previous_required = required
+        residual.append(normalized[position:])
+
+        include = {ingredient for group in groups if len(group) == 1 for ingredient in group}
+        any_of = tuple(frozenset(group) for group in groups if len(group) > 1)
+        required_any = set().union(*any_of)
+
+        leftover = FILLER_PATTERN.sub(" ", " ".join(residual))
+        result = StructuredQuery(
+            include=frozenset(include),
+            exclude=frozenset(exclude - include - required_any),
+            any_of=any_of,
+            categories=frozenset(categories),
+            alcoholic=frozenset(alcoholic),
+            cocktails=frozenset(cocktails),
+        )
+        exact = not result.is_empty() and not re.search(r"[a-z]", leftover)
+        result = result._replace(exact=exact)
+
+        if record:
+            with self._lock:
+                self._counts["structured" if exact else "fuzzy"] += 1
+        return result
+
+    @staticmethod
+    def to_filter(query: StructuredQuery) -> Optional[Dict[str, Any]]:
+        """
+        Translate constraints into a Pinecone-style metadata filter.
+
+        Args:
+            query: Parsed constraints
+
+        Returns:
+            Filter over the normalized catalog metadata, or None without constraints
+        """
+        clauses = [{"ingredient_keys": {"$in": [ingredient]}} for ingredient in sorted(query.include)]
+        clauses += [{"ingredient_keys": {"$in": sorted(group)}} for group in query.any_of]
+        if query.exclude:
+            clauses.append({"ingredient_keys": {"$nin": sorted(query.exclude)}})
+        if query.categories:
+            clauses.append({"category_key": {"$in": sorted(query.categories)}})
+        if query.alcoholic:
+            clauses.append({"alcoholic_key": {"$in": sorted(query.alcoholic)}})
+        if not clauses:
+            return None
+        return clauses[0] if len(clauses) == 1 else {"$and": clauses}
+
+    def _bitmap(self, query: StructuredQuery) -> int:
+        bits = self._all
+        for ingredient in query.include:
+            bits &= self._ingredients.get(ingredient, 0)
+        for group in query.any_of:
+            bits &= self._union(self._ingredients, group)
+        for ingredient in query.exclude:
+            bits &= ~self._ingredients.get(ingredient, 0)
+        if query.categories:
+            bits &= self._union(self._categories, query.categories)
+        if query.alcoholic:
+            bits &= self._union(self._alcoholic, query.alcoholic)
+        return bits
+
+    @staticmethod
+    def _union(postings: Dict[str, int], keys) -> int:
+        bits = 0
+        for key in keys:
+            bits |= postings.get(key, 0)
+        return bits
+
+    @staticmethod
+    def _positions(bits: int) -> Iterator[int]:
+        while bits:
+            lowest = bits & -bits
+            yield lowest.bit_length() - 1
+            bits ^= lowest
+
+    def count(self, query: StructuredQuery) -> int:
+        """Number of cocktails satisfying every constraint."""
+        return bin(self._bitmap(query)).count("1")
+
+    def search(self, query: StructuredQuery, limit: int = 10) -> List[Dict[str, Any]]:
+        """
+        Return the cocktails satisfying every constraint.
+
+        Args:
+            query: Parsed constraints
+            limit: Maximum number of results
+
+        Returns:
+            Results as {"metadata": ..., "score": 1.0}; cocktails with the fewest
+            ingredients beyond the required ones come first
+        """
+        documents = [self.documents[position] for position in self._positions(self._bitmap(query))]
+        documents.sort(key=lambda document: (len(document.get("ingredients", [])), document["name"]))
+        return [{"metadata": document, "score": 1.0} for document in documents[:limit]]
+
+    def stats(self) -> Dict[str, Any]:
+        """Return how many queries were answered from the index."""
+        with self._lock:
+            total = sum(self._counts.values())
+            return {
+                "queries": total,
+                **self._counts,
+                "structured_rate": self._counts["structured"] / total if total else 0.0,
+            }
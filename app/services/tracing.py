@@ -0,0 +1,114 @@
+from contextlib import contextmanager, nullcontext
+from contextvars import ContextVar
+from typing import Callable, Dict, Iterator, List, Optional
+import logging
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+# Trace of the request being handled; tasks spawned by the request share it
+_current_trace: ContextVar[Optional["Trace"]] = ContextVar("current_trace", default=None)
+
+# Called with (stage, seconds) for every timed stage, e.g. to feed histograms
+_stage_observers: List[Callable[[str, float], None]] = []
+
+# OpenTelemetry tracer, set by configure_opentelemetry
+_tracer = None
+
+
+class Trace:
+    """Wall-clock seconds spent in each named stage of one request."""
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.stages: Dict[str, float] = {}
+        self.counts: Dict[str, int] = {}
+        self._lock = threading.Lock()
+
+    def record(self, stage: str, seconds: float):
+        with self._lock:
+            self.stages[stage] = self.stages.get(stage, 0.0) + seconds
+            self.counts[stage] = self.counts.get(stage, 0) + 1
+
+    def elapsed(self) -> float:
+        return time.perf_counter() - self.started
+
+
+def start_trace() -> Trace:
+    """Begin collecting stage timings for the current request (and tasks it creates)."""
+    trace = Trace()
+    _current_trace.set(trace)
+    return trace
+
+
+def current_trace() -> Optional[Trace]:
+    return _current_trace.get()
+
+
+def add_stage_observer(observer: Callable[[str, float], None]):
+    """Register a callback that receives the duration of every stage."""
+    if observer not in _stage_observers:
+        _stage_observers.append(observer)
+
+
+def configure_opentelemetry(endpoint: str, service_name: str) -> bool:
+    """
+    Export every stage as an OpenTelemetry span to an OTLP collector.
+
+    The OpenTelemetry SDK and OTLP exporter are optional dependencies; without
+    them this logs a warning and leaves span export disabled.
+
+    Args:
+        endpoint: OTLP gRPC endpoint, e.g. http://localhost:4317
+        service_name: service.name resource attribute
+
+    Returns:
+        True if span export was enabled
+    """
+    global _tracer
+    try:
+        from opentelemetry import trace
+        from opentelemetry.exporter.otlp.proto.grpc.trace_exporter import OTLPSpanExporter
+        from opentelemetry.sdk.resources import Resource
+        from opentelemetry.sdk.trace import TracerProvider
+        from opentelemetry.sdk.trace.export import BatchSpanProcessor
+    except ImportError:
+        logger.warning("OpenTelemetry export requested but opentelemetry-sdk / opentelemetry-exporter-otlp are not installed")
+        return False
+
+    provider = TracerProvider(resource=Resource.create({"service.name": service_name}))
+    provider.add_span_processor(BatchSpanProcessor(OTLPSpanExporter(endpoint=endpoint, insecure=True)))
+    trace.set_tracer_provider(provider)
+    _tracer = trace.get_tracer(__name__)
+    logger.info("Exporting spans to %s", endpoint)
+    return True
+
+
+@contextmanager
+def stage(name: str) -> Iterator[None]:
+    """
+    Time a block as one stage of the current request.
+
+    Works in sync and async code. The duration goes to the current trace (if
+    any) and to the registered observers, and becomes a span when
+    OpenTelemetry export is configured.
+
+    Args:
+        name: Stage name, e.g. "embedding" or "generation"
+    """
+    trace = _current_trace.get()
+    if trace is None and not _stage_observers and _tracer is None:
+        yield
+        return
+    span = _tracer.start_as_current_span(name) if _tracer is not None else nullcontext()
+    started = time.perf_counter()
+    try:
+        with span:
+            yield
+    finally:
+        seconds = time.perf_counter() - started
+        if trace is not None:
+            trace.record(name, seconds)
+        for observer in _stage_observers:
+            observer(name, seconds)
@@ -0,0 +1,472 @@
+from abc import ABC, abstractmethod
+from concurrent.futures import Executor
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+import asyncio
+import functools
+import json
+import logging
+import os
+import threading
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+# (id, vector, metadata) as accepted by Pinecone's upsert
+VectorRecord = Tuple[str, Sequence[float], Dict[str, Any]]
+
+
+class VectorBackend(ABC):
+    """
+    Storage and similarity search for embedded records.
+
+    Implementations follow Pinecone's data-plane semantics: ``query`` returns a
+    mapping with a ``matches`` list whose items expose ``id``, ``score`` and
+    ``metadata``, and ``filter`` uses Pinecone's metadata filter language.
+    """
+
+    @abstractmethod
+    def query(
+        self,
+        vector: Sequence[float],
+        top_k: int,
+        namespace: Optional[str] = None,
+        filter: Optional[Dict[str, Any]] = None,
+        include_metadata: bool = True
+    ):
+        """Return the ``top_k`` records most similar to ``vector``."""
+
+    @abstractmethod
+    def upsert(self, vectors: List[VectorRecord], namespace: Optional[str] = None):
+        """Insert or replace records."""
+
+    @abstractmethod
+    def delete(self, ids: List[str], namespace: Optional[str] = None):
+        """Remove records by id."""
+
+    async def aquery(self, **kwargs):
+        """Async variant of query; backends with blocking I/O override this."""
+        return self.query(**kwargs)
+
+    async def aupsert(self, **kwargs):
+        """Async variant of upsert; backends with blocking I/O override this."""
+        return self.upsert(**kwargs)
+
+    async def aquery_many(self, queries: List[Dict[str, Any]], concurrency: int = 8) -> List[Any]:
+        """
+        Run several queries, e.g. for a batch of chat requests.
+
+        Backends that can answer many queries in one call override this; the
+        default issues the queries concurrently, at most ``concurrency`` at once.
+
+        Args:
+            queries: Keyword arguments of one ``query`` call each
+            concurrency: Queries in flight at once
+
+        Returns:
+            One query result per entry, in order
+        """
+        semaphore = asyncio.Semaphore(max(1, concurrency))
+
+        async def run(kwargs):
+            async with semaphore:
+                return await self.aquery(**kwargs)
+
+        return await asyncio.gather(*(run(kwargs) for kwargs in queries))
+
+    async def aclose(self):
+        """Release any resources held by the backend."""
+
+
+class PineconeBackend(VectorBackend):
+    """Vector backend that forwards every call to a Pinecone index."""
+
+    def __init__(self, api_key: str, index_name: str, executor: Executor, use_asyncio: bool = False, index_host: str = ""):
+        from pinecone import Pinecone
+
+        self.pc = Pinecone(api_key=api_key)
+        self.index_name = index_name
+        self.index = self.pc.Index(index_name)
+        self._executor = executor
+
+        # Native asyncio index, created lazily inside the running event loop
+        self.use_asyncio = use_asyncio
+        self.index_host = index_host
+        self._async_index = None
+        self._async_index_lock = asyncio.Lock()
+
+    async def _run_in_executor(self, func, *args, **kwargs):
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._executor, functools.partial(func, *args, **kwargs))
+
+    async def _get_async_index(self):
+        """Return the native asyncio Pinecone index, creating it on first use."""
+        if self._async_index is None:
+            async with self._async_index_lock:
+                if self._async_index is None:
+                    host = self.index_host
+                    if not host:
+                        description = await self._run_in_executor(self.pc.describe_index, self.index_name)
+                        host = description.host
+                    self._async_index = self.pc.IndexAsyncio(host=host)
+        return self._async_index
+
+    def query(self, vector, top_k, namespace=None, filter=None, include_metadata=True):
+        return self.index.query(
+            vector=vector,
+            top_k=top_k,
+            namespace=namespace,
+            filter=filter or {},
+            include_metadata=include_metadata
+        )
+
+    def upsert(self, vectors, namespace=None):
+        return self.index.upsert(vectors=vectors, namespace=namespace)
+
+    def delete(self, ids, namespace=None):
+        return self.index.delete(ids=ids, namespace=namespace)
+
+    async def aquery(self, **kwargs):
+        if self.use_asyncio:
+            index = await self._get_async_index()
+            kwargs["filter"] = kwargs.get("filter") or {}
+            return await index.query(**kwargs)
+        return await self._run_in_executor(self.query, **kwargs)
+
+    async def aupsert(self, **kwargs):
+        if self.use_asyncio:
+            index = await self._get_async_index()
+            return await index.upsert(**kwargs)
+        return await self._run_in_executor(self.upsert, **kwargs)
+
+    async def aclose(self):
+        if self._async_index is not None:
+            await self._async_index.close()
+            self._async_index = None
+
+
+class _Namespace:
+    """Records of one namespace, with a lazily rebuilt normalized matrix."""
+
+    def __init__(self):
+        self.ids: List[str] = []
+        self.positions: Dict[str, int] = {}
+        self.vectors: List[np.ndarray] = []
+        self.metadata: List[Dict[str, Any]] = []
+        self._matrix: Optional[np.ndarray] = None
+
+    def upsert(self, record_id: str, vector: np.ndarray, metadata: Dict[str, Any]):
+        position = self.positions.get(record_id)
+        if position is None:
+            self.positions[record_id] = len(self.ids)
+            self.ids.append(record_id)
+            self.vectors.append(vector)
+            self.metadata.append(metadata)
+        else:
+            self.vectors[position] = vector
+            self.metadata[position] = metadata
+        self._matrix = None
+
+    def delete(self, record_id: str):
+        position = self.positions.pop(record_id, None)
+        if position is None:
+            return
+        # Move the last record into the freed position to keep storage dense
+        last = len(self.ids) - 1
+        if position != last:
+            self.ids[position] = self.ids[last]
+            self.vectors[position] = self.vectors[last]
+            self.metadata[position] = self.metadata[last]
+            self.positions[self.ids[position]] = position
+        self.ids.pop()
+        self.vectors.pop()
+        self.metadata.pop()
+        self._matrix = None
+
+    @property
+    def matrix(self) -> np.ndarray:
+        if self._matrix is None:
+            if self.vectors:
+                matrix = np.vstack(self.vectors).astype(np.float32)
+                norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+                norms[norms == 0] = 1.0
+                self._matrix = matrix / norms
+            else:
+                self._matrix = np.zeros((0, 0), dtype=np.float32)
+        return self._matrix
+
+
+def _compare(value: Any, operator: str, operand: Any) -> bool:
+    """Evaluate one Pinecone filter operator against a scalar metadata value."""
+    if operator == "$eq":
+        return value == operand
+    if operator == "$ne":
+        return value != operand
+    if operator == "$in":
+        return value in operand
+    if operator == "$nin":
+        return value not in operand
+    if value is None or isinstance(value, (str, bool)) != isinstance(operand, (str, bool)):
+        return False
+    if operator == "$gt":
+        return value > operand
+    if operator == "$gte":
+        return value >= operand
+    if operator == "$lt":
+        return value < operand
+    if operator == "$lte":
+        return value <= operand
+    raise ValueError(f"Unsupported filter operator: {operator}")
+
+
+def _matches_condition(metadata: Dict[str, Any], field: str, condition: Any) -> bool:
+    """Evaluate the condition on a single metadata field."""
+    if not isinstance(condition, dict):
+        condition = {"$eq": condition}
+
+    for operator, operand in condition.items():
+        if operator == "$exists":
+            if (field in metadata) != bool(operand):
+                return False
+            continue
+
+        value = metadata.get(field)
+        if isinstance(value, list):
+            # Pinecone treats list fields as sets: positive operators match any element,
+            # negative operators require that no element matches
+            if operator in ("$ne", "$nin"):
+                positive = "$eq" if operator == "$ne" else "$in"
+                if any(_compare(item, positive, operand) for item in value):
+                    return False
+            elif not any(_compare(item, operator, operand) for item in value):
+                return False
+        elif value is None and operator not in ("$ne", "$nin"):
+            return False
+        elif not _compare(value, operator, operand):
+            return False
+    return True
+
+
+def matches_filter(metadata: Dict[str, Any], filter: Optional[Dict[str, Any]]) -> bool:
+    """
+    Check whether metadata satisfies a Pinecone-style metadata filter.
+
+    Args:
+        metadata: Record metadata
+        filter: Filter such as {"alcoholic": {"$eq": "Alcoholic"}} or {"$and": [...]}
+
+    Returns:
+        True if the record matches
+    """
+    if not filter:
+        return True
+    for key, condition in filter.items():
+        if key == "$and":
+            if not all(matches_filter(metadata, sub_filter) for sub_filter in condition):
+                return False
+        elif key == "$or":
+            if not any(matches_filter(metadata, sub_filter) for sub_filter in condition):
+                return False
+        elif not _matches_condition(metadata, key, condition):
+            return False
+    return True
+
+
+class InMemoryBackend(VectorBackend):
+    """
+    NumPy vector backend held entirely in process memory.
+
+    Scores are cosine similarities, like a cosine-metric Pinecone index. The
+    whole index can be saved to and loaded from a single ``.npz`` file.
+    """
+
+    def __init__(self, path: Optional[str] = None):
+        self.path = path
+        self._namespaces: Dict[str, _Namespace] = {}
+        self._lock = threading.RLock()
+        self._dirty = False
+        if path and os.path.exists(path):
+            self.load(path)
+
+    def _namespace(self, namespace: Optional[str]) -> _Namespace:
+        key = namespace or ""
+        if key not in self._namespaces:
+            self._namespaces[key] = _Namespace()
+        return self._namespaces[key]
+
+    @staticmethod
+    def _normalized(vector) -> np.ndarray:
+        query_vector = np.asarray(vector, dtype=np.float32)
+        norm = np.linalg.norm(query_vector)
+        return query_vector / norm if norm else query_vector
+
+    @staticmethod
+    def _top_matches(space: _Namespace, scores: np.ndarray, top_k: int, filter, include_metadata: bool) -> List[Dict[str, Any]]:
+        """Best ``top_k`` records by score among those matching the filter."""
+        if filter:
+            mask = np.fromiter(
+                (matches_filter(metadata, filter) for metadata in space.metadata),
+                dtype=bool,
+                count=len(space.metadata)
+            )
+            candidates = np.flatnonzero(mask)
+        else:
+            candidates = np.arange(len(space.ids))
+
+        if candidates.size > top_k:
+            partition = np.argpartition(-scores[candidates], top_k - 1)[:top_k]
+            candidates = candidates[partition]
+        order = candidates[np.argsort(-scores[candidates], kind="stable")]
+
+        matches = []
+        for position in order:
+            match = {"id": space.ids[position], "score": float(scores[position])}
+            if include_metadata:
+                match["metadata"] = space.metadata[position]
+            matches.append(match)
+        return matches
+
+    def query(self, vector, top_k, namespace=None, filter=None, include_metadata=True):
+        with self._lock:
+            space = self._namespace(namespace)
+            if not space.ids or top_k <= 0:
+                return {"matches": [], "namespace": namespace or ""}
+
+            scores = space.matrix @ self._normalized(vector)
+            return {
+                "matches": self._top_matches(space, scores, top_k, filter, include_metadata),
+                "namespace": namespace or ""
+            }
+
+    def query_many(self, queries: List[Dict[str, Any]]) -> List[Any]:
+        """
+        Answer several queries, scoring all of a namespace's queries in one matrix product.
+
+        Args:
+            queries: Keyword arguments of one ``query`` call each
+
+        Returns:
+            One query result per entry, in order
+        """
+        results: List[Any] = [None] * len(queries)
+        by_namespace: Dict[Optional[str], List[int]] = {}
+        for i, kwargs in enumerate(queries):
+            by_namespace.setdefault(kwargs.get("namespace"), []).append(i)
+
+        with self._lock:
+            for namespace, positions in by_namespace.items():
+                space = self._namespace(namespace)
+                if not space.ids:
+                    for i in positions:
+                        results[i] = {"matches": [], "namespace": namespace or ""}
+                    continue
+                vectors = np.stack([self._normalized(queries[i]["vector"]) for i in positions])
+                scores = space.matrix @ vectors.T
+                for column, i in enumerate(positions):
+                    kwargs = queries[i]
+                    top_k = kwargs["top_k"]
+                    matches = []
+                    if top_k > 0:
+                        matches = self._top_matches(
+                            space, scores[:, column], top_k, kwargs.get("filter"), kwargs.get("include_metadata", True)
+                        )
+                    results[i] = {"matches": matches, "namespace": namespace or ""}
+        return results
+
+    async def aquery_many(self, queries: List[Dict[str, Any]], concurrency: int = 8) -> List[Any]:
+        return self.query_many(queries)
+
+    def upsert(self, vectors, namespace=None):
+        with self._lock:
+            space = self._namespace(namespace)
+            for record in vectors:
+                record_id, vector, metadata = record[0], record[1], record[2] if len(record) > 2 else {}
+                space.upsert(record_id, np.asarray(vector, dtype=np.float32), dict(metadata or {}))
+            self._dirty = True
+            return {"upserted_count": len(vectors)}
+
+    def delete(self, ids, namespace=None):
+        with self._lock:
+            space = self._namespace(namespace)
+            for record_id in ids:
+                space.delete(record_id)
+            self._dirty = True
+
+    def count(self, namespace: Optional[str] = None) -> int:
+        """Number of records stored in a namespace."""
+        with self._lock:
+            return len(self._namespace(namespace).ids)
+
+    def save(self, path: Optional[str] = None):
+        """Write every namespace to a single ``.npz`` file."""
+        path = path or self.path
+        if not path:
+            return
+        with self._lock:
+            arrays = {}
+            manifest = []
+            for position, (name, space) in enumerate(self._namespaces.items()):
+                if not space.ids:
+                    continue
+                arrays[f"vectors_{position}"] = np.vstack(space.vectors).astype(np.float32)
+                manifest.append({
+                    "namespace": name,
+                    "key": f"vectors_{position}",
+                    "ids": space.ids,
+                    "metadata": space.metadata,
+                })
+            arrays["manifest"] = np.array(json.dumps(manifest))
+            self._dirty = False
+
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        tmp_path = f"{path}.tmp.npz"
+        np.savez(tmp_path, **arrays)
+        os.replace(tmp_path, path)
+
+    def load(self, path: str):
+        """Replace the index contents with a file written by save()."""
+        with np.load(path, allow_pickle=False) as data:
+            manifest = json.loads(str(data["manifest"]))
+            namespaces = {}
+            for entry in manifest:
+                space = _Namespace()
+                for record_id, vector, metadata in zip(entry["ids"], data[entry["key"]], entry["metadata"]):
+                    space.upsert(record_id, vector, metadata)
+                namespaces[entry["namespace"]] = space
+        with self._lock:
+            self._namespaces = namespaces
+            self._dirty = False
+        logger.info(
+            "Loaded local vector index from %s: %s",
+            path,
+            {name or "(default)": len(space.ids) for name, space in namespaces.items()}
+        )
+
+    async def aclose(self):
+        if self._dirty:
+            self.save()
+
+
+def create_vector_backend(backend: str, executor: Executor, **options) -> VectorBackend:
+    """
+    Build the vector backend selected in config.
+
+    Args:
+        backend: "pinecone" or "local"
+        executor: Thread pool for blocking client calls
+        **options: Backend-specific settings
+
+    Returns:
+        The configured VectorBackend
+    """
+    if backend == "pinecone":
+        return PineconeBackend(
+            api_key=options["api_key"],
+            index_name=options["index_name"],
+            executor=executor,
+            use_asyncio=options.get("use_asyncio", False),
+            index_host=options.get("index_host", "")
+        )
+    if backend == "local":
+        return InMemoryBackend(path=options.get("local_path") or None)
+    raise ValueError(f"Unknown vector backend: {backend}")
@@ -1,150 +1,426 @@
-from pinecone import Pinecone
-from sentence_transformers import SentenceTransformer
 from app.config import (
+    VECTOR_BACKEND,
+    LOCAL_INDEX_PATH,
     PINECONE_API_KEY,
     PINECONE_INDEX,
+    PINECONE_INDEX_HOST,
     PINECONE_NAMESPACE_COCKTAILS,
     PINECONE_NAMESPACE_USER_MEMORIES,
-    EMBEDDING_MODEL
+    PINECONE_USE_ASYNCIO,
+    VECTOR_STORE_MAX_WORKERS,
+    EMBEDDING_MODEL,
+    EMBEDDING_BATCHING_ENABLED,
+    EMBEDDING_BATCH_SIZE,
+    EMBEDDING_BATCH_WAIT_MS,
+    EMBEDDING_CACHE_SIZE,
+    EMBEDDING_CACHE_TTL_SECONDS,
+    EMBEDDING_CACHE_PATH,
+    RETRIEVAL_MODE,
+    HYBRID_DENSE_CANDIDATES,
+    RRF_K,
+    DENSE_SCORE_THRESHOLD
 )
-import json
-import uuid
+from app.services.embedding_batcher import EmbeddingBatcher
+from app.services.embedding_cache import EmbeddingCache
+from app.services.encoders import create_encoder, encoder_namespace
+from app.services.vector_backends import VectorBackend, create_vector_backend
+from app.services.sparse_index import BM25Index, reciprocal_rank_fusion
+from app.services.similarity_graph import SimilarityGraph
+from app.services.tracing import stage
+from concurrent.futures import ThreadPoolExecutor
+import asyncio
+import functools
+import time
 from typing import List, Dict, Any, Optional
 import logging
 
 # Set up logging
-logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
 class VectorStoreService:
-    def __init__(self):
+    def __init__(
+        self,
+        sparse_index: Optional[BM25Index] = None,
+        similarity_graph: Optional[SimilarityGraph] = None,
+        backend: Optional[VectorBackend] = None,
+        encoder=None
+    ):
         try:
-            # Initialize Pinecone with new API
-            self.pc = Pinecone(api_key=PINECONE_API_KEY)
-            self.index_name = PINECONE_INDEX
+            # Bounded pool for blocking encoder and vector backend calls made from async code
+            self._executor = ThreadPoolExecutor(
+                max_workers=VECTOR_STORE_MAX_WORKERS,
+                thread_name_prefix="vector-store"
+            )
+
+            # Initialize the vector backend selected in config, unless one is given
+            self.backend = backend if backend is not None else create_vector_backend(
+                VECTOR_BACKEND,
+                self._executor,
+                api_key=PINECONE_API_KEY,
+                index_name=PINECONE_INDEX,
+                use_asyncio=PINECONE_USE_ASYNCIO,
+                index_host=PINECONE_INDEX_HOST,
+                local_path=LOCAL_INDEX_PATH
+            )
 
-            # Get the Pinecone index
-            self.index = self.pc.Index(self.index_name)
-            
             # Initialize the embeddings model
-            self.model = SentenceTransformer(EMBEDDING_MODEL)
-            
+            self.model = encoder if encoder is not None else create_encoder(EMBEDDING_MODEL)
+
+            # Share encoder forward passes between concurrent requests
+            # (the embedding sidecar already batches across every worker)
+            self.batcher = None
+            if EMBEDDING_BATCHING_ENABLED and not getattr(self.model, "batches_requests", False):
+                self.batcher = EmbeddingBatcher(
+                    self.model,
+                    max_batch_size=EMBEDDING_BATCH_SIZE,
+                    max_wait_ms=EMBEDDING_BATCH_WAIT_MS
+                )
+
+            # Key cached vectors on what the encoder really produces; the sidecar reports its own
+            self.embedding_namespace = getattr(self.model, "namespace", None) or encoder_namespace(EMBEDDING_MODEL)
+
+            # Skip the encoder entirely for texts we have embedded recently
+            self.embedding_cache = None
+            if EMBEDDING_CACHE_SIZE > 0:
+                self.embedding_cache = EmbeddingCache(
+                    namespace=self.embedding_namespace,
+                    dim=self.model.get_sentence_embedding_dimension(),
+                    max_entries=EMBEDDING_CACHE_SIZE,
+                    ttl_seconds=EMBEDDING_CACHE_TTL_SECONDS,
+                    path=EMBEDDING_CACHE_PATH or None
+                )
+
             # Store namespaces
             self.cocktail_namespace = PINECONE_NAMESPACE_COCKTAILS
             self.memory_namespace = PINECONE_NAMESPACE_USER_MEMORIES
+
+            # Lexical index fused with dense results ("dense", "hybrid" or "sparse")
+            self.sparse_index = sparse_index
+            self.retrieval_mode = RETRIEVAL_MODE
+            self.hybrid_dense_candidates = HYBRID_DENSE_CANDIDATES
+            self.rrf_k = RRF_K
+            # Minimum dense similarity for a cocktail to be returned
+            self.score_threshold = DENSE_SCORE_THRESHOLD
+
+            # Precomputed neighbors for find_similar_cocktails
+            self.similarity_graph = similarity_graph
         except Exception as e:
-            logger.error(f"Failed to initialize VectorStoreService: {str(e)}")
+            logger.error("Failed to initialize VectorStoreService: %s", e)
             raise
 
+    async def _run_in_executor(self, func, *args, **kwargs):
+        """Run a blocking callable on the vector store thread pool."""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._executor, functools.partial(func, *args, **kwargs))
+
+    async def aclose(self):
+        """Release the vector backend and the worker threads."""
+        await self.backend.aclose()
+        if self.batcher is not None:
+            self.batcher.stop()
+        if self.embedding_cache is not None:
+            await self._run_in_executor(self.embedding_cache.flush)
+        self._executor.shutdown(wait=False)
+
+    async def warmup(self) -> Dict[str, float]:
+        """
+        Run one encode and one query so the first request does not pay for lazy initialization.
+        
+        Returns:
+            Seconds spent in each warmup phase
+        """
+        expected = encoder_namespace(EMBEDDING_MODEL)
+        if self.embedding_namespace != expected:
+            raise RuntimeError(
+                f"Encoder produces {self.embedding_namespace} vectors but the configuration expects {expected}"
+            )
+        
+        timings = {}
+        started = time.perf_counter()
+        embedding = await self._aget_embedding("warmup: gin and tonic")
+        timings["encode"] = time.perf_counter() - started
+        
+        started = time.perf_counter()
+        await self.backend.aquery(
+            vector=embedding,
+            top_k=1,
+            namespace=self.cocktail_namespace,
+            include_metadata=False
+        )
+        timings["query"] = time.perf_counter() - started
+        return timings
+
+    def embedding_stats(self) -> Dict[str, Any]:
+        """Return micro-batching and cache metrics for the encoder."""
+        stats = {"batching_enabled": self.batcher is not None}
+        if self.batcher is not None:
+            stats.update(self.batcher.stats())
+        if self.embedding_cache is not None:
+            stats["cache"] = self.embedding_cache.stats()
+        return stats
+
+    def _encode(self, text: str) -> list[float]:
+        """Run the encoder for a single text, through the batcher when enabled."""
+        if self.batcher is not None:
+            return self.batcher.encode(text)
+        return self.model.encode(text).tolist()
+
     def _get_embedding(self, text: str) -> list[float]:
         """Generate embedding for a text."""
         try:
-            return self.model.encode(text).tolist()
+            if self.embedding_cache is not None:
+                cached = self.embedding_cache.get(text)
+                if cached is not None:
+                    return cached
+
+            embedding = self._encode(text)
+
+            if self.embedding_cache is not None:
+                self.embedding_cache.put(text, embedding)
+            return embedding
+        except Exception as e:
+            logger.error("Error generating embedding: %s", e)
+            raise
+
+    async def _aget_embedding(self, text: str) -> list[float]:
+        """Generate embedding for a text without blocking the event loop."""
+        try:
+            if self.embedding_cache is not None:
+                cached = self.embedding_cache.get(text)
+                if cached is not None:
+                    return cached
+
+            with stage("embedding"):
+                if self.batcher is not None:
+                    embedding = await asyncio.wrap_future(self.batcher.submit(text))
+                else:
+                    embedding = await self._run_in_executor(self._encode, text)
+
+            if self.embedding_cache is not None:
+                # The write touches the mmap slab and may flush it; keep it off the event loop
+                await self._run_in_executor(self.embedding_cache.put, text, embedding)
+            return embedding
         except Exception as e:
-            logger.error(f"Error generating embedding: {str(e)}")
+            logger.error("Error generating embedding: %s", e)
             raise
 
+    async def aembed(self, text: str) -> list[float]:
+        """Embed a text with the service encoder (batched and cached) without blocking the event loop."""
+        return await self._aget_embedding(text)
+
+    def _encode_many(self, texts: List[str]) -> List[List[float]]:
+        """Run the encoder once over a list of texts."""
+        return self.model.encode(texts, batch_size=max(EMBEDDING_BATCH_SIZE, 1)).tolist()
+
+    async def aembed_many(self, texts: List[str]) -> List[List[float]]:
+        """
+        Embed many texts with one encode call, e.g. for a batch of queries.
+
+        Cached texts are served from the embedding cache; the rest are
+        deduplicated and encoded together on the thread pool.
+
+        Args:
+            texts: Texts to embed
+
+        Returns:
+            One embedding per text, in order
+        """
+        embeddings: List[Optional[List[float]]] = [None] * len(texts)
+        missing: Dict[str, List[int]] = {}
+        for i, text in enumerate(texts):
+            cached = self.embedding_cache.get(text) if self.embedding_cache is not None else None
+            if cached is not None:
+                embeddings[i] = cached
+            else:
+                missing.setdefault(text, []).append(i)
+
+        if missing:
+            unique = list(missing)
+            with stage("embedding"):
+                vectors = await self._run_in_executor(self._encode_many, unique)
+            for text, vector in zip(unique, vectors):
+                for i in missing[text]:
+                    embeddings[i] = vector
+            if self.embedding_cache is not None:
+                await self._run_in_executor(self.embedding_cache.put_many, list(zip(unique, vectors)))
+        return embeddings
+
     def _process_cocktail_results(self, matches: List[Dict]) -> List[Dict[str, Any]]:
         """Process cocktail query results into a standardized format."""
 
         cocktails = []
         for match in matches:
             metadata = match['metadata']
-            if match['score'] > 0.19:
+            if match['score'] > self.score_threshold:
                 cocktails.append({
                     "metadata": metadata,
                     "score": match['score']
                 })
-            
+
         return cocktails
 
-    def search_cocktails(self, query: str, limit: int = 20, filters: Optional[Dict[str, Any]] = None) -> List[Dict[str, Any]]:
-        """Search for cocktails based on a query string."""
-        try:
-            # Generate embedding for the query
-            query_embedding = self._get_embedding(query)
-            
-            # Simplify filter construction
-            filter_dict = filters or {}
-            
-            
-            # Query Pinecone
-            results = self.index.query(
+    def _dense_search(self, query: str, limit: int, filters: Optional[Dict[str, Any]] = None) -> List[Dict[str, Any]]:
+        """Embed the query and search the vector backend."""
+        # Generate embedding for the query
+        query_embedding = self._get_embedding(query)
+
+        # Simplify filter construction
+        filter_dict = filters or {}
+
+
+        # Query the vector backend
+        results = self.backend.query(
+            vector=query_embedding,
+            top_k=limit,
+            namespace=self.cocktail_namespace,
+            filter=filter_dict,
+            include_metadata=True
+        )
+
+        return self._process_cocktail_results(results['matches'])
+
+    async def _adense_search(self, query: str, limit: int, filters: Optional[Dict[str, Any]] = None) -> List[Dict[str, Any]]:
+        """Embed the query and search the vector backend without blocking the event loop."""
+        query_embedding = await self._aget_embedding(query)
+
+        with stage("vector_query"):
+            results = await self.backend.aquery(
                 vector=query_embedding,
                 top_k=limit,
                 namespace=self.cocktail_namespace,
-                filter=filter_dict,
+                filter=filters or {},
                 include_metadata=True
             )
 
-            return self._process_cocktail_results(results['matches'])
-        except Exception as e:
-            logger.error(f"Error searching cocktails: {str(e)}")
-            return []
+        return self._process_cocktail_results(results['matches'])
+
+    def _sparse_first(self, query: str, limit: int, filters: Optional[Dict[str, Any]] = None):
+        """
+        Answer from the sparse index alone when possible.
+
+        Returns:
+            Tuple of (final results or None, sparse results for fusion)
+        """
+        sparse_results = self.sparse_index.search(query, limit, filters)
+        if self.retrieval_mode == "sparse":
+            return sparse_results, sparse_results
 
-    def store_user_memory(self, user_id: str, memory_data: Dict[str, Any]) -> Optional[str]:
-        """Store user memory in the vector store."""
+        # A query naming a cocktail outright is answered without the encoder
+        exact = self.sparse_index.exact_name_matches(query, filters)
+        if exact:
+            exact_names = {result["metadata"]["name"] for result in exact}
+            rest = [result for result in sparse_results if result["metadata"]["name"] not in exact_names]
+            return (exact + rest)[:limit], sparse_results
+        return None, sparse_results
+
+    def search_cocktails(self, query: str, limit: int = 20, filters: Optional[Dict[str, Any]] = None) -> List[Dict[str, Any]]:
+        """Search for cocktails based on a query string."""
         try:
-            memory_id = str(uuid.uuid4())
-            memory_text = f"User {user_id} preferences: {json.dumps(memory_data)}"
-            memory_embedding = self._get_embedding(memory_text)
-            
-            metadata = {
-                "user_id": user_id,
-                "text": memory_text,
-                **memory_data
-            }
-            
-            self.index.upsert(
-                vectors=[(memory_id, memory_embedding, metadata)],
-                namespace=self.memory_namespace
-            )
-            return memory_id
+            if self.sparse_index is None or self.retrieval_mode == "dense":
+                return self._dense_search(query, limit, filters)
+
+            results, sparse_results = self._sparse_first(query, limit, filters)
+            if results is not None:
+                return results
+
+            dense_results = self._dense_search(query, min(limit, self.hybrid_dense_candidates), filters)
+            fused = reciprocal_rank_fusion({"dense": dense_results, "sparse": sparse_results}, k=self.rrf_k)
+            return fused[:limit]
         except Exception as e:
-            logger.error(f"Error storing user memory: {str(e)}")
-            return None
+            logger.error("Error searching cocktails: %s", e)
+            return []
 
-    def get_user_memories(self, user_id: str) -> List[Dict[str, Any]]:
-        """Retrieve user memories from the vector store."""
+    async def asearch_cocktails(self, query: str, limit: int = 20, filters: Optional[Dict[str, Any]] = None) -> List[Dict[str, Any]]:
+        """Search for cocktails based on a query string without blocking the event loop."""
         try:
-            query_embedding = self._get_embedding(f"User {user_id} preferences")
-            filter_dict = {"user_id": {"$eq": user_id}}
-            
-            results = self.index.query(
-                vector=query_embedding,
-                top_k=10,
-                namespace=self.memory_namespace,
-                filter=filter_dict,
-                include_metadata=True
-            )
-            
-            memories = []
-            for match in results['matches']:
-                metadata = match['metadata']
-                content = metadata.get('text', f"User {user_id} preferences")
-                memories.append({
-                    "content": content,
-                    "metadata": metadata,
-                    "score": match['score']
-                })
-            return memories
+            if self.sparse_index is None or self.retrieval_mode == "dense":
+                return await self._adense_search(query, limit, filters)
+
+            results, sparse_results = self._sparse_first(query, limit, filters)
+            if results is not None:
+                return results
+
+            dense_results = await self._adense_search(query, min(limit, self.hybrid_dense_candidates), filters)
+            fused = reciprocal_rank_fusion({"dense": dense_results, "sparse": sparse_results}, k=self.rrf_k)
+            return fused[:limit]
         except Exception as e:
-            logger.error(f"Error retrieving user memories: {str(e)}")
+            logger.error("Error searching cocktails: %s", e)
             return []
 
+    async def asearch_cocktails_many(
+        self,
+        queries: List[str],
+        limits: List[int],
+        filters: Optional[List[Optional[Dict[str, Any]]]] = None
+    ) -> List[List[Dict[str, Any]]]:
+        """
+        Search for cocktails for many queries at once.
+
+        Same results as calling asearch_cocktails per query, but every query
+        that needs the dense index is embedded in one encode call and sent to
+        the backend as one bulk query.
+
+        Args:
+            queries: Query strings
+            limits: Results wanted per query
+            filters: Metadata filter per query (None for no filter)
+
+        Returns:
+            One result list per query, in order
+        """
+        filters = filters or [None] * len(queries)
+        results: List[Optional[List[Dict[str, Any]]]] = [None] * len(queries)
+        sparse: List[Optional[List[Dict[str, Any]]]] = [None] * len(queries)
+        dense_positions = []
+
+        for i, (query, limit, query_filter) in enumerate(zip(queries, limits, filters)):
+            if self.sparse_index is not None and self.retrieval_mode != "dense":
+                results[i], sparse[i] = self._sparse_first(query, limit, query_filter)
+            if results[i] is None:
+                dense_positions.append(i)
+
+        if dense_positions:
+            embeddings = await self.aembed_many([queries[i] for i in dense_positions])
+            requests = []
+            for i, embedding in zip(dense_positions, embeddings):
+                top_k = limits[i] if sparse[i] is None else min(limits[i], self.hybrid_dense_candidates)
+                requests.append({
+                    "vector": embedding,
+                    "top_k": top_k,
+                    "namespace": self.cocktail_namespace,
+                    "filter": filters[i] or {},
+                    "include_metadata": True,
+                })
+            with stage("vector_query"):
+                responses = await self.backend.aquery_many(requests, concurrency=VECTOR_STORE_MAX_WORKERS)
+
+            for i, response in zip(dense_positions, responses):
+                dense_results = self._process_cocktail_results(response['matches'])
+                if sparse[i] is None:
+                    results[i] = dense_results
+                else:
+                    fused = reciprocal_rank_fusion({"dense": dense_results, "sparse": sparse[i]}, k=self.rrf_k)
+                    results[i] = fused[:limits[i]]
+        return results
+
     def find_similar_cocktails(self, cocktail_name: str, limit: int = 5) -> List[Dict[str, Any]]:
         """Find cocktails similar to the given cocktail name."""
         try:
+            if self.similarity_graph is not None:
+                neighbors = self.similarity_graph.neighbors(cocktail_name, limit)
+                if neighbors is not None:
+                    return neighbors
+
             cocktail_embedding = self._get_embedding(f"Cocktail similar to {cocktail_name}")
-            
-            results = self.index.query(
+
+            results = self.backend.query(
                 vector=cocktail_embedding,
                 top_k=limit,
                 namespace=self.cocktail_namespace,
                 include_metadata=True
             )
-            
+
             return self._process_cocktail_results(results['matches'])
         except Exception as e:
-            logger.error(f"Error finding similar cocktails: {str(e)}")
+            logger.error("Error finding similar cocktails: %s", e)
             return []
@@ -3,12 +3,14 @@ const chatMessages = document.getElementById('chat-messages');
 const userInput = document.getElementById('user-input');
 const sendButton = document.getElementById('send-button');
 
-// Chat state
+// Chat state; the conversation itself is stored server-side under sessionId
 const chatState = {
-    messages: [],
-    userId: `user_${Date.now()}`, // Generate a simple user ID
+    userId: localStorage.getItem('cocktailUserId') || `user_${Date.now()}`, // Generate a simple user ID
+    sessionId: localStorage.getItem('cocktailSessionId') || `session_${Date.now()}`,
     isWaitingForResponse: false
 };
+localStorage.setItem('cocktailUserId', chatState.userId);
+localStorage.setItem('cocktailSessionId', chatState.sessionId);
 
 // Event listeners
 sendButton.addEventListener('click', sendMessage);
@@ -19,8 +21,24 @@ userInput.addEventListener('keypress', (e) => {
     }
 });
 
-// Initialize the chat with a welcome message
-window.addEventListener('DOMContentLoaded', () => {
+// Restore the conversation from the server, or start it with a welcome message
+window.addEventListener('DOMContentLoaded', async () => {
+    try {
+        const response = await fetch(`/api/chat/history/${encodeURIComponent(chatState.sessionId)}`);
+        const history = response.ok ? await response.json() : [];
+        if (history.length) {
+            for (const message of history) {
+                if (message.role === 'user') {
+                    addUserMessage(message.content);
+                } else {
+                    addAssistantMessage(message.content);
+                }
+            }
+            return;
+        }
+    } catch (error) {
+        console.error('Error loading chat history:', error);
+    }
     addAssistantMessage("Hello! I'm your Cocktail Advisor. You can ask me about cocktails, their ingredients, or get recommendations. What would you like to know today?");
 });
 
@@ -41,48 +59,91 @@ async function sendMessage() {
     chatState.isWaitingForResponse = true;
     
     try {
-        // Send the message to the backend
-        const response = await fetch('/api/chat', {
+        // Send the message to the streaming endpoint
+        const response = await fetch('/api/chat/stream', {
             method: 'POST',
             headers: {
-                'Content-Type': 'application/json'
+                'Content-Type': 'application/json',
+                'Accept': 'text/event-stream'
             },
+            // Only the new message is sent; earlier turns are kept server-side
             body: JSON.stringify({
-                messages: [
-                    { role: 'system', content: 'You are a Cocktail Advisor, an expert in cocktails and mixed drinks.' },
-                    ...chatState.messages,
-                    { role: 'user', content: message }
-                ],
+                message,
+                session_id: chatState.sessionId,
                 user_id: chatState.userId
             })
         });
         
-        // Hide typing indicator
-        hideTypingIndicator();
-        
         if (!response.ok) {
             throw new Error(`HTTP error! status: ${response.status}`);
         }
         
-        const data = await response.json();
+        let messageElement = null;
+        let content = '';
         
-        // Add assistant message to the UI
-        addAssistantMessage(data.message.content);
+        await readEventStream(response, (event, data) => {
+            if (event === 'token') {
+                // Replace the typing indicator with the message on the first token
+                if (!messageElement) {
+                    hideTypingIndicator();
+                    messageElement = createAssistantMessageElement();
+                }
+                content += data;
+                renderAssistantContent(messageElement, content);
+            } else if (event === 'error') {
+                hideTypingIndicator();
+                content = data;
+                messageElement = messageElement || createAssistantMessageElement();
+                renderAssistantContent(messageElement, content);
+            }
+        });
         
+        hideTypingIndicator();
+        if (!messageElement) {
+            throw new Error('Empty response from server');
+        }
     } catch (error) {
         console.error('Error sending message:', error);
-        addAssistantMessage("Sorry, I encountered an error processing your request. Please try again.");
         hideTypingIndicator();
+        addAssistantMessage("Sorry, I encountered an error processing your request. Please try again.");
     } finally {
         // Reset waiting state
         chatState.isWaitingForResponse = false;
     }
 }
 
+async function readEventStream(response, onEvent) {
+    // Parse a text/event-stream body, calling onEvent(event, data) for every frame
+    const reader = response.body.getReader();
+    const decoder = new TextDecoder();
+    let buffer = '';
+    
+    while (true) {
+        const { value, done } = await reader.read();
+        if (done) break;
+        buffer += decoder.decode(value, { stream: true });
+        
+        let boundary;
+        while ((boundary = buffer.indexOf('\n\n')) !== -1) {
+            const frame = buffer.slice(0, boundary);
+            buffer = buffer.slice(boundary + 2);
+            
+            let event = 'message';
+            const dataLines = [];
+            for (const line of frame.split('\n')) {
+                if (line.startsWith('event:')) {
+                    event = line.slice(6).trim();
+                } else if (line.startsWith('data:')) {
+                    dataLines.push(line.slice(5).trim());
+                }
+            }
+            const data = dataLines.length ? JSON.parse(dataLines.join('\n')) : null;
+            onEvent(event, data);
+        }
+    }
+}
+
 function addUserMessage(content) {
-    const message = { role: 'user', content };
-    chatState.messages.push(message);
-    
     const messageElement = document.createElement('div');
     messageElement.className = 'message user';
     messageElement.textContent = content;
@@ -99,12 +160,18 @@ function addUserMessage(content) {
 }
 
 function addAssistantMessage(content) {
-    const message = { role: 'assistant', content };
-    chatState.messages.push(message);
-    
+    const messageElement = createAssistantMessageElement();
+    renderAssistantContent(messageElement, content);
+}
+
+function createAssistantMessageElement() {
     const messageElement = document.createElement('div');
     messageElement.className = 'message assistant';
-    
+    chatMessages.appendChild(messageElement);
+    return messageElement;
+}
+
+function renderAssistantContent(messageElement, content) {
     // Process markdown-like formatting
     let formattedContent = content
         // Bold text
@@ -122,8 +189,6 @@ function addAssistantMessage(content) {
     timestamp.textContent = getFormattedTime();
     messageElement.appendChild(timestamp);
     
-    chatMessages.appendChild(messageElement);
-    
     // Scroll to the bottom
     chatMessages.scrollTop = chatMessages.scrollHeight;
 }
@@ -0,0 +1,165 @@
+"""
+Embedding sidecar: one process per host owns the sentence encoder.
+
+Listens on a Unix socket and embeds texts for every uvicorn worker started
+with ENCODER_BACKEND=remote. Texts from all connections go through one
+EmbeddingBatcher, so concurrent requests from different workers share
+forward passes, and the model weights (and torch) are loaded once per host
+instead of once per worker.
+
+Usage:
+    python -m app.tools.embedding_server [--socket PATH] [--backend torch|onnx]
+    ENCODER_BACKEND=remote uvicorn main:app --workers 4
+"""
+from typing import Any, Dict, List, Optional
+import argparse
+import asyncio
+import json
+import logging
+import os
+import signal
+import stat
+
+import numpy as np
+
+from app.config import (
+    EMBEDDING_BATCH_SIZE,
+    EMBEDDING_BATCH_WAIT_MS,
+    EMBEDDING_MODEL,
+    EMBEDDING_SERVER_BACKEND,
+    EMBEDDING_SERVER_SOCKET
+)
+from app.logging_config import configure_logging
+from app.services.embedding_batcher import EmbeddingBatcher
+from app.services.encoders import FRAME_HEADER, MAX_FRAME_BYTES, create_encoder, encoder_namespace
+
+logger = logging.getLogger(__name__)
+
+
+class EmbeddingServer:
+    """
+    Serves encode requests from many clients through one shared batcher.
+
+    Args:
+        encoder: Loaded sentence encoder
+        info: Model, dimension and namespace reported to clients
+        max_batch_size: Texts per forward pass
+        max_wait_ms: How long a batch waits to fill after its first text
+    """
+
+    def __init__(self, encoder, info: Dict[str, Any], max_batch_size: int = EMBEDDING_BATCH_SIZE, max_wait_ms: float = EMBEDDING_BATCH_WAIT_MS):
+        self.info = info
+        self.batcher = EmbeddingBatcher(encoder, max_batch_size=max_batch_size, max_wait_ms=max_wait_ms)
+        self.connections = 0
+        self.requests = 0
+
+    async def _encode(self, texts: List[str]) -> np.ndarray:
+        if not all(isinstance(text, str) for text in texts):
+            raise ValueError("texts must be a list of strings")
+        vectors = await asyncio.gather(*(asyncio.wrap_future(self.batcher.submit(text)) for text in texts))
+        return np.asarray(vectors, dtype="<f4").reshape(len(texts), self.info["dim"])
+
+    async def _reply(self, request: Dict[str, Any]) -> List[bytes]:
+        """Frames answering one request."""
+        op = request.get("op")
+        if op == "info":
+            return [json.dumps(self.info).encode("utf-8")]
+        if op == "stats":
+            stats = {"connections": self.connections, "requests": self.requests, **self.batcher.stats()}
+            return [json.dumps(stats).encode("utf-8")]
+        if op == "encode":
+            texts = request.get("texts") or []
+            vectors = await self._encode(texts)
+            header = {"count": len(texts), "dim": self.info["dim"]}
+            return [json.dumps(header).encode("utf-8")] + ([vectors.tobytes()] if texts else [])
+        raise ValueError(f"Unknown op: {op}")
+
+    async def handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        """Answer requests on one client connection until it closes."""
+        self.connections += 1
+        try:
+            while True:
+                try:
+                    size = FRAME_HEADER.unpack(await reader.readexactly(FRAME_HEADER.size))[0]
+                    if size > MAX_FRAME_BYTES:
+                        logger.warning("Closing connection sending a %d byte frame", size)
+                        return
+                    request = json.loads(await reader.readexactly(size))
+                except asyncio.IncompleteReadError:
+                    return
+
+                self.requests += 1
+                try:
+                    frames = await self._reply(request)
+                except Exception as e:
+                    logger.warning("Embedding request failed: %s", e)
+                    frames = [json.dumps({"error": str(e) or type(e).__name__}).encode("utf-8")]
+                writer.write(b"".join(FRAME_HEADER.pack(len(frame)) + frame for frame in frames))
+                await writer.drain()
+        except (ConnectionError, ValueError) as e:
+            logger.debug("Dropping embedding client: %s", e)
+        finally:
+            self.connections -= 1
+            writer.close()
+
+    def stop(self):
+        self.batcher.stop()
+
+
+def _remove_stale_socket(path: str):
+    """Remove a socket file left behind by a previous run (refusing to delete anything else)."""
+    if os.path.exists(path):
+        if not stat.S_ISSOCK(os.stat(path).st_mode):
+            raise RuntimeError(f"{path} exists and is not a socket")
+        os.unlink(path)
+
+
+async def serve(socket_path: str, backend: str, max_batch_size: int, max_wait_ms: float):
+    encoder = create_encoder(EMBEDDING_MODEL, backend=backend)
+    info = {
+        "model": EMBEDDING_MODEL,
+        "dim": encoder.get_sentence_embedding_dimension(),
+        "namespace": encoder_namespace(EMBEDDING_MODEL, backend=backend),
+        # Clients split large inputs into requests of this size
+        "max_batch_size": max_batch_size,
+        "pid": os.getpid(),
+    }
+    embedding_server = EmbeddingServer(encoder, info, max_batch_size=max_batch_size, max_wait_ms=max_wait_ms)
+    encoder.encode(["warmup: gin and tonic"])
+
+    _remove_stale_socket(socket_path)
+    server = await asyncio.start_unix_server(embedding_server.handle, path=socket_path)
+    os.chmod(socket_path, 0o660)
+    logger.info("Embedding server for %s listening on %s", info["namespace"], socket_path)
+
+    stopping = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for signum in (signal.SIGINT, signal.SIGTERM):
+        loop.add_signal_handler(signum, stopping.set)
+    try:
+        await stopping.wait()
+    finally:
+        server.close()
+        await server.wait_closed()
+        embedding_server.stop()
+        if os.path.exists(socket_path):
+            os.unlink(socket_path)
+        logger.info("Embedding server stopped")
+
+
+def main(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(description="Serve sentence embeddings to local workers over a Unix socket.")
+    parser.add_argument("--socket", default=EMBEDDING_SERVER_SOCKET, help="Unix socket path")
+    parser.add_argument("--backend", choices=["torch", "onnx"], default=EMBEDDING_SERVER_BACKEND,
+                        help="Encoder backend to load")
+    parser.add_argument("--batch-size", type=int, default=EMBEDDING_BATCH_SIZE, help="Texts per forward pass")
+    parser.add_argument("--wait-ms", type=float, default=EMBEDDING_BATCH_WAIT_MS,
+                        help="How long a batch waits to fill after its first text")
+    args = parser.parse_args(argv)
+    configure_logging()
+
+    asyncio.run(serve(args.socket, args.backend, args.batch_size, args.wait_ms))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,181 @@
+"""
+Export the sentence encoder to ONNX, quantize it to int8 and check parity.
+
+Writes the fp32 graph, its dynamically int8-quantized copy, the tokenizer
+and the pooling settings to ONNX_MODEL_DIR, where ENCODER_BACKEND=onnx
+loads them. The export needs torch and transformers; serving the result
+only needs onnxruntime and tokenizers.
+
+The parity check embeds the cocktail corpus with the fp32 SentenceTransformer
+and with the exported graph, and reports the cosine similarity between the
+two vectors of each cocktail and how often both agree on a cocktail's
+nearest neighbors. It fails when the agreement is below the thresholds.
+
+Usage:
+    python -m app.tools.export_onnx [--output DIR] [--opset N]
+    python -m app.tools.export_onnx --check-only [--fp32]
+"""
+from typing import Any, Dict, List, Optional
+import argparse
+import json
+import logging
+import os
+import sys
+
+import numpy as np
+
+from app.config import COCKTAILS_CSV_PATH, EMBEDDING_MODEL, ONNX_MODEL_DIR, ONNX_THREADS
+from app.logging_config import configure_logging
+from app.services.catalog import cocktail_text, load_cocktails
+from app.services.encoders import (
+    ENCODER_INFO_FILE,
+    ONNX_FP32_FILE,
+    ONNX_INT8_FILE,
+    TOKENIZER_FILE,
+    OnnxEncoder,
+    create_encoder
+)
+
+logger = logging.getLogger(__name__)
+
+
+def export(model_name: str, output_dir: str, opset: int = 14):
+    """
+    Export the transformer of a SentenceTransformer model and quantize it.
+
+    Args:
+        model_name: Hugging Face model id
+        output_dir: Directory receiving the graphs, tokenizer and encoder.json
+        opset: ONNX opset version
+    """
+    import torch
+    from onnxruntime.quantization import QuantType, quantize_dynamic
+
+    os.makedirs(output_dir, exist_ok=True)
+    model = create_encoder(model_name, backend="torch")
+    transformer = model[0].auto_model.eval()
+    tokenizer = model.tokenizer
+    pooling = model[1]
+    if not getattr(pooling, "pooling_mode_mean_tokens", False):
+        raise RuntimeError(f"{model_name} does not use mean pooling, which the onnx encoder implements")
+
+    sample = tokenizer(["a sample sentence"], return_tensors="pt")
+    input_names = [name for name in ("input_ids", "attention_mask", "token_type_ids") if name in sample]
+    dynamic_axes = {name: {0: "batch", 1: "sequence"} for name in input_names}
+    dynamic_axes["last_hidden_state"] = {0: "batch", 1: "sequence"}
+
+    fp32_path = os.path.join(output_dir, ONNX_FP32_FILE)
+    with torch.no_grad():
+        torch.onnx.export(
+            transformer,
+            tuple(sample[name] for name in input_names),
+            fp32_path,
+            input_names=input_names,
+            output_names=["last_hidden_state"],
+            dynamic_axes=dynamic_axes,
+            opset_version=opset,
+            do_constant_folding=True
+        )
+    logger.info("Exported %s", fp32_path)
+
+    int8_path = os.path.join(output_dir, ONNX_INT8_FILE)
+    quantize_dynamic(fp32_path, int8_path, weight_type=QuantType.QInt8)
+    logger.info("Quantized %s", int8_path)
+
+    tokenizer.backend_tokenizer.save(os.path.join(output_dir, TOKENIZER_FILE))
+    info = {
+        "model": model_name,
+        "dim": model.get_sentence_embedding_dimension(),
+        "max_length": model.max_seq_length,
+        "pad_token_id": tokenizer.pad_token_id or 0,
+        "pooling": "mean",
+        "normalize": any(type(module).__name__ == "Normalize" for module in model),
+        "opset": opset,
+    }
+    with open(os.path.join(output_dir, ENCODER_INFO_FILE), "w", encoding="utf-8") as f:
+        json.dump(info, f, indent=2)
+
+    for path in (fp32_path, int8_path):
+        logger.info("%s: %.1f MB", os.path.basename(path), os.path.getsize(path) / 1e6)
+
+
+def _normalized(vectors: np.ndarray) -> np.ndarray:
+    return vectors / np.clip(np.linalg.norm(vectors, axis=1, keepdims=True), 1e-12, None)
+
+
+def check_parity(model_name: str, model_dir: str, texts: List[str], quantized: bool = True, top_k: int = 10) -> Dict[str, Any]:
+    """
+    Compare the exported encoder against the fp32 SentenceTransformer.
+
+    Args:
+        model_name: Hugging Face model id
+        model_dir: Directory written by export
+        texts: Corpus to embed
+        quantized: Check the int8 graph (otherwise the fp32 export)
+        top_k: Neighbors compared per text
+
+    Returns:
+        Cosine agreement percentiles and mean top-k neighbor overlap
+    """
+    reference = _normalized(np.asarray(create_encoder(model_name, backend="torch").encode(texts, batch_size=64), dtype=np.float32))
+    candidate = _normalized(OnnxEncoder(model_dir, quantized=quantized, threads=ONNX_THREADS).encode(texts, batch_size=64))
+
+    cosine = (reference * candidate).sum(axis=1)
+
+    k = min(top_k, len(texts) - 1)
+    overlap = 0.0
+    if k > 0:
+        def neighbors(vectors):
+            scores = vectors @ vectors.T
+            np.fill_diagonal(scores, -np.inf)
+            return np.argpartition(-scores, k, axis=1)[:, :k]
+
+        reference_neighbors = neighbors(reference)
+        candidate_neighbors = neighbors(candidate)
+        overlap = float(np.mean([
+            len(set(a) & set(b)) / k for a, b in zip(reference_neighbors, candidate_neighbors)
+        ]))
+
+    return {
+        "graph": ONNX_INT8_FILE if quantized else ONNX_FP32_FILE,
+        "texts": len(texts),
+        "cosine_mean": float(cosine.mean()),
+        "cosine_p1": float(np.percentile(cosine, 1)),
+        "cosine_min": float(cosine.min()),
+        f"top{k}_overlap": overlap,
+    }
+
+
+def main(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(description="Export the encoder to int8 ONNX and check it against fp32.")
+    parser.add_argument("--model", default=EMBEDDING_MODEL)
+    parser.add_argument("--output", default=ONNX_MODEL_DIR, help="Directory for the exported encoder")
+    parser.add_argument("--opset", type=int, default=14)
+    parser.add_argument("--csv", default=COCKTAILS_CSV_PATH, help="Cocktail corpus used for the parity check")
+    parser.add_argument("--check-only", action="store_true", help="Skip the export and only check parity")
+    parser.add_argument("--skip-check", action="store_true", help="Export without checking parity")
+    parser.add_argument("--fp32", action="store_true", help="Check the fp32 export instead of the int8 graph")
+    parser.add_argument("--min-cosine", type=float, default=0.97,
+                        help="Fail when the 1st percentile of per-cocktail cosine falls below this")
+    parser.add_argument("--min-overlap", type=float, default=0.8,
+                        help="Fail when the mean top-10 neighbor overlap falls below this")
+    args = parser.parse_args(argv)
+    configure_logging()
+
+    if not args.check_only:
+        export(args.model, args.output, opset=args.opset)
+    if args.skip_check:
+        return
+
+    texts = [cocktail_text(cocktail) for cocktail in load_cocktails(args.csv)]
+    report = check_parity(args.model, args.output, texts, quantized=not args.fp32)
+    print(json.dumps(report, indent=2))
+
+    overlap = next(value for key, value in report.items() if key.endswith("_overlap"))
+    if report["cosine_p1"] < args.min_cosine or overlap < args.min_overlap:
+        logger.error("Parity check failed (min cosine %.3f, min overlap %.2f)", args.min_cosine, args.min_overlap)
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
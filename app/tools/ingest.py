@@ -0,0 +1,275 @@
+"""
+Load cocktails_data.csv into the configured vector backend.
+
+Only rows whose content hash changed since the last run are re-embedded and
+upserted, rows removed from the CSV are deleted, and progress is checkpointed
+after every upserted chunk so an interrupted run resumes where it stopped.
+
+Usage:
+    python -m app.tools.ingest [--csv PATH] [--workers N] [--force]
+"""
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Any, Dict, Iterator, List, Optional
+import argparse
+import json
+import logging
+import os
+import random
+import time
+
+from app.config import (
+    COCKTAILS_CSV_PATH,
+    EMBEDDING_MODEL,
+    INGEST_EMBED_BATCH_SIZE,
+    INGEST_STATE_PATH,
+    INGEST_UPSERT_BATCH_SIZE,
+    LOCAL_INDEX_PATH,
+    PINECONE_API_KEY,
+    PINECONE_INDEX,
+    PINECONE_NAMESPACE_COCKTAILS,
+    VECTOR_BACKEND
+)
+from app.services.catalog import (
+    catalog_version,
+    cocktail_id,
+    cocktail_metadata,
+    cocktail_text,
+    iter_cocktails,
+    row_hash
+)
+from app.logging_config import configure_logging
+from app.services.encoders import create_encoder
+from app.services.vector_backends import InMemoryBackend, VectorBackend, create_vector_backend
+
+logger = logging.getLogger(__name__)
+
+# Encoder loaded once per process-pool worker
+_worker_model = None
+
+
+def _init_worker(model_name: str):
+    global _worker_model
+    _worker_model = create_encoder(model_name)
+
+
+def _encode_in_worker(texts: List[str]) -> List[List[float]]:
+    return _worker_model.encode(texts, batch_size=64).tolist()
+
+
+def load_state(path: str) -> Dict[str, Any]:
+    """Read the checkpoint written by previous runs, or an empty state."""
+    if not os.path.exists(path):
+        return {"rows": {}}
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            state = json.load(f)
+        state.setdefault("rows", {})
+        return state
+    except (OSError, ValueError) as e:
+        logger.warning("Ignoring unreadable ingest state %s: %s", path, e)
+        return {"rows": {}}
+
+
+def save_state(path: str, state: Dict[str, Any]):
+    """Atomically write the checkpoint."""
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(state, f)
+    os.replace(tmp_path, path)
+
+
+def with_retry(func, *args, attempts: int = 5, base_delay: float = 0.5, **kwargs):
+    """Call func, retrying with jittered exponential backoff."""
+    for attempt in range(1, attempts + 1):
+        try:
+            return func(*args, **kwargs)
+        except Exception as e:
+            if attempt == attempts:
+                raise
+            delay = base_delay * (2 ** (attempt - 1)) + random.uniform(0, base_delay)
+            logger.warning(
+                "%s failed (attempt %d/%d): %s; retrying in %.2fs",
+                getattr(func, "__name__", "call"), attempt, attempts, e, delay
+            )
+            time.sleep(delay)
+
+
+def _chunks(items: Iterator[Dict[str, Any]], size: int) -> Iterator[List[Dict[str, Any]]]:
+    chunk = []
+    for item in items:
+        chunk.append(item)
+        if len(chunk) >= size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+class CocktailIngestor:
+    """Incremental, resumable loader from the catalog CSV into a vector backend."""
+
+    def __init__(
+        self,
+        backend: VectorBackend,
+        state_path: str = INGEST_STATE_PATH,
+        namespace: Optional[str] = PINECONE_NAMESPACE_COCKTAILS,
+        model_name: str = EMBEDDING_MODEL,
+        embed_batch_size: int = INGEST_EMBED_BATCH_SIZE,
+        upsert_batch_size: int = INGEST_UPSERT_BATCH_SIZE,
+        workers: int = 0
+    ):
+        self.backend = backend
+        self.state_path = state_path
+        self.namespace = namespace
+        self.model_name = model_name
+        self.embed_batch_size = embed_batch_size
+        self.upsert_batch_size = upsert_batch_size
+        self.workers = workers
+        self._model = None
+
+    def _target(self) -> Dict[str, Any]:
+        """Identifies the index a checkpoint belongs to."""
+        return {"backend": type(self.backend).__name__, "namespace": self.namespace, "model": self.model_name}
+
+    def _changed_rows(self, csv_path: str, known: Dict[str, str], seen: Dict[str, str]) -> Iterator[Dict[str, Any]]:
+        """Stream rows whose hash differs from the checkpoint, recording every row's hash in seen."""
+        for cocktail in iter_cocktails(csv_path):
+            record_id = cocktail_id(cocktail["name"])
+            digest = row_hash(cocktail)
+            seen[record_id] = digest
+            if known.get(record_id) != digest:
+                yield {"id": record_id, "hash": digest, "cocktail": cocktail}
+
+    def _encode_local(self, texts: List[str]) -> List[List[float]]:
+        if self._model is None:
+            self._model = create_encoder(self.model_name)
+        return self._model.encode(texts, batch_size=64).tolist()
+
+    def _embedded_chunks(self, rows: Iterator[Dict[str, Any]]):
+        """Yield (rows, vectors) pairs, encoding in a process pool when workers > 0."""
+        chunks = _chunks(rows, self.embed_batch_size)
+        if self.workers <= 0:
+            for chunk in chunks:
+                yield chunk, self._encode_local([cocktail_text(row["cocktail"]) for row in chunk])
+            return
+
+        with ProcessPoolExecutor(max_workers=self.workers, initializer=_init_worker, initargs=(self.model_name,)) as pool:
+            # Keep a bounded window of chunks in flight so the CSV is still streamed
+            in_flight = []
+            for chunk in chunks:
+                in_flight.append((chunk, pool.submit(_encode_in_worker, [cocktail_text(row["cocktail"]) for row in chunk])))
+                if len(in_flight) >= self.workers * 2:
+                    done_chunk, future = in_flight.pop(0)
+                    yield done_chunk, future.result()
+            for done_chunk, future in in_flight:
+                yield done_chunk, future.result()
+
+    def run(self, csv_path: str = COCKTAILS_CSV_PATH, force: bool = False, dry_run: bool = False) -> Dict[str, Any]:
+        """
+        Sync the backend with the catalog CSV.
+
+        Args:
+            csv_path: Path to the catalog CSV
+            force: Re-embed and upsert every row regardless of the checkpoint
+            dry_run: Only report what would change
+
+        Returns:
+            Summary with counts of upserted, unchanged and deleted rows
+        """
+        started = time.perf_counter()
+        state = load_state(self.state_path)
+        if force or state.get("target") != self._target():
+            if state.get("rows") and not force:
+                logger.info("Ingest checkpoint belongs to a different backend or model, reindexing everything")
+            state = {"rows": {}}
+        state["target"] = self._target()
+        known = dict(state["rows"])
+        seen: Dict[str, str] = {}
+
+        upserted = 0
+        if dry_run:
+            changed = sum(1 for _ in self._changed_rows(csv_path, known, seen))
+        else:
+            changed = 0
+            for chunk, vectors in self._embedded_chunks(self._changed_rows(csv_path, known, seen)):
+                changed += len(chunk)
+                for start in range(0, len(chunk), self.upsert_batch_size):
+                    batch = chunk[start:start + self.upsert_batch_size]
+                    records = [
+                        (row["id"], vector, cocktail_metadata(row["cocktail"]))
+                        for row, vector in zip(batch, vectors[start:start + self.upsert_batch_size])
+                    ]
+                    with_retry(self.backend.upsert, vectors=records, namespace=self.namespace)
+                    upserted += len(records)
+
+                    # Checkpoint after each chunk so a crash resumes from here
+                    for row in batch:
+                        state["rows"][row["id"]] = row["hash"]
+                    save_state(self.state_path, state)
+                logger.info("Upserted %d cocktails so far", upserted)
+
+        removed = [record_id for record_id in known if record_id not in seen]
+        if removed and not dry_run:
+            for start in range(0, len(removed), self.upsert_batch_size):
+                batch = removed[start:start + self.upsert_batch_size]
+                with_retry(self.backend.delete, ids=batch, namespace=self.namespace)
+                for record_id in batch:
+                    state["rows"].pop(record_id, None)
+                save_state(self.state_path, state)
+
+        if not dry_run:
+            state["catalog_version"] = catalog_version(state["rows"])
+            state["updated_at"] = time.time()
+            save_state(self.state_path, state)
+            if isinstance(self.backend, InMemoryBackend) and (upserted or removed):
+                self.backend.save()
+
+        summary = {
+            "rows": len(seen),
+            "changed": changed,
+            "upserted": upserted,
+            "unchanged": len(seen) - changed,
+            "deleted": 0 if dry_run else len(removed),
+            "catalog_version": state.get("catalog_version"),
+            "seconds": round(time.perf_counter() - started, 3),
+            "dry_run": dry_run,
+        }
+        logger.info("Ingestion finished: %s", summary)
+        return summary
+
+
+def main(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(description="Load cocktails_data.csv into the vector index.")
+    parser.add_argument("--csv", default=COCKTAILS_CSV_PATH, help="Path to the cocktail catalog CSV")
+    parser.add_argument("--state", default=INGEST_STATE_PATH, help="Checkpoint file used for incremental runs")
+    parser.add_argument("--backend", default=VECTOR_BACKEND, choices=["pinecone", "local"], help="Vector backend to load")
+    parser.add_argument("--embed-batch-size", type=int, default=INGEST_EMBED_BATCH_SIZE)
+    parser.add_argument("--upsert-batch-size", type=int, default=INGEST_UPSERT_BATCH_SIZE)
+    parser.add_argument("--workers", type=int, default=0, help="Encode in a process pool with this many workers")
+    parser.add_argument("--force", action="store_true", help="Re-embed every row, ignoring the checkpoint")
+    parser.add_argument("--dry-run", action="store_true", help="Report changes without writing")
+    args = parser.parse_args(argv)
+    configure_logging()
+
+    with ThreadPoolExecutor(max_workers=1) as executor:
+        backend = create_vector_backend(
+            args.backend,
+            executor,
+            api_key=PINECONE_API_KEY,
+            index_name=PINECONE_INDEX,
+            local_path=LOCAL_INDEX_PATH
+        )
+        ingestor = CocktailIngestor(
+            backend,
+            state_path=args.state,
+            embed_batch_size=args.embed_batch_size,
+            upsert_batch_size=args.upsert_batch_size,
+            workers=args.workers
+        )
+        summary = ingestor.run(args.csv, force=args.force, dry_run=args.dry_run)
+    print(json.dumps(summary, indent=2))
+
+
+if __name__ == "__main__":
+    main()
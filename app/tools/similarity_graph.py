@@ -0,0 +1,79 @@
+"""
+Precompute the cocktail-to-cocktail similarity graph.
+
+Embeds every cocktail once, blends the pairwise cosine similarity with the
+ingredient Jaccard overlap and stores the top neighbors of each cocktail in a
+memory-mappable array served by /api/cocktails/{name}/similar.
+
+Usage:
+    python -m app.tools.similarity_graph [--csv PATH] [--top-n N] [--jaccard-weight W]
+"""
+from typing import List, Optional
+import argparse
+import json
+import logging
+import time
+
+import numpy as np
+
+from app.config import (
+    COCKTAILS_CSV_PATH,
+    EMBEDDING_MODEL,
+    INGEST_EMBED_BATCH_SIZE,
+    SIMILARITY_GRAPH_PATH,
+    SIMILARITY_JACCARD_WEIGHT,
+    SIMILARITY_TOP_N
+)
+from app.logging_config import configure_logging
+from app.services.catalog import catalog_version, cocktail_id, cocktail_text, load_cocktails, row_hash
+from app.services.encoders import create_encoder
+from app.services.similarity_graph import build_similarity_graph, save_similarity_graph
+
+logger = logging.getLogger(__name__)
+
+
+def main(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(description="Precompute similar cocktails for every cocktail in the catalog.")
+    parser.add_argument("--csv", default=COCKTAILS_CSV_PATH, help="Path to the cocktail catalog CSV")
+    parser.add_argument("--output", default=SIMILARITY_GRAPH_PATH, help="Target .npy file")
+    parser.add_argument("--top-n", type=int, default=SIMILARITY_TOP_N, help="Neighbors kept per cocktail")
+    parser.add_argument("--jaccard-weight", type=float, default=SIMILARITY_JACCARD_WEIGHT,
+                        help="Weight of ingredient overlap against embedding similarity (0-1)")
+    args = parser.parse_args(argv)
+    configure_logging()
+
+    started = time.perf_counter()
+    cocktails = load_cocktails(args.csv)
+    model = create_encoder(EMBEDDING_MODEL)
+    embeddings = np.asarray(
+        model.encode([cocktail_text(cocktail) for cocktail in cocktails], batch_size=INGEST_EMBED_BATCH_SIZE),
+        dtype=np.float32
+    )
+    ingredient_sets = [{ingredient.lower() for ingredient in cocktail["ingredients"]} for cocktail in cocktails]
+
+    graph = build_similarity_graph(embeddings, ingredient_sets, top_n=args.top_n, jaccard_weight=args.jaccard_weight)
+    save_similarity_graph(
+        args.output,
+        graph,
+        [cocktail["name"] for cocktail in cocktails],
+        info={
+            "catalog_version": catalog_version({cocktail_id(c["name"]): row_hash(c) for c in cocktails}),
+            "top_n": graph.shape[1],
+            "jaccard_weight": args.jaccard_weight,
+            "model": EMBEDDING_MODEL,
+        }
+    )
+
+    summary = {
+        "cocktails": len(cocktails),
+        "top_n": graph.shape[1],
+        "bytes": graph.nbytes,
+        "output": args.output,
+        "seconds": round(time.perf_counter() - started, 3),
+    }
+    logger.info("Similarity graph written: %s", summary)
+    print(json.dumps(summary, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,125 @@
+"""
+Encoder throughput benchmark: texts per second on CPU for each encoder backend.
+
+Embeds the cocktail corpus (or a file of texts) at several batch sizes with
+the fp32 SentenceTransformer and with the exported ONNX graphs (fp32 and
+int8), and writes the results as JSON. Run python -m app.tools.export_onnx
+first to produce the ONNX graphs; backends whose dependencies or files are
+missing are skipped.
+
+Usage:
+    python -m benchmarks.encoder_throughput
+    python -m benchmarks.encoder_throughput --backends torch onnx-int8 --batch-sizes 1 32 --threads 1
+"""
+from typing import Any, Dict, List, Optional
+import argparse
+import json
+import os
+import platform
+import time
+
+import numpy as np
+
+from app.config import COCKTAILS_CSV_PATH, EMBEDDING_MODEL, ONNX_MODEL_DIR
+from app.logging_config import configure_logging
+from app.services.catalog import cocktail_text, load_cocktails
+from app.services.encoders import OnnxEncoder, create_encoder
+
+RESULTS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "results")
+
+BACKENDS = ("torch", "onnx-fp32", "onnx-int8")
+
+
+def load_backend(name: str, model_dir: str, threads: int):
+    if name == "torch":
+        if threads > 0:
+            import torch
+            torch.set_num_threads(threads)
+        return create_encoder(EMBEDDING_MODEL, backend="torch")
+    return OnnxEncoder(model_dir, quantized=name == "onnx-int8", threads=threads)
+
+
+def measure(encoder, texts: List[str], batch_size: int, rounds: int) -> Dict[str, float]:
+    """Best-of-rounds throughput for embedding every text at one batch size."""
+    encoder.encode(texts[:batch_size], batch_size=batch_size)  # warm up
+    timings = []
+    for _ in range(rounds):
+        started = time.perf_counter()
+        for i in range(0, len(texts), batch_size):
+            encoder.encode(texts[i:i + batch_size], batch_size=batch_size)
+        timings.append(time.perf_counter() - started)
+    best = min(timings)
+    batches = -(-len(texts) // batch_size)
+    return {
+        "texts_per_second": len(texts) / best,
+        "ms_per_batch": best / batches * 1000.0,
+        "seconds": best,
+    }
+
+
+def main(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(description="Measure encoder throughput per backend and batch size.")
+    parser.add_argument("--backends", nargs="+", choices=BACKENDS, default=list(BACKENDS))
+    parser.add_argument("--batch-sizes", nargs="+", type=int, default=[1, 8, 32, 128])
+    parser.add_argument("--texts", help="File with one text per line (default: the cocktail corpus)")
+    parser.add_argument("--csv", default=COCKTAILS_CSV_PATH)
+    parser.add_argument("--model-dir", default=ONNX_MODEL_DIR)
+    parser.add_argument("--threads", type=int, default=0, help="Intra-op threads (0: library default)")
+    parser.add_argument("--rounds", type=int, default=3)
+    parser.add_argument("--output", help="Result file (default: benchmarks/results/<timestamp>-encoders.json)")
+    parser.add_argument("--log-level", default="WARNING")
+    args = parser.parse_args(argv)
+    configure_logging(level=args.log_level)
+
+    if args.texts:
+        with open(args.texts, "r", encoding="utf-8") as f:
+            texts = [line.strip() for line in f if line.strip()]
+    else:
+        texts = [cocktail_text(cocktail) for cocktail in load_cocktails(args.csv)]
+
+    results: Dict[str, Any] = {}
+    for name in args.backends:
+        try:
+            started = time.perf_counter()
+            encoder = load_backend(name, args.model_dir, args.threads)
+            load_seconds = time.perf_counter() - started
+        except (ImportError, RuntimeError) as e:
+            print(f"Skipping {name}: {e}")
+            continue
+        results[name] = {
+            "load_seconds": load_seconds,
+            "batches": {str(size): measure(encoder, texts, size, args.rounds) for size in args.batch_sizes},
+        }
+
+    print(f"{len(texts)} texts, threads={args.threads or 'default'}")
+    print(f"{'backend':<12}" + "".join(f"{'b=' + str(size):>12}" for size in args.batch_sizes) + "   (texts/s)")
+    for name, result in results.items():
+        print(f"{name:<12}" + "".join(
+            f"{result['batches'][str(size)]['texts_per_second']:>12.1f}" for size in args.batch_sizes
+        ))
+    if "torch" in results:
+        for name in results:
+            if name != "torch":
+                speedups = [
+                    results[name]["batches"][str(size)]["texts_per_second"]
+                    / results["torch"]["batches"][str(size)]["texts_per_second"]
+                    for size in args.batch_sizes
+                ]
+                print(f"{name} vs torch: {np.mean(speedups):.2f}x mean speedup")
+
+    output = args.output or os.path.join(RESULTS_DIR, f"{time.strftime('%Y%m%d-%H%M%S')}-encoders.json")
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, "w", encoding="utf-8") as f:
+        json.dump({
+            "model": EMBEDDING_MODEL,
+            "texts": len(texts),
+            "threads": args.threads,
+            "python": platform.python_version(),
+            "cpus": os.cpu_count(),
+            "results": results,
+        }, f, indent=2)
+    print(f"\nResults written to {output}")
+
+
+if __name__ == "__main__":
+    main()
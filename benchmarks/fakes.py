@@ -0,0 +1,110 @@
+"""Local stand-ins for the remote services, with configurable simulated latency."""
+from typing import AsyncIterator, List
+import asyncio
+import hashlib
+import json
+import random
+import time
+
+import numpy as np
+
+from app.services.vector_backends import VectorBackend
+
+
+def _delay(latency_ms: float, jitter_ms: float) -> float:
+    return max(0.0, latency_ms + random.uniform(-jitter_ms, jitter_ms)) / 1000.0
+
+
+class FakeLLMService:
+    """
+    Drop-in for LLMService that sleeps instead of calling the model.
+
+    Preference-extraction prompts (which ask for JSON) get an empty JSON answer, everything else
+    a canned answer of ``output_tokens`` words; streaming spreads the
+    generation time over the tokens.
+    """
+
+    def __init__(self, latency_ms: float = 800.0, jitter_ms: float = 200.0, output_tokens: int = 150):
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.output_tokens = output_tokens
+        self.calls = 0
+        self.prompt_chars = 0
+
+    def _answer(self, system_prompt: str) -> str:
+        if system_prompt and "JSON" in system_prompt:
+            return json.dumps({"favorite_ingredients": [], "favorite_cocktails": []})
+        return " ".join(["cheers"] * self.output_tokens)
+
+    async def generate_text(self, prompt: str, system_prompt: str = None) -> str:
+        self.calls += 1
+        self.prompt_chars += len(prompt)
+        await asyncio.sleep(_delay(self.latency_ms, self.jitter_ms))
+        return self._answer(system_prompt)
+
+    async def stream_text(self, prompt: str, system_prompt: str = None) -> AsyncIterator[str]:
+        self.calls += 1
+        self.prompt_chars += len(prompt)
+        tokens = self._answer(system_prompt).split(" ")
+        per_token = _delay(self.latency_ms, self.jitter_ms) / len(tokens)
+        for token in tokens:
+            await asyncio.sleep(per_token)
+            yield token + " "
+
+    async def chat_completion(self, messages: list) -> str:
+        return await self.generate_text(messages[-1]["content"] if messages else "")
+
+
+class SimulatedLatencyBackend(VectorBackend):
+    """Wraps a local backend and adds a network round trip to every call."""
+
+    def __init__(self, inner: VectorBackend, latency_ms: float = 40.0, jitter_ms: float = 10.0):
+        self.inner = inner
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+
+    def query(self, vector, top_k, namespace=None, filter=None, include_metadata=True):
+        time.sleep(_delay(self.latency_ms, self.jitter_ms))
+        return self.inner.query(vector, top_k, namespace=namespace, filter=filter, include_metadata=include_metadata)
+
+    def upsert(self, vectors, namespace=None):
+        time.sleep(_delay(self.latency_ms, self.jitter_ms))
+        return self.inner.upsert(vectors, namespace=namespace)
+
+    def delete(self, ids, namespace=None):
+        return self.inner.delete(ids, namespace=namespace)
+
+    async def aquery(self, vector, top_k, namespace=None, filter=None, include_metadata=True):
+        await asyncio.sleep(_delay(self.latency_ms, self.jitter_ms))
+        return self.inner.query(vector, top_k, namespace=namespace, filter=filter, include_metadata=include_metadata)
+
+    async def aupsert(self, vectors, namespace=None):
+        await asyncio.sleep(_delay(self.latency_ms, self.jitter_ms))
+        return self.inner.upsert(vectors, namespace=namespace)
+
+
+class HashingEncoder:
+    """
+    Bag-of-words hashing encoder for boxes without the model weights.
+
+    Only useful for measuring everything except encoder cost.
+    """
+
+    def __init__(self, dim: int = 384):
+        self.dim = dim
+
+    def get_sentence_embedding_dimension(self) -> int:
+        return self.dim
+
+    def _encode_one(self, text: str) -> np.ndarray:
+        vector = np.zeros(self.dim, dtype=np.float32)
+        for word in text.lower().split():
+            digest = hashlib.md5(word.strip(".,!?").encode("utf-8")).digest()
+            vector[int.from_bytes(digest[:4], "little") % self.dim] += 1.0
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm else vector
+
+    def encode(self, texts, batch_size: int = 32, **kwargs):
+        if isinstance(texts, str):
+            return self._encode_one(texts)
+        return np.vstack([self._encode_one(text) for text in texts]) if texts else np.zeros((0, self.dim), dtype=np.float32)
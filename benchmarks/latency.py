@@ -0,0 +1,329 @@
+"""
+End-to-end latency benchmark for the chat hot path.
+
+Drives RAGService.process_query directly, or POST /api/chat through the ASGI
+app in-process, at a fixed concurrency. The LLM and the vector database are
+replaced by local stand-ins with configurable latency; the encoder is the
+real SentenceTransformer unless --encoder hash is given. With --llm-url the
+real LLM client is used against that endpoint (e.g. the mock LLM server). Everything runs
+offline on CPU.
+
+Reports p50/p95/p99 latency, throughput and a per-stage breakdown, and
+writes the results as JSON so runs can be compared across changes.
+
+Usage:
+    python -m benchmarks.latency --requests 200 --concurrency 16
+    python -m benchmarks.latency --target http --llm-latency-ms 400 --label http-400ms
+    python -m benchmarks.latency --compare benchmarks/results/<previous>.json
+    python -m benchmarks.latency --llm-url http://127.0.0.1:8001/v1 --hedge   # against benchmarks.mock_llm_server
+"""
+import os
+import tempfile
+
+# Keep the benchmark self-contained: local stores only, nothing written to data/
+_scratch = tempfile.mkdtemp(prefix="cocktail-bench-")
+os.environ.setdefault("VECTOR_BACKEND", "local")
+os.environ.setdefault("LOCAL_INDEX_PATH", os.path.join(_scratch, "index.npz"))
+os.environ.setdefault("PREFERENCE_STORE_BACKEND", "memory")
+os.environ.setdefault("RESPONSE_CACHE_ENABLED", "false")
+os.environ.setdefault("EMBEDDING_CACHE_PATH", "")
+os.environ.setdefault("INGEST_STATE_PATH", os.path.join(_scratch, "ingest_state.json"))
+
+from typing import Any, Dict, List, Optional
+import argparse
+import asyncio
+import itertools
+import json
+import platform
+import subprocess
+import time
+
+import numpy as np
+
+from app.config import (
+    COCKTAILS_CSV_PATH,
+    EMBEDDING_MODEL,
+    PINECONE_NAMESPACE_COCKTAILS,
+    PREFERENCE_EXTRACTION_MODE,
+    RETRIEVAL_MODE,
+    STRUCTURED_QUERY_ENABLED
+)
+from app.logging_config import configure_logging
+from app.services.catalog import cocktail_id, cocktail_metadata, cocktail_text, load_cocktails
+from app.services.encoders import create_encoder
+from app.services.llm_client import LLMClient
+from app.services.llm_service import LLMService
+from app.services.memory_service import MemoryService
+from app.services.preference_prefilter import PreferencePrefilter
+from app.services.rag_service import RAGService
+from app.services.sparse_index import BM25Index
+from app.services.structured_index import StructuredIndex
+from app.services.tracing import start_trace
+from app.services.vector_backends import InMemoryBackend
+from app.services.vector_store import VectorStoreService
+from benchmarks.fakes import FakeLLMService, HashingEncoder, SimulatedLatencyBackend
+
+RESULTS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "results")
+
+# Mix of set queries, fuzzy intent, named cocktails and stated preferences
+DEFAULT_QUERIES = [
+    "What cocktails have gin and grenadine?",
+    "Show me non-alcoholic drinks",
+    "Recommend a refreshing summer cocktail",
+    "What is in a Margarita?",
+    "I love rum and pineapple juice, what should I try?",
+    "Something sweet and creamy for dessert",
+    "Give me 3 shots with vodka",
+    "Which cocktails are similar to a Mojito?",
+    "A strong whiskey drink for a cold evening",
+    "My favorite ingredient is lime juice",
+    "Drinks with tequila but no triple sec",
+    "What can I make with coffee liqueur?",
+    "A fruity punch for a party",
+    "Tell me about the Negroni",
+    "Low alcohol cocktails with prosecco",
+    "Something bitter with Campari",
+]
+
+
+def build_services(args) -> RAGService:
+    """Wire the real services around local stand-ins for the LLM and vector database."""
+    cocktails = load_cocktails(args.csv)
+    encoder = HashingEncoder() if args.encoder == "hash" else create_encoder(EMBEDDING_MODEL)
+
+    # Load the catalog into a local index, then put simulated network latency in front of it
+    inner = InMemoryBackend()
+    vectors = encoder.encode([cocktail_text(cocktail) for cocktail in cocktails], batch_size=64)
+    inner.upsert(
+        vectors=[
+            (cocktail_id(cocktail["name"]), np.asarray(vector).tolist(), cocktail_metadata(cocktail))
+            for cocktail, vector in zip(cocktails, vectors)
+        ],
+        namespace=PINECONE_NAMESPACE_COCKTAILS
+    )
+    backend = SimulatedLatencyBackend(inner, latency_ms=args.vector_latency_ms, jitter_ms=args.vector_jitter_ms)
+
+    sparse_index = BM25Index.from_catalog(cocktails) if RETRIEVAL_MODE != "dense" else None
+    vector_store = VectorStoreService(sparse_index=sparse_index, backend=backend, encoder=encoder)
+    if getattr(args, "llm_url", None):
+        llm_service = LLMService(LLMClient(base_url=args.llm_url, api_key=None, model="mock", hedge_enabled=args.hedge))
+    else:
+        llm_service = FakeLLMService(
+            latency_ms=args.llm_latency_ms,
+            jitter_ms=args.llm_jitter_ms,
+            output_tokens=args.output_tokens
+        )
+    memory_service = MemoryService(vector_store, llm_service, prefilter=PreferencePrefilter.from_catalog(cocktails))
+    structured_index = StructuredIndex.from_catalog(cocktails) if STRUCTURED_QUERY_ENABLED else None
+    return RAGService(vector_store, memory_service, llm_service, structured_index=structured_index)
+
+
+def _percentiles(values: List[float]) -> Dict[str, float]:
+    if not values:
+        return {}
+    array = np.asarray(values) * 1000.0
+    return {
+        "p50": float(np.percentile(array, 50)),
+        "p95": float(np.percentile(array, 95)),
+        "p99": float(np.percentile(array, 99)),
+        "mean": float(array.mean()),
+        "min": float(array.min()),
+        "max": float(array.max()),
+    }
+
+
+async def run_load(send, queries: List[str], requests: int, concurrency: int, users: int) -> Dict[str, Any]:
+    """
+    Issue ``requests`` calls with at most ``concurrency`` in flight.
+
+    Args:
+        send: Coroutine function taking (user_id, query)
+        queries: Queries cycled through in order
+        requests: Total number of calls
+        concurrency: Number of concurrent workers
+        users: Number of distinct user ids
+
+    Returns:
+        Raw latencies, per-stage timings and errors
+    """
+    work = iter(enumerate(itertools.islice(itertools.cycle(queries), requests)))
+    latencies, errors = [], []
+    stages: Dict[str, List[float]] = {}
+    stage_calls: Dict[str, int] = {}
+
+    async def worker():
+        for number, query in work:
+            trace = start_trace()
+            try:
+                await send(f"bench-user-{number % users}", query)
+                latencies.append(trace.elapsed())
+            except Exception as e:
+                errors.append(f"{type(e).__name__}: {e}")
+                continue
+            for name, seconds in trace.stages.items():
+                stages.setdefault(name, []).append(seconds)
+                stage_calls[name] = stage_calls.get(name, 0) + trace.counts[name]
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    return {
+        "latencies": latencies,
+        "stages": stages,
+        "stage_calls": stage_calls,
+        "errors": errors,
+        "wall_seconds": time.perf_counter() - started,
+    }
+
+
+def summarize(raw: Dict[str, Any], args) -> Dict[str, Any]:
+    completed = len(raw["latencies"])
+    return {
+        "label": args.label,
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "git_commit": _git_commit(),
+        "config": {
+            "target": args.target,
+            "requests": args.requests,
+            "concurrency": args.concurrency,
+            "encoder": args.encoder,
+            "llm_url": args.llm_url,
+            "hedge": args.hedge,
+            "llm_latency_ms": args.llm_latency_ms,
+            "llm_jitter_ms": args.llm_jitter_ms,
+            "vector_latency_ms": args.vector_latency_ms,
+            "vector_jitter_ms": args.vector_jitter_ms,
+            "retrieval_mode": RETRIEVAL_MODE,
+            "preference_mode": PREFERENCE_EXTRACTION_MODE,
+            "python": platform.python_version(),
+            "cpus": os.cpu_count(),
+        },
+        "completed": completed,
+        "errors": len(raw["errors"]),
+        "error_samples": raw["errors"][:5],
+        "throughput_rps": completed / raw["wall_seconds"] if raw["wall_seconds"] else 0.0,
+        "latency_ms": _percentiles(raw["latencies"]),
+        "llm_client": raw.get("llm_client"),
+        # Stages nest (embedding runs inside retrieval), so they do not add up to the total
+        "stages_ms": {
+            name: {**_percentiles(values), "calls_per_request": raw["stage_calls"][name] / max(completed, 1)}
+            for name, values in sorted(raw["stages"].items())
+        },
+    }
+
+
+def _git_commit() -> Optional[str]:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            capture_output=True, text=True, check=True,
+            cwd=os.path.dirname(os.path.abspath(__file__))
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def print_report(result: Dict[str, Any], baseline: Optional[Dict[str, Any]] = None):
+    latency = result["latency_ms"]
+    print(f"\n{result['label']}: {result['completed']} requests, {result['errors']} errors, "
+          f"{result['throughput_rps']:.1f} req/s")
+    print(f"{'':<24}{'p50':>10}{'p95':>10}{'p99':>10}{'mean':>10}")
+    print(f"{'total':<24}" + "".join(f"{latency.get(key, 0):>10.1f}" for key in ("p50", "p95", "p99", "mean")))
+    for name, values in result["stages_ms"].items():
+        print(f"  {name:<22}" + "".join(f"{values.get(key, 0):>10.1f}" for key in ("p50", "p95", "p99", "mean")))
+
+    if baseline:
+        print(f"\nvs {baseline['label']} ({baseline.get('git_commit')}):")
+        for key in ("p50", "p95", "p99"):
+            before, after = baseline["latency_ms"].get(key), latency.get(key)
+            if before:
+                print(f"  {key}: {before:.1f} -> {after:.1f} ms ({(after - before) / before * 100:+.1f}%)")
+        before = baseline.get("throughput_rps")
+        if before:
+            after = result["throughput_rps"]
+            print(f"  throughput: {before:.1f} -> {after:.1f} req/s ({(after - before) / before * 100:+.1f}%)")
+
+
+async def main_async(args) -> Dict[str, Any]:
+    rag_service = build_services(args)
+    queries = DEFAULT_QUERIES
+    if args.queries:
+        with open(args.queries, "r", encoding="utf-8") as f:
+            queries = [line.strip() for line in f if line.strip()]
+
+    client = None
+    if args.target == "service":
+        async def send(user_id, query):
+            await rag_service.process_query(user_id, query)
+    else:
+        import httpx
+        from main import app
+        from app.dependencies import get_rag_service
+
+        app.dependency_overrides[get_rag_service] = lambda: rag_service
+        client = httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://benchmark")
+
+        async def send(user_id, query):
+            response = await client.post(
+                "/api/chat",
+                json={"messages": [{"role": "user", "content": query}], "user_id": user_id}
+            )
+            response.raise_for_status()
+
+    try:
+        if args.warmup:
+            await run_load(send, queries, args.warmup, min(args.concurrency, args.warmup), args.users)
+        raw = await run_load(send, queries, args.requests, args.concurrency, args.users)
+    finally:
+        if client is not None:
+            await client.aclose()
+        await rag_service.memory_service.drain()
+        await rag_service.vector_store.aclose()
+        if isinstance(rag_service.llm_service, LLMService):
+            raw["llm_client"] = rag_service.llm_service.stats()
+            await rag_service.llm_service.aclose()
+    return summarize(raw, args)
+
+
+def main(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(description="Measure chat latency with simulated LLM and vector database.")
+    parser.add_argument("--target", choices=["service", "http"], default="service",
+                        help="Call RAGService.process_query directly or POST /api/chat through the ASGI app")
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--warmup", type=int, default=10, help="Requests sent before measuring")
+    parser.add_argument("--users", type=int, default=50, help="Distinct user ids to spread requests over")
+    parser.add_argument("--queries", help="File with one query per line (default: built-in mix)")
+    parser.add_argument("--encoder", choices=["model", "hash"], default="model",
+                        help="Real SentenceTransformer, or a hashing encoder when the weights are unavailable")
+    parser.add_argument("--llm-url", help="OpenAI-compatible endpoint to call with the real LLM client instead of the fake")
+    parser.add_argument("--hedge", action="store_true", help="Enable hedged LLM requests (with --llm-url)")
+    parser.add_argument("--llm-latency-ms", type=float, default=800.0)
+    parser.add_argument("--llm-jitter-ms", type=float, default=200.0)
+    parser.add_argument("--output-tokens", type=int, default=150)
+    parser.add_argument("--vector-latency-ms", type=float, default=40.0)
+    parser.add_argument("--vector-jitter-ms", type=float, default=10.0)
+    parser.add_argument("--csv", default=COCKTAILS_CSV_PATH)
+    parser.add_argument("--label", default="run")
+    parser.add_argument("--output", help="Result file (default: benchmarks/results/<timestamp>-<label>.json)")
+    parser.add_argument("--compare", help="Earlier result file to compare against")
+    parser.add_argument("--log-level", default="WARNING", help="Log level while the benchmark runs")
+    args = parser.parse_args(argv)
+    configure_logging(level=args.log_level)
+
+    result = asyncio.run(main_async(args))
+
+    output = args.output or os.path.join(RESULTS_DIR, f"{time.strftime('%Y%m%d-%H%M%S')}-{args.label}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, "w", encoding="utf-8") as f:
+        json.dump(result, f, indent=2)
+
+    baseline = None
+    if args.compare:
+        with open(args.compare, "r", encoding="utf-8") as f:
+            baseline = json.load(f)
+    print_report(result, baseline)
+    print(f"\nResults written to {output}")
+
+
+if __name__ == "__main__":
+    main()
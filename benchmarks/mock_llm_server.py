@@ -0,0 +1,139 @@
+"""
+Local stand-in for an OpenAI-compatible chat completions API.
+
+Answers POST /v1/chat/completions (streaming or not) after a simulated
+latency with an optional slow tail, and fails a configurable share of
+requests with 503 or 429, so the LLM client's deadlines, retries and
+hedging can be exercised without a real provider.
+
+Usage:
+    python -m benchmarks.mock_llm_server --port 8001 --latency-ms 400 --tail-rate 0.05 --tail-ms 4000
+    LLM_BASE_URL=http://127.0.0.1:8001/v1 uvicorn main:app
+"""
+from typing import List, Optional
+import argparse
+import asyncio
+import json
+import random
+import time
+import uuid
+
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, StreamingResponse
+
+
+def create_app(
+    latency_ms: float = 400.0,
+    jitter_ms: float = 100.0,
+    tail_rate: float = 0.0,
+    tail_ms: float = 4000.0,
+    error_rate: float = 0.0,
+    throttle_rate: float = 0.0,
+    output_tokens: int = 150
+) -> FastAPI:
+    """
+    Build the mock server.
+
+    Args:
+        latency_ms: Mean time to a full answer
+        jitter_ms: Uniform jitter around the mean
+        tail_rate: Share of requests that take tail_ms instead
+        tail_ms: Latency of the slow tail
+        error_rate: Share of requests answered with 503
+        throttle_rate: Share of requests answered with 429 and Retry-After
+        output_tokens: Words in each answer
+    """
+    app = FastAPI(title="Mock LLM")
+    app.state.requests = 0
+
+    def delay() -> float:
+        if random.random() < tail_rate:
+            return tail_ms / 1000.0
+        return max(0.0, latency_ms + random.uniform(-jitter_ms, jitter_ms)) / 1000.0
+
+    def answer(messages: List[dict]) -> str:
+        system = next((m["content"] for m in messages if m.get("role") == "system"), "")
+        if "JSON" in system:
+            return json.dumps({"favorite_ingredients": [], "favorite_cocktails": []})
+        return " ".join(["cheers"] * output_tokens)
+
+    @app.post("/v1/chat/completions")
+    async def chat_completions(request: Request):
+        app.state.requests += 1
+        body = await request.json()
+        roll = random.random()
+        if roll < error_rate:
+            return JSONResponse({"error": {"message": "upstream overloaded"}}, status_code=503)
+        if roll < error_rate + throttle_rate:
+            return JSONResponse({"error": {"message": "rate limited"}}, status_code=429, headers={"Retry-After": "0.1"})
+
+        content = answer(body.get("messages", []))
+        usage = {
+            "prompt_tokens": sum(len(m.get("content", "")) // 4 for m in body.get("messages", [])),
+            "completion_tokens": len(content.split(" ")),
+        }
+        response_id = f"mock-{uuid.uuid4().hex[:12]}"
+
+        if not body.get("stream"):
+            await asyncio.sleep(delay())
+            return {
+                "id": response_id,
+                "object": "chat.completion",
+                "created": int(time.time()),
+                "model": body.get("model"),
+                "choices": [{"index": 0, "message": {"role": "assistant", "content": content}, "finish_reason": "stop"}],
+                "usage": usage,
+            }
+
+        async def events():
+            words = content.split(" ")
+            per_word = delay() / len(words)
+            for i, word in enumerate(words):
+                await asyncio.sleep(per_word)
+                chunk = {
+                    "id": response_id,
+                    "object": "chat.completion.chunk",
+                    "choices": [{"index": 0, "delta": {"content": word if i == 0 else " " + word}}],
+                }
+                yield f"data: {json.dumps(chunk)}\n\n"
+            yield f"data: {json.dumps({'id': response_id, 'choices': [], 'usage': usage})}\n\n"
+            yield "data: [DONE]\n\n"
+
+        return StreamingResponse(events(), media_type="text/event-stream")
+
+    @app.get("/stats")
+    async def stats():
+        return {"requests": app.state.requests}
+
+    return app
+
+
+def main(argv: Optional[List[str]] = None):
+    import uvicorn
+
+    parser = argparse.ArgumentParser(description="Serve a mock OpenAI-compatible chat completions API.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8001)
+    parser.add_argument("--latency-ms", type=float, default=400.0)
+    parser.add_argument("--jitter-ms", type=float, default=100.0)
+    parser.add_argument("--tail-rate", type=float, default=0.0, help="Share of requests that are slow")
+    parser.add_argument("--tail-ms", type=float, default=4000.0, help="Latency of slow requests")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Share of requests failing with 503")
+    parser.add_argument("--throttle-rate", type=float, default=0.0, help="Share of requests failing with 429")
+    parser.add_argument("--output-tokens", type=int, default=150)
+    args = parser.parse_args(argv)
+
+    app = create_app(
+        latency_ms=args.latency_ms,
+        jitter_ms=args.jitter_ms,
+        tail_rate=args.tail_rate,
+        tail_ms=args.tail_ms,
+        error_rate=args.error_rate,
+        throttle_rate=args.throttle_rate,
+        output_tokens=args.output_tokens
+    )
+    uvicorn.run(app, host=args.host, port=args.port, log_level="warning")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,149 @@
+"""
+Prompt size benchmark: tokens sent to the LLM per chat turn.
+
+Runs retrieval for each query and counts the tokens of the prompt in the
+original format (raw metadata dicts inside the long instruction prompt)
+against the budgeted compact context with the instructions in the system
+prompt. Everything runs offline; without the tiktoken encoding file, token
+counts are estimated from length.
+
+Usage:
+    python -m benchmarks.prompt_size --encoder hash
+    python -m benchmarks.prompt_size --budget 400 --queries my_queries.txt
+"""
+from typing import Any, Dict, List, Optional
+import argparse
+import asyncio
+import json
+
+import numpy as np
+
+from app.config import CONTEXT_MAX_TOKENS, COCKTAILS_CSV_PATH
+from app.logging_config import configure_logging
+from app.services.prompt_builder import COCKTAIL_ADVISOR_SYSTEM_PROMPT, ContextBuilder, TokenCounter, build_user_prompt
+from benchmarks.latency import DEFAULT_QUERIES, build_services
+
+# The prompt as it was built before context budgeting, kept for comparison
+LEGACY_SYSTEM_PROMPT = "You are a professional bartender who can identify drinks and make personalized recommendations"
+
+
+def legacy_prompt(query: str, user_preferences: Dict[str, List[str]], results: List[Dict[str, Any]], limit: int) -> str:
+    results = results[:limit]
+    if limit == 1:
+        context = "Based on your query, here is a relevant cocktail:\n\n"
+    else:
+        context = f"Based on your query, here are {limit} relevant cocktails:\n\n"
+    for i, cocktail in enumerate(results):
+        context += f"{i+1}. {cocktail.get('metadata', 'No information available')}\n\n"
+    return f"""
+        You are a Cocktail Advisor chatbot that provides information about cocktails based on available data. Answer the user's question using the information provided below.
+
+        User's question: {query}
+
+        User's known preferences:
+        - Favorite ingredients: {', '.join(user_preferences['favorite_ingredients']) if user_preferences['favorite_ingredients'] else 'None shared yet'}
+        - Favorite cocktails: {', '.join(user_preferences['favorite_cocktails']) if user_preferences['favorite_cocktails'] else 'None shared yet'}
+
+        Retrieved cocktail information:
+        {context}
+
+        INSTRUCTIONS:
+        1. Focus on cocktails mentioned in the retrieved information above. Information must be from retrieved data.
+        2. If information is not available, simply state "I don't have that information about that" without generating placeholder content.
+        3. Base your answers on the retrieved information provided.
+        4. If no cocktails are available in the retrieved data, acknowledge this directly without creating empty lists.
+        5. Only provide the number of cocktails requested if they're actually available in the data. If fewer cocktails are available than requested, only discuss those that are available.
+        6. If user asks about his loved ingredients or flavors, use User's known preferences to personalize your response.
+        7. When the retrieval included user preferences, acknowledge this by mentioning "Based on your preference for [relevant preference]..."
+
+        Formatting:
+        1. Use relevant emojis where appropriate
+        2. Format cocktail names in **bold**
+        3. Use bullet points for ingredients and instructions
+        4. Keep formatting elements proportional to the amount of actual content
+        5. End with a friendly closing if cocktail information was provided
+
+        Be informative while strictly using only the retrieved information. Adapt your response length and style to match the available data.
+        """
+
+
+async def measure(args) -> Dict[str, Any]:
+    rag_service = build_services(args)
+    counter = TokenCounter()
+    builder = ContextBuilder(args.budget, counter)
+    preferences = {"favorite_ingredients": ["Gin", "Lime Juice"], "favorite_cocktails": ["Mojito"]}
+
+    rows = []
+    try:
+        for query in args.query_list:
+            limit = rag_service._requested_limit(query)
+            results = await rag_service._search(query, preferences, limit)
+            sources, context, tokens = builder.build(results, limit)
+            before = counter.count(LEGACY_SYSTEM_PROMPT) + counter.count(legacy_prompt(query, preferences, results, limit))
+            after = counter.count(COCKTAIL_ADVISOR_SYSTEM_PROMPT) + counter.count(build_user_prompt(query, preferences, context))
+            rows.append({
+                "query": query,
+                "retrieved": len(results[:limit]),
+                "in_context": len(sources),
+                "before": before,
+                "after": after,
+                "context_tokens": tokens["context_tokens"],
+            })
+    finally:
+        await rag_service.vector_store.aclose()
+
+    before = np.asarray([row["before"] for row in rows])
+    after = np.asarray([row["after"] for row in rows])
+    return {
+        "tokenizer": counter.encoding_name if counter._encoding is not None else "estimate (4 chars/token)",
+        "budget": args.budget,
+        "system_prompt_tokens": counter.count(COCKTAIL_ADVISOR_SYSTEM_PROMPT),
+        "mean_before": float(before.mean()),
+        "mean_after": float(after.mean()),
+        "reduction": float(1.0 - after.sum() / before.sum()),
+        "queries": rows,
+    }
+
+
+def print_report(result: Dict[str, Any]):
+    print(f"Tokenizer: {result['tokenizer']}, context budget: {result['budget']} tokens")
+    print(f"{'before':>7} {'after':>7} {'kept':>6}  query")
+    for row in result["queries"]:
+        print(f"{row['before']:>7} {row['after']:>7} {row['in_context']:>3}/{row['retrieved']:<2}  {row['query']}")
+    print(
+        f"\nMean prompt tokens: {result['mean_before']:.0f} -> {result['mean_after']:.0f} "
+        f"({result['reduction']:.0%} fewer; system prompt {result['system_prompt_tokens']} of them, reusable)"
+    )
+
+
+def main(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(description="Compare prompt tokens of the legacy and budgeted prompt formats.")
+    parser.add_argument("--queries", help="File with one query per line (default: built-in mix)")
+    parser.add_argument("--budget", type=int, default=CONTEXT_MAX_TOKENS, help="Context token budget")
+    parser.add_argument("--encoder", choices=["model", "hash"], default="model",
+                        help="Real SentenceTransformer, or a hashing encoder when the weights are unavailable")
+    parser.add_argument("--csv", default=COCKTAILS_CSV_PATH)
+    parser.add_argument("--json", action="store_true", help="Print the raw results as JSON")
+    parser.add_argument("--log-level", default="WARNING", help="Log level while the benchmark runs")
+    args = parser.parse_args(argv)
+    configure_logging(level=args.log_level)
+
+    if args.queries:
+        with open(args.queries, "r", encoding="utf-8") as f:
+            args.query_list = [line.strip() for line in f if line.strip()]
+    else:
+        args.query_list = DEFAULT_QUERIES
+    # Retrieval runs without simulated latency; only prompt sizes are measured
+    args.llm_latency_ms = args.llm_jitter_ms = 0.0
+    args.vector_latency_ms = args.vector_jitter_ms = 0.0
+    args.output_tokens = 1
+
+    result = asyncio.run(measure(args))
+    if args.json:
+        print(json.dumps(result, indent=2))
+    else:
+        print_report(result)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,304 @@
+"""
+Retrieval quality-vs-latency evaluation over the cocktail catalog.
+
+Generates labeled queries from the catalog CSV and runs each through every
+retriever, preference-enhancement setting and dense score threshold,
+reporting recall@k, MRR and per-query latency side by side, so a retrieval
+speedup comes with the accuracy it costs.
+
+Query kinds (relevant cocktails in brackets):
+    name         the cocktail's name in a short question [that cocktail]
+    ingredients  two or three of a cocktail's ingredients [every cocktail containing all of them]
+    description  the description with the name masked, words dropped and
+                 common adjectives swapped for synonyms [that cocktail]
+
+Retrievers: dense, sparse and hybrid are VectorStoreService in that
+RETRIEVAL_MODE; planned is the production path of RAGService (structured
+index for set queries, metadata pre-filters, then hybrid). Preference
+enhancement runs each query as-is (none) and through
+RAGService._enhance_query_with_preferences with a fixed profile (prefs).
+
+Everything runs offline: the catalog is loaded into a local in-memory index
+and the encoder is the configured one (ENCODER_BACKEND) unless --encoder
+hash is given.
+
+Usage:
+    python -m benchmarks.retrieval_eval
+    python -m benchmarks.retrieval_eval --retrievers dense hybrid --thresholds 0 0.19 0.3 --k 1 5 10
+    python -m benchmarks.retrieval_eval --preferences '{"favorite_ingredients": ["Gin"]}' --per-kind 200
+"""
+import os
+import tempfile
+
+# Keep the evaluation self-contained and measure uncached retrieval
+_scratch = tempfile.mkdtemp(prefix="cocktail-eval-")
+os.environ.setdefault("VECTOR_BACKEND", "local")
+os.environ.setdefault("LOCAL_INDEX_PATH", os.path.join(_scratch, "index.npz"))
+os.environ.setdefault("EMBEDDING_CACHE_SIZE", "0")
+os.environ.setdefault("EMBEDDING_BATCHING_ENABLED", "false")
+
+from typing import Any, Dict, List, Optional, Set
+import argparse
+import asyncio
+import json
+import platform
+import random
+import re
+import time
+
+import numpy as np
+
+from app.config import (
+    COCKTAILS_CSV_PATH,
+    DENSE_SCORE_THRESHOLD,
+    EMBEDDING_MODEL,
+    ENCODER_BACKEND,
+    PINECONE_NAMESPACE_COCKTAILS
+)
+from app.logging_config import configure_logging
+from app.services.catalog import cocktail_id, cocktail_metadata, cocktail_text, load_cocktails
+from app.services.encoders import create_encoder, encoder_namespace
+from app.services.rag_service import RAGService
+from app.services.sparse_index import BM25Index
+from app.services.structured_index import StructuredIndex
+from app.services.vector_backends import InMemoryBackend
+from app.services.vector_store import VectorStoreService
+from benchmarks.fakes import HashingEncoder
+from benchmarks.latency import _git_commit
+
+RESULTS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "results")
+
+RETRIEVERS = ("dense", "sparse", "hybrid", "planned")
+ENHANCEMENTS = ("none", "prefs")
+KINDS = ("name", "ingredients", "description")
+
+DEFAULT_PREFERENCES = {"favorite_ingredients": ["Rum", "Lime juice"], "favorite_cocktails": ["Mojito"]}
+
+NAME_TEMPLATES = ["{name}", "Tell me about the {name}", "What goes into a {name}?", "I'd like a {name}"]
+INGREDIENT_TEMPLATES = ["Cocktails with {items}", "What can I make with {items}?", "A drink with {items}"]
+
+STOPWORDS = {
+    "a", "an", "and", "as", "at", "by", "for", "from", "in", "into", "is", "it", "its", "of", "on",
+    "or", "that", "the", "this", "to", "with", "while", "each", "every", "indulge", "experience",
+}
+SYNONYMS = {
+    "blend": "mix", "classic": "traditional", "creamy": "smooth", "delightful": "lovely",
+    "garnished": "topped", "refreshing": "cooling", "rich": "full-bodied", "smooth": "mellow",
+    "sweet": "sugary", "tangy": "sour", "vibrant": "lively", "zesty": "citrusy", "zingy": "sharp",
+}
+
+
+def _join(items: List[str]) -> str:
+    return items[0] if len(items) == 1 else f"{', '.join(items[:-1])} and {items[-1]}"
+
+
+def _paraphrase(cocktail: Dict[str, Any], rng: random.Random, keep: float = 0.6, max_words: int = 12) -> str:
+    """Name-masked description with words dropped and common adjectives swapped."""
+    text = re.sub(re.escape(cocktail["name"]), " ", cocktail["desc"], flags=re.IGNORECASE)
+    words = [word for word in re.findall(r"[a-z][a-z'-]*", text.lower()) if word not in STOPWORDS]
+    kept = [SYNONYMS.get(word, word) for word in words if rng.random() < keep][:max_words]
+    return "Something " + " ".join(kept or words[:max_words])
+
+
+def generate_queries(cocktails: List[Dict[str, Any]], per_kind: int, seed: int = 0) -> List[Dict[str, Any]]:
+    """
+    Build labeled queries from the catalog.
+
+    Args:
+        cocktails: Catalog rows
+        per_kind: Queries generated per kind
+        seed: Random seed, so runs are comparable
+
+    Returns:
+        Dicts with kind, query and the set of relevant cocktail names
+    """
+    rng = random.Random(seed)
+    ingredient_sets = {cocktail["name"]: {i.lower() for i in cocktail["ingredients"]} for cocktail in cocktails}
+    queries = []
+
+    for cocktail in rng.sample(cocktails, min(per_kind, len(cocktails))):
+        queries.append({
+            "kind": "name",
+            "query": rng.choice(NAME_TEMPLATES).format(name=cocktail["name"]),
+            "relevant": {cocktail["name"]},
+        })
+
+    candidates = [cocktail for cocktail in cocktails if len(cocktail["ingredients"]) >= 2]
+    for cocktail in rng.sample(candidates, min(per_kind, len(candidates))):
+        chosen = rng.sample(cocktail["ingredients"], min(rng.choice((2, 2, 3)), len(cocktail["ingredients"])))
+        wanted = {ingredient.lower() for ingredient in chosen}
+        queries.append({
+            "kind": "ingredients",
+            "query": rng.choice(INGREDIENT_TEMPLATES).format(items=_join([i.lower() for i in chosen])),
+            "relevant": {name for name, ingredients in ingredient_sets.items() if wanted <= ingredients},
+        })
+
+    described = [cocktail for cocktail in cocktails if cocktail["desc"]]
+    for cocktail in rng.sample(described, min(per_kind, len(described))):
+        queries.append({"kind": "description", "query": _paraphrase(cocktail, rng), "relevant": {cocktail["name"]}})
+    return queries
+
+
+def score_ranking(ranked: List[str], relevant: Set[str], ks: List[int]) -> Dict[str, float]:
+    """
+    Recall@k and reciprocal rank of one ranked result list.
+
+    Recall@k is the share of relevant cocktails in the top k, out of at most
+    k, so a query with more relevant cocktails than k can still reach 1.0.
+    """
+    hits = [name in relevant for name in ranked]
+    scores = {f"recall@{k}": sum(hits[:k]) / min(len(relevant), k) for k in ks}
+    scores["rr"] = next((1.0 / rank for rank, hit in enumerate(hits, start=1) if hit), 0.0)
+    return scores
+
+
+def build_services(cocktails: List[Dict[str, Any]], encoder_name: str):
+    """Index the catalog locally; returns (vector store, plain RAG service, planning RAG service)."""
+    encoder = HashingEncoder() if encoder_name == "hash" else create_encoder(EMBEDDING_MODEL)
+    backend = InMemoryBackend()
+    vectors = encoder.encode([cocktail_text(cocktail) for cocktail in cocktails], batch_size=64)
+    backend.upsert(
+        vectors=[
+            (cocktail_id(cocktail["name"]), np.asarray(vector).tolist(), cocktail_metadata(cocktail))
+            for cocktail, vector in zip(cocktails, vectors)
+        ],
+        namespace=PINECONE_NAMESPACE_COCKTAILS
+    )
+    vector_store = VectorStoreService(sparse_index=BM25Index.from_catalog(cocktails), backend=backend, encoder=encoder)
+    # _search only needs the vector store and, for planning, the structured index
+    plain = RAGService(vector_store, None, None)
+    planned = RAGService(vector_store, None, None, structured_index=StructuredIndex.from_catalog(cocktails))
+    return vector_store, plain, planned
+
+
+async def evaluate(
+    vector_store: VectorStoreService,
+    rag_service: RAGService,
+    queries: List[Dict[str, Any]],
+    retrieval_mode: str,
+    preferences: Dict[str, List[str]],
+    threshold: float,
+    ks: List[int]
+) -> Dict[str, Any]:
+    """Run every query sequentially through one configuration and aggregate the scores."""
+    vector_store.retrieval_mode = retrieval_mode
+    vector_store.score_threshold = threshold
+    limit = max(ks)
+
+    per_kind: Dict[str, List[Dict[str, float]]] = {}
+    for query in queries:
+        started = time.perf_counter()
+        results = await rag_service._search(query["query"], preferences, limit)
+        elapsed = time.perf_counter() - started
+        ranked = [result["metadata"]["name"] for result in results]
+        scores = score_ranking(ranked, query["relevant"], ks)
+        scores["latency_ms"] = elapsed * 1000.0
+        scores["returned"] = len(ranked)
+        per_kind.setdefault(query["kind"], []).append(scores)
+
+    def aggregate(rows: List[Dict[str, float]]) -> Dict[str, float]:
+        latencies = np.asarray([row["latency_ms"] for row in rows])
+        summary = {f"recall@{k}": float(np.mean([row[f"recall@{k}"] for row in rows])) for k in ks}
+        summary.update({
+            "mrr": float(np.mean([row["rr"] for row in rows])),
+            "returned": float(np.mean([row["returned"] for row in rows])),
+            "latency_p50_ms": float(np.percentile(latencies, 50)),
+            "latency_p95_ms": float(np.percentile(latencies, 95)),
+            "latency_mean_ms": float(latencies.mean()),
+            "queries": len(rows),
+        })
+        return summary
+
+    return {
+        "overall": aggregate([row for rows in per_kind.values() for row in rows]),
+        "by_kind": {kind: aggregate(rows) for kind, rows in per_kind.items()},
+    }
+
+
+def print_report(runs: List[Dict[str, Any]], ks: List[int]):
+    recall_columns = [f"recall@{k}" for k in ks]
+    header = f"{'retriever':<10}{'prefs':<7}{'thresh':>7}" + "".join(f"{'R@' + str(k):>8}" for k in ks)
+    print("\n" + header + f"{'MRR':>8}{'p50 ms':>9}{'p95 ms':>9}" + "".join(f"{'MRR ' + kind[:5]:>11}" for kind in KINDS))
+    for run in runs:
+        overall = run["overall"]
+        print(
+            f"{run['retriever']:<10}{run['enhancement']:<7}{run['threshold']:>7.2f}"
+            + "".join(f"{overall[column]:>8.3f}" for column in recall_columns)
+            + f"{overall['mrr']:>8.3f}{overall['latency_p50_ms']:>9.2f}{overall['latency_p95_ms']:>9.2f}"
+            + "".join(f"{run['by_kind'].get(kind, {}).get('mrr', 0.0):>11.3f}" for kind in KINDS)
+        )
+
+
+async def main_async(args) -> Dict[str, Any]:
+    cocktails = load_cocktails(args.csv)
+    queries = generate_queries(cocktails, args.per_kind, seed=args.seed)
+    preferences = json.loads(args.preferences) if args.preferences else DEFAULT_PREFERENCES
+    vector_store, plain, planned = build_services(cocktails, args.encoder)
+
+    runs = []
+    try:
+        for retriever in args.retrievers:
+            for enhancement in args.enhancements:
+                for threshold in args.thresholds:
+                    result = await evaluate(
+                        vector_store,
+                        planned if retriever == "planned" else plain,
+                        queries,
+                        "hybrid" if retriever == "planned" else retriever,
+                        preferences if enhancement == "prefs" else {},
+                        threshold,
+                        args.k
+                    )
+                    runs.append({"retriever": retriever, "enhancement": enhancement, "threshold": threshold, **result})
+    finally:
+        await vector_store.aclose()
+
+    return {
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "git_commit": _git_commit(),
+        "config": {
+            "encoder": "hash" if args.encoder == "hash" else encoder_namespace(EMBEDDING_MODEL, ENCODER_BACKEND),
+            "cocktails": len(cocktails),
+            "queries": {kind: sum(query["kind"] == kind for query in queries) for kind in KINDS},
+            "seed": args.seed,
+            "k": args.k,
+            "preferences": preferences,
+            "python": platform.python_version(),
+            "cpus": os.cpu_count(),
+        },
+        "runs": runs,
+    }
+
+
+def main(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(description="Measure retrieval recall@k, MRR and latency per retriever configuration.")
+    parser.add_argument("--retrievers", nargs="+", choices=RETRIEVERS, default=list(RETRIEVERS))
+    parser.add_argument("--enhancements", nargs="+", choices=ENHANCEMENTS, default=list(ENHANCEMENTS))
+    parser.add_argument("--thresholds", nargs="+", type=float, default=[DENSE_SCORE_THRESHOLD],
+                        help="Dense score thresholds to sweep (default: DENSE_SCORE_THRESHOLD)")
+    parser.add_argument("--k", nargs="+", type=int, default=[1, 5, 10])
+    parser.add_argument("--per-kind", type=int, default=100, help="Queries generated per query kind")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--preferences", help="Preference profile for the prefs setting, as JSON")
+    parser.add_argument("--csv", default=COCKTAILS_CSV_PATH)
+    parser.add_argument("--encoder", choices=["model", "hash"], default="model",
+                        help="Configured encoder, or a hashing encoder when the weights are unavailable")
+    parser.add_argument("--output", help="Result file (default: benchmarks/results/<timestamp>-retrieval.json)")
+    parser.add_argument("--log-level", default="WARNING")
+    args = parser.parse_args(argv)
+    configure_logging(level=args.log_level)
+
+    result = asyncio.run(main_async(args))
+    print(f"{sum(result['config']['queries'].values())} queries {result['config']['queries']}, "
+          f"encoder {result['config']['encoder']}")
+    print_report(result["runs"], args.k)
+
+    output = args.output or os.path.join(RESULTS_DIR, f"{time.strftime('%Y%m%d-%H%M%S')}-retrieval.json")
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, "w", encoding="utf-8") as f:
+        json.dump(result, f, indent=2)
+    print(f"\nResults written to {output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,22 +1,46 @@
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
+from fastapi.responses import JSONResponse, Response
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.staticfiles import StaticFiles
-from app.routers import chat
-from app.config import API_TITLE, API_DESCRIPTION, API_VERSION
+from app.routers import chat, cocktails
+from app.config import (
+    API_TITLE,
+    API_DESCRIPTION,
+    API_VERSION,
+    METRICS_ENABLED,
+    OTEL_ENABLED,
+    OTEL_EXPORTER_OTLP_ENDPOINT,
+    OTEL_SERVICE_NAME
+)
+from app.dependencies import init_services, readiness, service_stats, shutdown_services
+from app.services.metrics import RequestMetricsMiddleware, render_metrics, setup_metrics
+from app.services.tracing import configure_opentelemetry
+from app.logging_config import configure_logging
 import os
-import logging
 
-# Configure logging
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
-)
+# Configure logging: level from LOG_LEVEL, records written off the event loop
+configure_logging()
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Build and warm up all services before serving, release them on shutdown."""
+    if METRICS_ENABLED:
+        setup_metrics(service_stats)
+    if OTEL_ENABLED:
+        configure_opentelemetry(OTEL_EXPORTER_OTLP_ENDPOINT, OTEL_SERVICE_NAME)
+    await init_services()
+    yield
+    await shutdown_services()
+
 
 # Create the FastAPI application
 app = FastAPI(
     title=API_TITLE,
     description=API_DESCRIPTION,
     version=API_VERSION,
+    lifespan=lifespan,
 )
 
 # Add CORS middleware
@@ -28,12 +52,13 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Trace every request and record its latency by route, including streamed bodies
+app.add_middleware(RequestMetricsMiddleware, enabled=METRICS_ENABLED)
+
+
 # Include routers
 app.include_router(chat.router, prefix="/api", tags=["chat"])
-
-# Mount static files (for the chat UI)
-static_dir = os.path.join(os.path.dirname(os.path.abspath(__file__)), "app/static")
-app.mount("/", StaticFiles(directory=static_dir, html=True), name="static")
+app.include_router(cocktails.router, prefix="/api", tags=["cocktails"])
 
 
 @app.get("/health")
@@ -42,6 +67,30 @@ async def health_check():
     return {"status": "ok"}
 
 
+@app.get("/ready")
+async def readiness_check():
+    """Readiness probe: succeeds only once models and clients are loaded and warmed up."""
+    state = readiness()
+    if not state["ready"]:
+        status = "failed" if state["error"] else "starting"
+        return JSONResponse(status_code=503, content={"status": status, **state})
+    return {"status": "ready"}
+
+
+@app.get("/metrics", include_in_schema=False)
+async def metrics():
+    """Prometheus scrape endpoint: per-stage latency, LLM tokens, batch sizes and cache hit rates."""
+    if not METRICS_ENABLED:
+        return JSONResponse(status_code=404, content={"detail": "Metrics are disabled"})
+    payload, content_type = render_metrics()
+    return Response(content=payload, media_type=content_type)
+
+
+# Mount static files (for the chat UI) last so it does not shadow the API routes
+static_dir = os.path.join(os.path.dirname(os.path.abspath(__file__)), "app/static")
+app.mount("/", StaticFiles(directory=static_dir, html=True), name="static")
+
+
 # This will be run if you execute the file directly (python main.py)
 if __name__ == "__main__":
     import uvicorn
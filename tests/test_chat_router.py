@@ -0,0 +1,48 @@
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from app.dependencies import get_rag_service
+from app.routers import chat
+
+
+class RecordingRAGService:
+    def __init__(self):
+        self.sessions = []
+
+    async def process_query(self, user_id, query, session_id=None):
+        self.sessions.append(session_id)
+        return "answer", []
+
+    async def stream_query(self, user_id, query, session_id=None):
+        self.sessions.append(session_id)
+        yield {"event": "done", "data": None}
+
+
+def make_client():
+    rag_service = RecordingRAGService()
+    app = FastAPI()
+    app.include_router(chat.router, prefix="/api")
+    app.dependency_overrides[get_rag_service] = lambda: rag_service
+    return TestClient(app), rag_service
+
+
+def test_requests_without_session_id_get_separate_sessions():
+    client, rag_service = make_client()
+
+    first = client.post("/api/chat", json={"message": "hi"}).json()
+    second = client.post("/api/chat", json={"message": "hi"}).json()
+
+    assert first["session_id"] and second["session_id"]
+    assert first["session_id"] != second["session_id"]
+    assert rag_service.sessions == [first["session_id"], second["session_id"]]
+
+
+def test_given_session_id_is_kept_and_returned_by_the_stream():
+    client, rag_service = make_client()
+
+    response = client.post("/api/chat/stream", json={"message": "hi", "session_id": "s1"})
+    generated = client.post("/api/chat/stream", json={"message": "hi"})
+
+    assert response.headers["x-session-id"] == "s1"
+    assert generated.headers["x-session-id"] == rag_service.sessions[1] != "default_user"
+    assert rag_service.sessions[0] == "s1"
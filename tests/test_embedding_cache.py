@@ -0,0 +1,47 @@
+import json
+import os
+import threading
+
+from app.services.embedding_cache import EmbeddingCache
+
+
+def test_put_many_round_trips_and_flushes_once(tmp_path):
+    path = str(tmp_path / "embeddings.f32")
+    cache = EmbeddingCache("test-model", dim=2, max_entries=4, path=path, flush_every=2)
+
+    cache.put_many([("gin", [1.0, 0.0]), ("rum", [0.0, 1.0]), ("vodka", [0.5, 0.5])])
+
+    assert cache.get("rum") == [0.0, 1.0]
+    assert os.path.exists(f"{path}.index.json")
+    assert cache.stats()["size"] == 3
+
+    reopened = EmbeddingCache("test-model", dim=2, max_entries=4, path=path, flush_every=2)
+    assert reopened.get("gin") == [1.0, 0.0]
+
+
+def test_put_evicts_least_recently_used():
+    cache = EmbeddingCache("test-model", dim=1, max_entries=2)
+    cache.put("gin", [1.0])
+    cache.put("rum", [2.0])
+    cache.get("gin")
+    cache.put("tequila", [3.0])
+
+    assert cache.get("rum") is None
+    assert cache.get("gin") == [1.0]
+    assert cache.stats()["evictions"] == 1
+
+
+def test_concurrent_flushes_leave_a_readable_index(tmp_path):
+    path = str(tmp_path / "embeddings.f32")
+    cache = EmbeddingCache("test-model", dim=2, max_entries=64, path=path, flush_every=1000)
+    cache.put_many([(f"text {i}", [float(i), 1.0]) for i in range(64)])
+
+    threads = [threading.Thread(target=cache.flush) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    with open(f"{path}.index.json", "r", encoding="utf-8") as f:
+        assert len(json.load(f)["entries"]) == 64
+    assert [name for name in os.listdir(tmp_path) if name.endswith(".tmp")] == []
@@ -0,0 +1,53 @@
+import asyncio
+
+import httpx
+
+from app.services.llm_client import LLMClient
+
+
+async def _slow_upstream(request):
+    await asyncio.sleep(30)
+    return httpx.Response(200, json={"choices": [{"message": {"content": "late"}}]})
+
+
+def _hedging_client(recent_latency: float) -> LLMClient:
+    client = LLMClient(
+        base_url="http://llm.test/v1",
+        api_key=None,
+        model="test",
+        max_concurrency=4,
+        hedge_enabled=True,
+        hedge_min_samples=1,
+        transport=httpx.MockTransport(_slow_upstream),
+    )
+    client.latencies.add(recent_latency)
+    return client
+
+
+async def _cancel_call(client: LLMClient, after: float):
+    call = asyncio.ensure_future(client.complete([{"role": "user", "content": "hi"}]))
+    await asyncio.sleep(after)
+    call.cancel()
+    try:
+        await call
+    except asyncio.CancelledError:
+        pass
+    leftover = [task for task in asyncio.all_tasks() if task is not asyncio.current_task()]
+    free_slots = client._semaphore._value
+    await client.aclose()
+    return leftover, free_slots
+
+
+def test_cancelling_during_hedge_delay_cancels_primary():
+    # Hedge delay of 5s: the caller is cancelled while waiting on the primary alone
+    leftover, free_slots = asyncio.run(_cancel_call(_hedging_client(5.0), after=0.05))
+    assert leftover == []
+    assert free_slots == 4
+
+
+def test_cancelling_after_hedge_cancels_both_requests():
+    client = _hedging_client(0.01)
+    leftover, free_slots = asyncio.run(_cancel_call(client, after=0.2))
+    assert client._hedges == 1
+    assert leftover == []
+    assert free_slots == 4
@@ -0,0 +1,25 @@
+import logging
+import queue
+
+from app.logging_config import DeferredQueueHandler
+
+
+def _queue_record(msg, *args):
+    log_queue = queue.SimpleQueue()
+    handler = DeferredQueueHandler(log_queue)
+    record = logging.LogRecord("test", logging.INFO, __file__, 1, msg, args, None)
+    handler.handle(record)
+    return log_queue.get_nowait()
+
+
+def test_immutable_args_are_formatted_later():
+    record = _queue_record("took %.3fs for %s", 1.5, "gin")
+    assert record.args == (1.5, "gin")
+    assert record.getMessage() == "took 1.500s for gin"
+
+
+def test_mutable_args_are_snapshotted():
+    preferences = {"favorite_ingredients": ["rum"]}
+    record = _queue_record("preferences: %s", preferences)
+    preferences["favorite_ingredients"].append("gin")
+    assert record.getMessage() == "preferences: {'favorite_ingredients': ['rum']}"
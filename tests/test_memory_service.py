@@ -0,0 +1,57 @@
+import asyncio
+
+from app.services.memory_service import MemoryService
+from app.services.preference_store import InMemoryPreferenceBackend, PreferenceStore
+from app.services.vector_backends import InMemoryBackend
+
+
+class LegacyVectorStore:
+    """Vector store stand-in holding memories written by earlier releases."""
+
+    memory_namespace = "user-memories"
+
+    def __init__(self):
+        self.backend = InMemoryBackend()
+        self.embed_calls = 0
+
+    async def aembed(self, text):
+        self.embed_calls += 1
+        return [1.0, 0.0]
+
+
+def test_legacy_memories_are_imported_once():
+    vector_store = LegacyVectorStore()
+    vector_store.backend.upsert([
+        ("m1", [1.0, 0.0], {"user_id": "alice", "favorite_ingredients": ["Rum"], "favorite_cocktails": [], "timestamp": "2024-01-01T00:00:00"}),
+        ("m2", [0.9, 0.1], {"user_id": "alice", "favorite_ingredients": ["Rum", "Lime"], "favorite_cocktails": ["Mojito"], "timestamp": "2024-02-01T00:00:00"}),
+        ("m3", [1.0, 0.0], {"user_id": "bob", "favorite_ingredients": ["Gin"], "favorite_cocktails": [], "timestamp": "2024-01-01T00:00:00"}),
+    ], namespace="user-memories")
+    service = MemoryService(vector_store, llm_service=None, preference_store=PreferenceStore(InMemoryPreferenceBackend()))
+    service.legacy_memory_fallback = True
+
+    async def run():
+        first = await service.aget_user_preferences("alice")
+        second = await service.aget_user_preferences("alice")
+        return first, second
+
+    first, second = asyncio.run(run())
+
+    assert first == {"favorite_ingredients": ["Rum", "Lime"], "favorite_cocktails": ["Mojito"]}
+    assert second == first
+    assert vector_store.embed_calls == 1
+
+
+def test_user_without_legacy_memories_is_checked_once():
+    vector_store = LegacyVectorStore()
+    service = MemoryService(vector_store, llm_service=None, preference_store=PreferenceStore(InMemoryPreferenceBackend()))
+    service.legacy_memory_fallback = True
+
+    async def run():
+        await service.aget_user_preferences("carol")
+        await service.preference_store.amerge("carol", {"favorite_ingredients": ["Tequila"]})
+        return await service.aget_user_preferences("carol")
+
+    preferences = asyncio.run(run())
+
+    assert preferences == {"favorite_ingredients": ["Tequila"], "favorite_cocktails": []}
+    assert vector_store.embed_calls == 1
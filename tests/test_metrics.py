@@ -0,0 +1,31 @@
+import asyncio
+
+from fastapi import FastAPI
+from fastapi.responses import StreamingResponse
+from fastapi.testclient import TestClient
+from prometheus_client import REGISTRY
+
+from app.services.metrics import RequestMetricsMiddleware
+
+
+def latency_sum(route):
+    labels = {"method": "GET", "route": route, "status": "200"}
+    return REGISTRY.get_sample_value("cocktail_http_request_duration_seconds_sum", labels)
+
+
+def test_streamed_response_is_timed_until_its_last_chunk():
+    app = FastAPI()
+    app.add_middleware(RequestMetricsMiddleware)
+
+    @app.get("/test/slow-stream")
+    async def slow_stream():
+        async def chunks():
+            for _ in range(3):
+                await asyncio.sleep(0.1)
+                yield "chunk\n"
+        return StreamingResponse(chunks(), media_type="text/plain")
+
+    response = TestClient(app).get("/test/slow-stream")
+
+    assert response.text == "chunk\n" * 3
+    assert latency_sum("/test/slow-stream") >= 0.3
@@ -0,0 +1,45 @@
+from app.services.preference_prefilter import PreferencePrefilter
+
+
+def make_prefilter():
+    return PreferencePrefilter(["Tequila", "Light rum", "Lime juice", "Sweet and sour"], ["Margarita", "Mojito"])
+
+
+def test_message_without_catalog_mention_is_skipped():
+    prefilter = make_prefilter()
+
+    assert prefilter.analyze("Hello there, how are you today").decision == "skip"
+    assert prefilter.analyze("Thanks, and have a nice evening").decision == "skip"
+
+
+def test_requests_and_questions_without_trigger_phrase_are_skipped():
+    prefilter = PreferencePrefilter(
+        ["Gin", "Grenadine", "Vodka", "Lime juice", "Campari"], ["Mojito", "Negroni", "Gin Fizz"]
+    )
+
+    for message in [
+        "show me 3 gin drinks",
+        "recommend a gin cocktail",
+        "cocktails with gin and grenadine?",
+        "what can I make with vodka and lime",
+        "tell me about the mojito",
+        "what is a negroni",
+        "Can you list drinks with Campari",
+    ]:
+        assert prefilter.analyze(message).decision == "skip", message
+
+
+def test_first_person_or_sentiment_mention_goes_to_llm():
+    prefilter = make_prefilter()
+
+    assert prefilter.analyze("I am obsessed with tequila").decision == "llm"
+    assert prefilter.analyze("Rum is what I drink every weekend").decision == "llm"
+    assert prefilter.analyze("A mojito is the best thing all summer long").decision == "llm"
+    assert prefilter.analyze("Mojito all summer long").decision == "skip"
+
+
+def test_trigger_followed_by_vocabulary_is_extracted_locally():
+    result = make_prefilter().analyze("I love tequila and margarita")
+
+    assert result.decision == "local"
+    assert result.preferences == {"favorite_ingredients": ["Tequila"], "favorite_cocktails": ["Margarita"]}
@@ -0,0 +1,46 @@
+import pytest
+
+from app.services.metrics import estimate_tokens
+from app.services.prompt_builder import ContextBuilder, TokenCounter
+
+
+class WordCounter:
+    def count(self, text):
+        return len(text.split())
+
+
+def result(name, score, desc="A long description " * 5):
+    return {"metadata": {"name": name, "category": "Cocktail", "alcoholic": "Alcoholic",
+                         "ingredients": ["Rum", "Mint"], "desc": desc}, "score": score}
+
+
+def test_keeps_retriever_order_across_score_scales():
+    # Exact-name hit (sentinel 1.0) ahead of BM25-scored results
+    results = [result("Mojito", 1.0), result("Mojito Extra", 8.2), result("Mango Mojito", 6.5)]
+    included, context, _ = ContextBuilder(max_tokens=1000, token_counter=WordCounter()).build(results, limit=3)
+    assert [r["metadata"]["name"] for r in included] == ["Mojito", "Mojito Extra", "Mango Mojito"]
+    assert context.splitlines()[1].startswith("1. Mojito |")
+
+
+def test_truncates_from_the_tail_under_budget_pressure():
+    results = [result("Mojito", 1.0), result("Mojito Extra", 8.2), result("Mango Mojito", 6.5)]
+    builder = ContextBuilder(max_tokens=45, token_counter=WordCounter())
+    included, context, _ = builder.build(results, limit=3)
+    lines = context.splitlines()
+    assert [r["metadata"]["name"] for r in included] == ["Mojito", "Mojito Extra"]
+    # The requested cocktail keeps its description; the next one is shortened and the last dropped
+    assert lines[1].startswith("1. Mojito |") and "description" in lines[1]
+    assert lines[2] == "2. Mojito Extra | Cocktail | Alcoholic | Rum, Mint"
+
+
+def test_token_counter_never_downloads_the_encoding(tmp_path, monkeypatch):
+    tiktoken_load = pytest.importorskip("tiktoken.load")
+    fetched = []
+    monkeypatch.setenv("TIKTOKEN_CACHE_DIR", str(tmp_path))
+    monkeypatch.setattr(tiktoken_load, "read_file", lambda blobpath: fetched.append(blobpath) or b"")
+
+    counter = TokenCounter("r50k_base")
+    counter.load()
+
+    assert fetched == []
+    assert counter.count("gin and tonic") == estimate_tokens("gin and tonic")
@@ -0,0 +1,32 @@
+from app.services.rag_service import RAGService
+from app.services.structured_index import StructuredIndex
+
+CATALOG = [
+    {"name": "Margarita", "category": "Cocktail", "alcoholic": "Alcoholic", "ingredients": ["Tequila", "Triple sec", "Lime juice", "Salt"], "desc": ""},
+    {"name": "Daiquiri", "category": "Cocktail", "alcoholic": "Alcoholic", "ingredients": ["Light rum", "Lime juice", "Sugar"], "desc": ""},
+]
+NO_PREFERENCES = {"favorite_ingredients": [], "favorite_cocktails": []}
+
+
+def make_service():
+    return RAGService(None, None, None, structured_index=StructuredIndex.from_catalog(CATALOG))
+
+
+def test_exclusion_on_named_cocktail_is_a_modification_not_a_filter():
+    service = make_service()
+
+    exact, _, filters = service._plan_search("a margarita without salt", NO_PREFERENCES, 5)
+    prompt = service._build_prompt("a margarita without salt", NO_PREFERENCES, "")
+
+    assert exact is None
+    assert filters is None
+    assert "Margarita without salt" in prompt
+
+
+def test_exclusion_without_named_cocktail_stays_a_filter():
+    service = make_service()
+
+    _, _, filters = service._plan_search("something refreshing without salt", NO_PREFERENCES, 5)
+
+    assert filters == {"ingredient_keys": {"$nin": ["salt"]}}
+    assert "modifications" not in service._build_prompt("something refreshing without salt", NO_PREFERENCES, "")
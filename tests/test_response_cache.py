@@ -0,0 +1,26 @@
+import json
+import os
+
+from app.services.response_cache import CatalogVersionWatcher
+
+
+def write_version(path, version, mtime):
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump({"catalog_version": version}, f)
+    os.utime(path, (mtime, mtime))
+
+
+def test_watcher_notifies_on_version_change(tmp_path):
+    path = str(tmp_path / "ingest_state.json")
+    write_version(path, "v1", 1000)
+    watcher = CatalogVersionWatcher(path, interval=0)
+    changes = []
+    watcher.subscribe(changes.append)
+
+    assert watcher.current() == "v1"
+    assert watcher.current() == "v1"
+    assert changes == []
+
+    write_version(path, "v2", 2000)
+    assert watcher.current() == "v2"
+    assert changes == ["v2"]
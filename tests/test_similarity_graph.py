@@ -0,0 +1,36 @@
+import numpy as np
+
+from app.services.catalog import catalog_version, cocktail_id, row_hash
+from app.services.similarity_graph import SimilarityGraph, build_similarity_graph, save_similarity_graph
+
+CATALOG = [
+    {"name": "Daiquiri", "category": "Cocktail", "alcoholic": "Alcoholic", "ingredients": ["Light rum", "Lime juice", "Sugar"], "desc": ""},
+    {"name": "Margarita", "category": "Cocktail", "alcoholic": "Alcoholic", "ingredients": ["Tequila", "Triple sec", "Lime juice"], "desc": ""},
+    {"name": "Gin Fizz", "category": "Cocktail", "alcoholic": "Alcoholic", "ingredients": ["Gin", "Lemon", "Soda water"], "desc": ""},
+]
+
+
+def save(path, cocktails):
+    ingredient_sets = [{ingredient.lower() for ingredient in cocktail["ingredients"]} for cocktail in cocktails]
+    graph = build_similarity_graph(np.eye(len(cocktails), 4), ingredient_sets, top_n=2)
+    version = catalog_version({cocktail_id(c["name"]): row_hash(c) for c in cocktails})
+    save_similarity_graph(path, graph, [c["name"] for c in cocktails], info={"catalog_version": version})
+
+
+def test_graph_built_for_current_catalog_is_loaded(tmp_path):
+    path = str(tmp_path / "graph.npy")
+    save(path, CATALOG)
+
+    graph = SimilarityGraph.load(path, CATALOG)
+
+    assert graph is not None
+    assert graph.neighbors("daiquiri", limit=1)[0]["metadata"]["name"] == "Margarita"
+
+
+def test_graph_built_for_another_catalog_version_is_rejected(tmp_path):
+    path = str(tmp_path / "graph.npy")
+    save(path, CATALOG)
+    reindexed = CATALOG[:2] + [{**CATALOG[2], "ingredients": ["Gin", "Lemon juice"]}]
+
+    assert SimilarityGraph.load(path, reindexed) is None
+    assert SimilarityGraph.load(path, CATALOG[:2]) is None
@@ -0,0 +1,60 @@
+from app.services.structured_index import StructuredIndex
+
+CATALOG = [
+    {"name": "Daiquiri", "category": "Cocktail", "alcoholic": "Alcoholic", "ingredients": ["Light rum", "Lime juice", "Sugar"], "desc": ""},
+    {"name": "Margarita", "category": "Cocktail", "alcoholic": "Alcoholic", "ingredients": ["Tequila", "Triple sec", "Lime juice"], "desc": ""},
+    {"name": "Batida", "category": "Cocktail", "alcoholic": "Alcoholic", "ingredients": ["Rum", "Tequila", "Sugar"], "desc": ""},
+    {"name": "Gin Fizz", "category": "Cocktail", "alcoholic": "Alcoholic", "ingredients": ["Gin", "Lemon", "Soda water"], "desc": ""},
+    {"name": "Limeade", "category": "Soft Drink", "alcoholic": "Non alcoholic", "ingredients": ["Lime", "Sugar", "Water"], "desc": ""},
+]
+
+
+def names(index, query):
+    return {result["metadata"]["name"] for result in index.search(index.parse(query), limit=10)}
+
+
+def test_or_is_a_union():
+    index = StructuredIndex.from_catalog(CATALOG)
+    plan = index.parse("drinks with rum or tequila")
+    assert plan.exact
+    assert plan.any_of == (frozenset({"rum", "tequila"}),)
+    assert names(index, "drinks with rum or tequila") == {"Daiquiri", "Margarita", "Batida"}
+
+
+def test_or_combines_with_required_ingredients():
+    index = StructuredIndex.from_catalog(CATALOG)
+    assert names(index, "either rum or tequila and lime juice") == {"Daiquiri", "Margarita"}
+    assert names(index, "rum and tequila") == {"Batida"}
+
+
+def test_negated_or_excludes_both():
+    index = StructuredIndex.from_catalog(CATALOG)
+    assert names(index, "drinks without rum or tequila") == {"Gin Fizz", "Limeade"}
+
+
+def test_ingredient_matches_on_tokens():
+    index = StructuredIndex.from_catalog(CATALOG)
+    assert names(index, "drinks with lime") == {"Daiquiri", "Margarita", "Limeade"}
+
+
+def test_negated_inclusion_verb_excludes():
+    index = StructuredIndex.from_catalog(CATALOG)
+    for query in [
+        "drinks not made with rum",
+        "cocktails not containing rum",
+        "a drink that doesn't have rum",
+        "drinks that don't contain rum",
+        "cocktails that do not include rum",
+    ]:
+        plan = index.parse(query)
+        assert plan.exclude == frozenset({"rum"}), query
+        assert not plan.include, query
+        assert plan.exact, query
+        assert names(index, query) == {"Margarita", "Gin Fizz", "Limeade"}, query
+
+
+def test_inclusion_after_negated_inclusion_requires():
+    index = StructuredIndex.from_catalog(CATALOG)
+    plan = index.parse("drinks not made with rum but with tequila")
+    assert plan.exclude == frozenset({"rum"})
+    assert plan.include == frozenset({"tequila"})